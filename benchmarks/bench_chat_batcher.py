@@ -0,0 +1,84 @@
+"""
+Benchmark: chat-sql micro-batching throughput vs added latency.
+
+Simulates a provider with a fixed per-call overhead, a per-question generation cost and a
+cap on concurrent calls, then fires Poisson-distributed chat-sql questions at the batcher
+for several window sizes. No network or API key needed.
+
+    python benchmarks/bench_chat_batcher.py --requests 200 --qps 40
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chat_batcher import ChatSqlBatcher  # noqa: E402
+
+
+def make_fake_provider(call_overhead: float, per_question: float, concurrency: int):
+    slots = threading.Semaphore(concurrency)
+
+    def run_batch(context, questions):
+        with slots:
+            time.sleep(call_overhead + per_question * len(questions))
+        return [{"index": i, "sqlQuery": "SELECT 1;", "description": q} for i, q in enumerate(questions)]
+
+    return run_batch
+
+
+async def run_load(batcher, run_batch, requests: int, qps: float, seed: int):
+    rng = random.Random(seed)
+    latencies = []
+
+    async def one(i):
+        started = time.perf_counter()
+        if batcher is None:
+            await asyncio.to_thread(run_batch, "ctx", [f"q{i}"])
+        else:
+            await batcher.submit("ctx", "ctx", f"q{i}")
+        latencies.append(time.perf_counter() - started)
+
+    tasks = []
+    wall = time.perf_counter()
+    for i in range(requests):
+        tasks.append(asyncio.create_task(one(i)))
+        await asyncio.sleep(rng.expovariate(qps))
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - wall
+
+    latencies.sort()
+    return {
+        "throughput": requests / wall,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--qps", type=float, default=40.0)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--windows", default="0,10,25,50,100,200", help="comma-separated window sizes in ms")
+    parser.add_argument("--call-overhead", type=float, default=0.4, help="seconds per provider call")
+    parser.add_argument("--per-question", type=float, default=0.05, help="extra seconds per question in a call")
+    parser.add_argument("--concurrency", type=int, default=4, help="max concurrent provider calls")
+    args = parser.parse_args()
+
+    run_batch = make_fake_provider(args.call_overhead, args.per_question, args.concurrency)
+    print(f"{'window_ms':>10} {'req/s':>8} {'p50_ms':>8} {'p95_ms':>8}")
+    for window in (float(w) for w in args.windows.split(",")):
+        batcher = ChatSqlBatcher(run_batch, window_ms=window, max_batch=args.max_batch) if window > 0 else None
+        result = asyncio.run(run_load(batcher, run_batch, args.requests, args.qps, seed=42))
+        print(f"{window:>10.0f} {result['throughput']:>8.1f} {result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmark: FRS mapping vs database spec cross-validation at 100k+ mapping rows.
+
+Generates a database spec sheet (one row per table, primary key and relationships) and an
+FRS column mapping sheet (one row per column, type, constraint and "Foreign key > t.c")
+describing the same schema, plants a known number of defects of each kind (unmapped
+tables, orphan columns, duplicate mappings, foreign key type mismatches, primary key and
+relationship mismatches, dangling and unresolved references), and reports:
+  - cross_validate time on the in-memory sheets (normalisation plus every hash join),
+  - the same comparison as a row-by-row Python loop over dicts (baseline, --no-baseline),
+  - planted vs found defects per check,
+  - with --xlsx, the time to write both workbooks and read them back with read_catalog_sheets.
+
+    python benchmarks/bench_cross_validation.py --rows 100000 --defects 50
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd  # noqa: E402
+
+from cross_validation import CHECKS, catalog_sheet, cross_validate, read_catalog_sheets  # noqa: E402
+
+TYPES = ["varchar", "int", "datetime", "boolean", "decimal(10,2)", "text"]
+
+
+def make_sheets(rng: random.Random, rows: int, defects: int) -> Tuple[pd.DataFrame, pd.DataFrame, Counter]:
+    tables = max(10, rows // 40)
+    names = [f"table_{i:05d}" for i in range(tables)]
+    planted: Counter = Counter()
+    spec_rows, mapping_rows = [], []
+    per_table = rows // tables
+    for i, table in enumerate(names):
+        relations = []
+        mapping_rows.append([table, "id", "int", "Primary key", "PK"])
+        for c in range(1, per_table):
+            if c <= 2 and i > 0:
+                parent = names[rng.randrange(i)]
+                relations.append(f"{parent}_id_{c} > {parent}.id")
+                mapping_rows.append([table, f"{parent}_id_{c}", "int", f"Foreign key > {parent}.id", "FK"])
+            else:
+                mapping_rows.append([table, f"column_{c}", rng.choice(TYPES), "", ""])
+        spec_rows.append([table, f"Table {table}", "id", "; ".join(relations + ["Used in reports"]), ""])
+
+    # Defects, each on its own table so they do not mask one another
+    victims = rng.sample(range(1, tables), min(tables - 1, defects * 8))
+    kinds = ["unmapped_table", "orphan_column", "duplicate_mapping", "type_mismatch", "pk_mismatch",
+             "relationship_mismatch", "dangling_reference", "unresolved_reference"]
+    for n, i in enumerate(victims):
+        kind, table = kinds[n % len(kinds)], names[i]
+        if kind == "unmapped_table":
+            spec_rows.append([f"unmapped_{n}", "planted", "id", "", ""])
+        elif kind == "orphan_column":
+            mapping_rows.append([f"orphan_{n}", "id", "int", "", "PK"])
+        elif kind == "duplicate_mapping":
+            mapping_rows.append([table, "column_3", "varchar", "", ""])
+        elif kind == "type_mismatch":
+            mapping_rows.append([table, f"typed_ref_{n}", "varchar", f"Foreign key > {names[0]}.id", "FK"])
+            planted["relationship_mismatch"] += 1
+        elif kind == "pk_mismatch":
+            mapping_rows.append([table, f"code_{n}", "varchar", "", "PK"])
+        elif kind == "relationship_mismatch":
+            mapping_rows.append([table, f"ref_{n}", "int", f"Foreign key > {names[0]}.id", "FK"])
+        elif kind == "dangling_reference":
+            mapping_rows.append([table, f"missing_ref_{n}", "int", f"Foreign key > missing_{n}.id", "FK"])
+            planted["relationship_mismatch"] += 1
+        elif kind == "unresolved_reference":
+            mapping_rows.append([table, f"loose_ref_{n}", "int", "", "FK"])
+        planted[kind] += 1
+
+    rng.shuffle(mapping_rows)
+    spec = pd.DataFrame(spec_rows, columns=["Table Name", "Description", "Primary Key", "Relationships", "Notes"])
+    mapping = pd.DataFrame(mapping_rows, columns=["Table Name", "Column Name", "Data Type", "Mapping/Relationship",
+                                                  "Constraint"])
+    return spec, mapping, planted
+
+
+def loop_baseline(spec: pd.DataFrame, mapping: pd.DataFrame) -> Counter:
+    """The same core checks row by row over Python dicts: what a hand-written validator does."""
+    found: Counter = Counter()
+    columns: Dict[Tuple[str, str], dict] = {}
+    for row in mapping.to_dict("records"):
+        key = (row["Table Name"].strip().lower(), row["Column Name"].strip().lower())
+        if key in columns:
+            found["duplicate_mapping"] += 1
+        columns.setdefault(key, row)
+    spec_tables = {row["Table Name"].strip().lower(): row for row in spec.to_dict("records")}
+    mapped_tables = {table for table, _ in columns}
+    found["unmapped_table"] = sum(1 for table in spec_tables if table not in mapped_tables)
+    found["orphan_column"] = sum(1 for table, _ in columns if table not in spec_tables)
+    for (table, column), row in columns.items():
+        mapping_text = str(row["Mapping/Relationship"])
+        if ">" in mapping_text:
+            target = mapping_text.split(">")[1].strip().lower()
+            ref_table, _, ref_column = target.partition(".")
+            if (ref_table, ref_column) not in columns:
+                found["dangling_reference"] += 1
+            elif columns[(ref_table, ref_column)]["Data Type"] != row["Data Type"]:
+                found["type_mismatch"] += 1
+        elif str(row["Constraint"]) == "FK":
+            found["unresolved_reference"] += 1
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="mapping rows to generate")
+    parser.add_argument("--defects", type=int, default=50, help="planted defects per kind")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--xlsx", action="store_true", help="also round-trip both sheets through XLSX files")
+    parser.add_argument("--no-baseline", action="store_true", help="skip the row-by-row loop baseline")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    spec, mapping, planted = make_sheets(rng, args.rows, args.defects)
+    sheets = [catalog_sheet("Database_Specs_Sheet.xlsx", "Sheet1", spec),
+              catalog_sheet("FRS_Column_Mapping_Sheet.xlsx", "Sheet1", mapping)]
+    print(f"spec: {len(spec)} tables | mapping: {len(mapping)} rows | planted: {sum(planted.values())} defects\n")
+
+    timings: List[float] = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        findings = cross_validate(sheets)
+        timings.append(time.perf_counter() - started)
+    print(f"cross_validate:        {min(timings) * 1000:9.1f} ms (best of {args.runs}), {len(findings)} findings")
+    if not args.no_baseline:
+        started = time.perf_counter()
+        baseline = loop_baseline(spec, mapping)
+        print(f"row-by-row dict loop:  {(time.perf_counter() - started) * 1000:9.1f} ms, "
+              f"{sum(baseline.values())} findings (subset of the checks)")
+
+    found = findings["check"].value_counts()
+    print(f"\n{'check':<24} {'planted':>8} {'found':>6}")
+    for check in CHECKS:
+        print(f"{check:<24} {planted.get(check, 0):8d} {int(found.get(check, 0)):6d}")
+
+    if args.xlsx:
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [Path(tmp) / sheet.file for sheet in sheets]
+            started = time.perf_counter()
+            spec.to_excel(paths[0], index=False)
+            mapping.to_excel(paths[1], index=False)
+            written = time.perf_counter() - started
+            started = time.perf_counter()
+            read = [sheet for path in paths for sheet in read_catalog_sheets(path, path.name)]
+            read_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            cross_validate(read)
+            print(f"\nxlsx: write {written:.1f}s | read_catalog_sheets {read_seconds:.1f}s | "
+                  f"cross_validate {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
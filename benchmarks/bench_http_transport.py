@@ -0,0 +1,107 @@
+"""
+Benchmark: per-call overhead of the shared pooled transport vs one-off clients.
+
+Runs chat completions against the local mock LLM (mock_llm_server, zero latency by default
+so only client and connection overhead is measured), sequentially and from a thread pool,
+with three client strategies:
+  - one-shot:    httpx.post() per call, a new connection each time (bare `requests.post`),
+  - new client:  a fresh OpenAI client per call (default transport, new pool and SSL context),
+  - shared:      llm_client.create_client(), backed by http_transport's pooled client.
+
+The mock is plain HTTP on localhost, so DNS and TLS setup, which pooling also saves against
+real providers, are not part of these numbers.
+
+    python benchmarks/bench_http_transport.py --calls 200 --concurrency 16
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from http_transport import http2_enabled  # noqa: E402
+from llm_client import create_client  # noqa: E402
+from mock_llm_server import MockLLMConfig, running_mock_llm  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "Reply with a short SQL query counting all records."}]
+
+
+def strategies(base_url: str, api_key: str, model: str) -> Dict[str, Callable[[], None]]:
+    from openai import OpenAI
+
+    shared, _, _ = create_client()
+
+    def one_shot() -> None:
+        response = httpx.post(
+            f"{base_url}/chat/completions",
+            headers={"Authorization": f"Bearer {api_key}"},
+            json={"model": model, "messages": MESSAGES, "max_tokens": 64},
+        )
+        response.raise_for_status()
+
+    def new_client() -> None:
+        client = OpenAI(base_url=base_url, api_key=api_key)
+        try:
+            client.chat.completions.create(model=model, messages=MESSAGES, max_tokens=64)
+        finally:
+            client.close()
+
+    def pooled() -> None:
+        shared.chat.completions.create(model=model, messages=MESSAGES, max_tokens=64)
+
+    return {"one-shot": one_shot, "new client": new_client, "shared": pooled}
+
+
+def run(call: Callable[[], None], calls: int, concurrency: int) -> Dict[str, float]:
+    def timed_call(_: int) -> float:
+        started = time.perf_counter()
+        call()
+        return time.perf_counter() - started
+
+    call()  # warm-up: imports, first connection
+    started = time.perf_counter()
+    if concurrency == 1:
+        latencies: List[float] = [timed_call(i) for i in range(calls)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(timed_call, range(calls)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "calls_per_s": calls / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200, help="calls per strategy and concurrency level")
+    parser.add_argument("--concurrency", type=int, default=16, help="threads for the concurrent run")
+    parser.add_argument("--latency", default="fixed:0", help="mock LLM time to first token (see mock_llm_server)")
+    args = parser.parse_args()
+
+    config = MockLLMConfig(latency=args.latency, tokens_per_second=0)
+    with running_mock_llm(config) as mock:
+        api_key, model = mock.env["LLM_API_KEY"], mock.env["LLM_MODEL"]
+        print(f"HTTP/2: {'on' if http2_enabled() else 'off'} | {args.calls} calls per run\n")
+        print(f"{'strategy':<12} {'threads':>7} {'calls/s':>9} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for concurrency in (1, args.concurrency):
+            for name, call in strategies(mock.base_url, api_key, model).items():
+                r = run(call, args.calls, concurrency)
+                print(
+                    f"{name:<12} {concurrency:>7} {r['calls_per_s']:9.0f} {r['mean_ms']:9.2f} "
+                    f"{r['p50_ms']:8.2f} {r['p95_ms']:8.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
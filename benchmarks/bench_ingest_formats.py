@@ -0,0 +1,92 @@
+"""
+Benchmark: ingestion time and DataFrame memory for XLSX vs CSV vs Parquet.
+
+Writes the same synthetic table in each format, then times `read_sheets` (parse) and
+`build_sheet_profile` (profile) through the shared context builder. XLSX is skipped above
+Excel's row limit and Parquet when no Parquet engine is installed.
+
+    python benchmarks/bench_ingest_formats.py --rows 10000,1000000,10000000
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from context_builder import HAVE_PYARROW, build_sheet_profile, read_sheets  # noqa: E402
+
+EXCEL_MAX_ROWS = 1_048_575
+FORMATS = ("xlsx", "csv", "parquet")
+
+
+def make_table(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "code": rng.choice(["ACTIVE", "PENDING", "CLOSED", "ARCHIVED"], rows),
+        "amount": rng.normal(1000, 250, rows).round(2),
+        "quantity": rng.integers(0, 500, rows),
+        "ratio": rng.random(rows),
+        "region": rng.choice(["north", "south", "east", "west"], rows),
+    })
+
+
+def write(df: pd.DataFrame, fmt: str, path: Path) -> None:
+    if fmt == "xlsx":
+        df.to_excel(path, index=False)
+    elif fmt == "csv":
+        df.to_csv(path, index=False)
+    else:
+        df.to_parquet(path, index=False)
+
+
+def measure(path: Path):
+    started = time.perf_counter()
+    sheets = list(read_sheets(str(path), path.name))
+    parse_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for sheet_name, df in sheets:
+        build_sheet_profile(path.name, sheet_name, df)
+    profile_seconds = time.perf_counter() - started
+    memory = sum(df.memory_usage(deep=True).sum() for _, df in sheets)
+    return parse_seconds, profile_seconds, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="10000,1000000", help="comma-separated row counts")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="comma-separated subset of " + ", ".join(FORMATS))
+    args = parser.parse_args()
+
+    formats = [f for f in args.formats.split(",") if f]
+    print(f"pyarrow installed: {HAVE_PYARROW}")
+    print(f"{'rows':>10} {'format':>8} {'file MB':>8} {'parse s':>8} {'profile s':>9} {'frame MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in (int(r) for r in args.rows.split(",")):
+            df = make_table(rows)
+            for fmt in formats:
+                if fmt == "xlsx" and rows > EXCEL_MAX_ROWS:
+                    print(f"{rows:>10} {fmt:>8}  skipped: above Excel's row limit")
+                    continue
+                path = Path(tmp) / f"bench_{rows}.{fmt}"
+                try:
+                    write(df, fmt, path)
+                except ImportError as e:
+                    print(f"{rows:>10} {fmt:>8}  skipped: {e}".splitlines()[0])
+                    continue
+                parse_seconds, profile_seconds, memory = measure(path)
+                print(
+                    f"{rows:>10} {fmt:>8} {path.stat().st_size / 1e6:8.1f} {parse_seconds:8.2f} "
+                    f"{profile_seconds:9.2f} {memory / 1e6:9.1f}"
+                )
+                path.unlink()
+
+
+if __name__ == "__main__":
+    main()
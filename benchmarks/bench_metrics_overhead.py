@@ -0,0 +1,59 @@
+"""
+Benchmark: instrumentation overhead of metrics.observe_stage / collect_timings.
+
+Compares an empty loop body against the same body wrapped in a timed stage, with and
+without an active timing block, and reports the added cost per stage.
+
+    python benchmarks/bench_metrics_overhead.py --iterations 200000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from metrics import collect_timings, observe_stage  # noqa: E402
+
+
+def bare(n):
+    started = time.perf_counter()
+    for _ in range(n):
+        pass
+    return time.perf_counter() - started
+
+
+def staged(n):
+    started = time.perf_counter()
+    for _ in range(n):
+        with observe_stage("bench"):
+            pass
+    return time.perf_counter() - started
+
+
+def staged_with_timings(n):
+    started = time.perf_counter()
+    with collect_timings():
+        for _ in range(n):
+            with observe_stage("bench"):
+                pass
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    base = bare(n)
+    for name, fn in (("observe_stage", staged), ("observe_stage + collect_timings", staged_with_timings)):
+        elapsed = fn(n)
+        per_call_us = (elapsed - base) / n * 1e6
+        print(f"{name:<34} {per_call_us:6.2f} µs/stage")
+    print("A chat-sql request records ~3 stages; compare against LLM latency in the 100s of ms.")
+
+
+if __name__ == "__main__":
+    main()
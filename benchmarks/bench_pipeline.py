@@ -0,0 +1,240 @@
+"""
+Benchmark: end-to-end parse -> profile -> prompt -> respond pipeline, with regression checks.
+
+Generates workbooks that vary in sheet count, rows, width and cardinality, then for each
+scenario times
+  - parse:    build_file_profiles() over the .xlsx (what the upload endpoint and CLIs run),
+  - prompt:   create_test_analysis_prompt(), cold (first serialisation) and warm (cached),
+  - chat_sql: POST /api/chat-sql?timings=true against the server app, answered by the local
+              mock LLM (mock_llm_server), with the server's own per-stage timings,
+and records peak traced memory of parsing, peak RSS and the analysis prompt size in tokens.
+
+Results are written as JSON. With --baseline, every metric is compared to a stored run and
+the script exits 1 when one regressed by more than --threshold:
+
+    python benchmarks/bench_pipeline.py --output benchmarks/pipeline_baseline.json
+    python benchmarks/bench_pipeline.py --baseline benchmarks/pipeline_baseline.json --threshold 0.25
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import httpx
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from context_builder import build_file_profiles  # noqa: E402
+from mock_llm_server import MockLLMConfig, running_mock_llm  # noqa: E402
+from prompt_builder import create_test_analysis_prompt  # noqa: E402
+from token_budget import message_tokens  # noqa: E402
+from upload_handling import peak_rss_mb  # noqa: E402
+
+# name -> (sheets, rows per sheet, columns per sheet, distinct values per text column)
+SCENARIOS: Dict[str, Tuple[int, int, int, int]] = {
+    "small": (1, 200, 8, 5),
+    "tall": (1, 20_000, 10, 20),
+    "wide": (1, 1_000, 120, 20),
+    "many_sheets": (25, 500, 10, 10),
+    "high_cardinality": (2, 5_000, 12, 5_000),
+}
+
+# metric -> minimum absolute change that counts, so tiny timings don't flag on noise
+NOISE_FLOOR = {"_s": 0.002, "_mb": 2.0, "_tokens": 16}
+
+CHAT_QUESTIONS = ["count active records", "show duplicate ids", "average amount per status", "rows added last month"]
+
+
+def make_sheet(rows: int, cols: int, cardinality: int, rng: np.random.Generator) -> pd.DataFrame:
+    data: Dict[str, Any] = {"id": np.arange(1, rows + 1)}
+    labels = np.array([f"value_{i}" for i in range(cardinality)], dtype=object)
+    for i in range(1, cols):
+        kind = i % 5
+        if kind == 0:
+            data[f"code_{i}"] = rng.choice(labels, rows)
+        elif kind == 1:
+            data[f"amount_{i}"] = rng.normal(1000, 250, rows).round(2)
+        elif kind == 2:
+            data[f"count_{i}"] = rng.integers(0, 500, rows)
+        elif kind == 3:
+            data[f"date_{i}"] = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D")
+        else:
+            values = rng.choice(labels, rows)
+            values[rng.random(rows) < 0.1] = None
+            data[f"optional_{i}"] = values
+    return pd.DataFrame(data)
+
+
+def make_workbook(path: Path, sheets: int, rows: int, cols: int, cardinality: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for s in range(sheets):
+            make_sheet(rows, cols, cardinality, rng).to_excel(writer, sheet_name=f"Sheet{s + 1}", index=False)
+
+
+def timed(fn, repeat: int) -> Tuple[float, Any]:
+    """(median seconds over `repeat` runs, result of the last run)."""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations), result
+
+
+def traced_peak_mb(fn) -> float:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+async def run_chat_sql(app, requests: int) -> Tuple[List[float], Dict[str, float]]:
+    """End-to-end latencies and median server stage timings for `requests` chat-sql calls."""
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60) as client:
+        for i in range(requests):
+            started = time.perf_counter()
+            response = await client.post("/api/chat-sql?timings=true", json={"message": CHAT_QUESTIONS[i % len(CHAT_QUESTIONS)]})
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+            for stage, seconds in (response.json().get("timings") or {}).items():
+                stages.setdefault(stage, []).append(seconds)
+    return latencies, {stage: statistics.median(values) for stage, values in stages.items()}
+
+
+def run_scenario(name: str, path: Path, server, args) -> Dict[str, float]:
+    parse_s, context = timed(lambda: build_file_profiles(path, path.name), args.repeat)
+    parse_peak_mb = traced_peak_mb(lambda: build_file_profiles(path, path.name))
+
+    # The serialised context is cached per fingerprint, and every scenario's workbook is new,
+    # so the first call pays the full serialisation cost
+    started = time.perf_counter()
+    messages = create_test_analysis_prompt(context)
+    prompt_cold_s = time.perf_counter() - started
+    prompt_warm_s, _ = timed(lambda: create_test_analysis_prompt(context), args.repeat)
+    prompt_chars = sum(len(m["content"]) for m in messages)
+
+    server.DATA_CONTEXT[:] = context
+    latencies, stages = asyncio.run(run_chat_sql(server.app, args.chat_requests))
+    latencies.sort()
+
+    result = {
+        "sheets": len(context),
+        "parse_s": parse_s,
+        "parse_peak_mb": parse_peak_mb,
+        "prompt_cold_s": prompt_cold_s,
+        "prompt_warm_s": prompt_warm_s,
+        "prompt_chars": prompt_chars,
+        "prompt_tokens": message_tokens(messages),
+        "chat_sql_p50_s": statistics.median(latencies),
+        "chat_sql_p95_s": latencies[max(0, int(len(latencies) * 0.95) - 1)],
+        "peak_rss_mb": peak_rss_mb() or 0.0,
+    }
+    for stage, seconds in stages.items():
+        result[f"chat_sql_{stage}_s"] = seconds
+    return result
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Regressions of `current` against `baseline`: metrics that grew by more than `threshold`."""
+    regressions = []
+    for scenario, metrics in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if base is None:
+            continue
+        for metric, value in metrics.items():
+            floor = next((f for suffix, f in NOISE_FLOOR.items() if metric.endswith(suffix)), None)
+            old = base.get(metric)
+            if floor is None or old is None or metric == "peak_rss_mb":
+                continue
+            if value > old * (1 + threshold) and value - old > floor:
+                regressions.append(f"{scenario}.{metric}: {old:.4g} -> {value:.4g} (+{(value / old - 1) * 100 if old else float('inf'):.0f}%)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every scenario's row count")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per timed stage (median is reported)")
+    parser.add_argument("--chat-requests", type=int, default=20, help="chat-sql requests per scenario")
+    parser.add_argument("--llm-latency", default="fixed:0", help="mock LLM time to first token (see mock_llm_server)")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0, help="mock LLM throughput (0 = instant)")
+    parser.add_argument("--output", default=str(ROOT / "cache" / "bench_pipeline.json"), help="where to write the JSON results")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative growth that counts as a regression")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "scenarios": {},
+    }
+    config = MockLLMConfig(latency=args.llm_latency, tokens_per_second=args.llm_tokens_per_second, seed=args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp, running_mock_llm(config) as mock:
+        import server  # resolves its model from the mock's LLM_BASE_URL
+
+        print(f"{'scenario':<18} {'parse ms':>9} {'peak MB':>8} {'prompt ms':>10} {'tokens':>8} {'chat p50 ms':>12} {'llm ms':>8}")
+        for index, name in enumerate(names):
+            sheets, rows, cols, cardinality = SCENARIOS[name]
+            path = Path(tmp) / f"{name}.xlsx"
+            make_workbook(path, sheets, max(1, int(rows * args.scale)), cols, cardinality, args.seed + index)
+            r = run_scenario(name, path, server, args)
+            results["scenarios"][name] = r
+            print(
+                f"{name:<18} {r['parse_s'] * 1000:9.1f} {r['parse_peak_mb']:8.1f} {r['prompt_cold_s'] * 1000:10.2f} "
+                f"{r['prompt_tokens']:8d} {r['chat_sql_p50_s'] * 1000:12.2f} {r.get('chat_sql_llm_call_s', 0) * 1000:8.2f}"
+            )
+        results["meta"]["mock_llm"] = mock.stats
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+        if regressions:
+            print(f"\nRegressions against {args.baseline} (> {args.threshold:.0%}):")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print(f"No regressions against {args.baseline} (threshold {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
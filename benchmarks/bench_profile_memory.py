@@ -0,0 +1,83 @@
+"""
+Benchmark: memory and serialisation cost of legacy context dicts vs SheetProfile.
+
+Builds the same synthetic sheets both ways, measures retained memory with tracemalloc,
+and times JSON (legacy) vs SheetProfile.to_bytes()/from_bytes() serialisation.
+
+    python benchmarks/bench_profile_memory.py --sheets 300 --rows 1000 --cols 20
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from context_builder import build_sheet_context, build_sheet_profile  # noqa: E402
+from sheet_profile import SheetProfile  # noqa: E402
+
+
+def make_sheet(rows: int, cols: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(cols):
+        if i % 3 == 0:
+            data[f"text_{i}"] = rng.choice(["alpha", "beta", "gamma", "delta"], rows)
+        elif i % 3 == 1:
+            data[f"int_{i}"] = rng.integers(0, 10_000, rows)
+        else:
+            data[f"float_{i}"] = rng.normal(size=rows)
+    return pd.DataFrame(data)
+
+
+def retained(build, args):
+    """Memory still held once the DataFrames (and pandas' caches on them) are gone."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = []
+    for i in range(args.sheets):
+        df = make_sheet(args.rows, args.cols, seed=i)
+        items.append(build("bench.xlsx", f"sheet_{i}", df))
+        del df
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return items, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sheets", type=int, default=300)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--cols", type=int, default=20)
+    args = parser.parse_args()
+
+    legacy, legacy_bytes = retained(build_sheet_context, args)
+    profiles, profile_bytes = retained(build_sheet_profile, args)
+    print(f"retained memory   legacy dicts: {legacy_bytes / 1e6:7.2f} MB")
+    print(f"retained memory   SheetProfile: {profile_bytes / 1e6:7.2f} MB")
+
+    started = time.perf_counter()
+    blob = json.dumps(legacy, default=str)
+    json.loads(blob)
+    json_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    blobs = [p.to_bytes() for p in profiles]
+    [SheetProfile.from_bytes(b) for b in blobs]
+    binary_seconds = time.perf_counter() - started
+
+    print(f"round trip        JSON (legacy): {json_seconds * 1000:7.1f} ms, {len(blob) / 1e6:6.2f} MB")
+    print(f"round trip        to/from_bytes: {binary_seconds * 1000:7.1f} ms, {sum(map(len, blobs)) / 1e6:6.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: parse and diff two versions of a generated database design as the schema grows.
+
+Writes a DDL design with the requested number of tables (id primary key, foreign keys to
+earlier tables, typed columns, a status column with a COMMENT value list), then a second
+version with a known number of edits (tables added and removed, columns added, removed,
+retyped, made unique and re-pointed, enum values changed), and reports per size:
+  - parse_design time for both versions,
+  - diff_schemas plus regeneration_targets time, and the time per column (flat if linear),
+  - planted vs reported changes.
+
+    python benchmarks/bench_schema_diff.py --sizes 100,1000,10000 --edits 50
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from schema_catalog import parse_design  # noqa: E402
+from schema_diff import diff_schemas, regeneration_targets  # noqa: E402
+
+TYPES = ["VARCHAR(100)", "INT", "DATETIME", "BOOLEAN", "DECIMAL(10,2)", "TEXT"]
+COLUMNS_PER_TABLE = 12
+
+
+def make_tables(rng: random.Random, tables: int) -> List[List[str]]:
+    """Column definition lines per table; table i may reference any earlier table."""
+    design = []
+    for i in range(tables):
+        lines = ["id INT PRIMARY KEY"]
+        if i > 0:
+            lines.append(f"parent_id INT REFERENCES table_{rng.randrange(i):06d}(id)")
+        lines.append("status VARCHAR(20) COMMENT 'pending, active, closed'")
+        lines.extend(f"column_{c} {rng.choice(TYPES)}" for c in range(len(lines), COLUMNS_PER_TABLE))
+        design.append(lines)
+    return design
+
+
+def render(design: List[List[str]], removed: frozenset = frozenset()) -> str:
+    return "\n\n".join(
+        f"CREATE TABLE table_{i:06d} (\n    " + ",\n    ".join(lines) + "\n);"
+        for i, lines in enumerate(design)
+        if i not in removed
+    )
+
+
+def edit(rng: random.Random, design: List[List[str]], edits: int) -> Tuple[str, int]:
+    """A second version with `edits` changes of each kind on distinct tables; returns (DDL, tables touched)."""
+    edited = [list(lines) for lines in design]
+    victims = rng.sample(range(1, len(design)), min(len(design) - 1, edits * 6))
+    removed = set()
+    for n, i in enumerate(victims):
+        kind = n % 6
+        if kind == 0:
+            edited[i].append(f"added_{n} INT")
+        elif kind == 1:
+            edited[i].pop()
+        elif kind == 2:
+            edited[i][-1] = edited[i][-1].rsplit(" ", 1)[0] + " BIGINT UNIQUE"
+        elif kind == 3:
+            edited[i][1] = "parent_id INT REFERENCES table_000000(id)"
+        elif kind == 4:
+            edited[i][2] = "status VARCHAR(20) COMMENT 'pending, active, closed, archived'"
+        else:
+            removed.add(i)
+    for _ in range(edits):
+        edited.append(["id INT PRIMARY KEY", f"parent_id INT REFERENCES table_{rng.randrange(len(design)):06d}(id)"])
+    return render(edited, frozenset(removed)), len(victims) + edits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000", help="comma-separated table counts")
+    parser.add_argument("--edits", type=int, default=20, help="planted edits per kind")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    print(f"{'tables':>7} {'columns':>8} {'parse ms':>9} {'diff ms':>8} {'us/col':>7} {'planted':>8} {'reported':>9} {'regenerate':>11}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        design = make_tables(rng, size)
+        old_text = render(design)
+        new_text, planted = edit(rng, design, args.edits)
+        started = time.perf_counter()
+        old, new = parse_design(old_text), parse_design(new_text)
+        parsed = time.perf_counter() - started
+
+        timings = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            diff = diff_schemas(old, new)
+            targets = regeneration_targets(diff, new)
+            timings.append(time.perf_counter() - started)
+        columns = sum(len(table.columns) for table in old.values()) + sum(len(table.columns) for table in new.values())
+        reported = sum(len(diff.get(key, ())) for key in ("tables_added", "tables_removed", "tables_changed"))
+        print(f"{size:7d} {columns:8d} {parsed * 1000:9.1f} {min(timings) * 1000:8.2f} "
+              f"{min(timings) / columns * 1e6:7.3f} {planted:8d} {reported:9d} {len(targets.get('tables', ())):11d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: wall-clock time of one full analysis completion vs concurrent per-section ones.
+
+Both modes run against the local mock LLM (mock_llm_server) with a realistic time to first
+token and token throughput, so a completion takes time proportional to its length. The
+mock's per-section answers add up to its full report, so the speed-up comes only from
+generating the sections concurrently. With --error-rate, injected 500s show the
+per-section retries at work.
+
+    python benchmarks/bench_sectioned_analysis.py --latency lognormal:-1,0.3 --tokens-per-second 60
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from context_builder import build_sheet_profile  # noqa: E402
+from llm_client import create_client  # noqa: E402
+from mock_llm_server import MockLLMConfig, running_mock_llm  # noqa: E402
+from prompt_builder import prepare_test_analysis_prompt  # noqa: E402
+from sectioned_analysis import run_sectioned_analysis  # noqa: E402
+
+
+def make_context(sheets: int):
+    rng = np.random.default_rng(3)
+    context = []
+    for s in range(sheets):
+        df = pd.DataFrame({
+            "id": np.arange(500),
+            "status": rng.choice(["active", "inactive", "pending"], 500),
+            "amount": rng.normal(100, 20, 500).round(2),
+        })
+        context.append(build_sheet_profile("bench.xlsx", f"Sheet{s + 1}", df))
+    return context
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="repetitions per mode (median is reported)")
+    parser.add_argument("--sheets", type=int, default=3)
+    parser.add_argument("--latency", default="fixed:0.3", help="mock LLM time to first token (see mock_llm_server)")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0, help="mock LLM generation speed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of mock calls answered with a 500")
+    args = parser.parse_args()
+
+    config = MockLLMConfig(
+        latency=args.latency, tokens_per_second=args.tokens_per_second, error_500_rate=args.error_rate, seed=1
+    )
+    context = make_context(args.sheets)
+
+    with running_mock_llm(config) as mock:
+        # No SDK retries: failures should reach the per-section retry loop
+        client, model, _ = create_client()
+        client = client.with_options(max_retries=0)
+
+        def complete(messages, plan):
+            completion = client.chat.completions.create(model=model, messages=messages, max_tokens=plan.max_tokens)
+            return completion.choices[0].message.content
+
+        def full():
+            messages, plan = prepare_test_analysis_prompt(context)
+            return complete(messages, plan)
+
+        def sectioned():
+            report, stats = run_sectioned_analysis(context, complete)
+            return report, stats
+
+        timings = {"full": [], "sections": []}
+        lengths = {}
+        retries = failed = 0
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            try:
+                lengths["full"] = len(full() or "")
+            except Exception as e:
+                print(f"full completion failed: {e}")
+            timings["full"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            report, stats = sectioned()
+            timings["sections"].append(time.perf_counter() - started)
+            lengths["sections"] = len(report)
+            retries += stats["retries"]
+            failed += stats["failed"]
+
+        print(f"{'mode':<10} {'median s':>9} {'report chars':>13}")
+        for mode, values in timings.items():
+            print(f"{mode:<10} {statistics.median(values):9.2f} {lengths.get(mode, 0):13d}")
+        speedup = statistics.median(timings["full"]) / statistics.median(timings["sections"])
+        print(f"\nspeed-up: {speedup:.1f}x | section retries: {retries} | failed sections: {failed}")
+        print(f"mock calls: {mock.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: cold-start import cost of the server and CLI entry points, with budgets.
+
+Runs each entry point in a fresh interpreter under `python -X importtime`, reports the total
+import time, wall time and heaviest imports, and fails (exit code 1) when an entry
+point exceeds its import-time budget or eagerly imports a module it should load lazily.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --budget-scale 2   # slower machines / CI
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# name -> (argv after the interpreter, import budget in ms, modules that must not be imported)
+ENTRY_POINTS: Dict[str, Tuple[List[str], float, Tuple[str, ...]]] = {
+    "server": (["-c", "import server"], 1000.0, ("pandas", "numpy", "openai", "openpyxl", "tiktoken")),
+    "shared modules": (
+        ["-c", "import context_builder, incremental_analysis, llm_client, metrics, prompt_builder"],
+        150.0,
+        ("pandas", "numpy", "openai"),
+    ),
+    "simple-llamaindex-analyzer --help": (
+        ["simple-llamaindex-analyzer.py", "--help"], 300.0, ("pandas", "numpy", "openai"),
+    ),
+    "excel-analyzer-llm --help": (["excel-analyzer-llm.py", "--help"], 300.0, ("pandas", "numpy", "openai")),
+    "llamaindex-excel-analyzer --help": (
+        ["llamaindex-excel-analyzer.py", "--help"], 300.0, ("pandas", "llama_index", "openai"),
+    ),
+}
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def run_importtime(argv: List[str]) -> Tuple[float, List[Tuple[str, int]], Set[str], float, int]:
+    """(total import ms, [(module, cumulative us)] two levels deep, imported packages, wall seconds, exit code)."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+    total_us = 0
+    breakdown: List[Tuple[str, int]] = []
+    imported: Set[str] = set()
+    for line in proc.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        cumulative, indent, module = int(match.group(2)), match.group(3), match.group(4)
+        imported.add(module.split(".")[0])
+        if len(indent) == 1:
+            total_us += cumulative
+        if len(indent) <= 3:
+            breakdown.append((module, cumulative))
+    return total_us / 1000, breakdown, imported, wall, proc.returncode
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="multiply every budget by this factor")
+    parser.add_argument("--top", type=int, default=5, help="heaviest imports (two levels deep) to show")
+    args = parser.parse_args()
+
+    failures = []
+    for name, (argv, budget_ms, lazy_modules) in ENTRY_POINTS.items():
+        budget_ms *= args.budget_scale
+        total_ms, breakdown, imported, wall, returncode = run_importtime(argv)
+        eager = sorted(set(lazy_modules) & imported)
+        status = "ok"
+        if total_ms > budget_ms:
+            status = "OVER BUDGET"
+            failures.append(f"{name}: {total_ms:.0f} ms > {budget_ms:.0f} ms")
+        if eager:
+            status = "EAGER IMPORTS"
+            failures.append(f"{name}: imports {', '.join(eager)} at startup")
+        if returncode != 0:
+            status = "FAILED"
+            failures.append(f"{name}: exited with {returncode}")
+
+        print(f"{name:<36} imports {total_ms:7.0f} ms (budget {budget_ms:5.0f}) | wall {wall * 1000:6.0f} ms | {status}")
+        for module, us in sorted(breakdown, key=lambda item: -item[1])[: args.top]:
+            print(f"    {us / 1000:8.1f} ms  {module}")
+
+    if failures:
+        print("\nStartup budget violations:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
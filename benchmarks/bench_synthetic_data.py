@@ -0,0 +1,83 @@
+"""
+Benchmark: time and memory of synthetic data generation as the row count grows.
+
+Loads a design (default: database/database-design-pharma.sql), gives its largest fact
+tables (orders, order_items by default) the requested row counts and every other table
+--rows rows, and writes the dataset with synthetic_data.generate_dataset:
+  - chunked:  CHUNK_ROWS rows at a time, the default,
+  - one-shot: each table generated as a single chunk (baseline, skipped with --no-baseline),
+reporting wall time, rows per second and the peak RSS, which should stay flat for the
+chunked run however many rows are written. Each run is a fresh child process so the peaks
+do not carry over. With --workers N the tables of each dependency level are written by N
+processes (the peak then only covers the parent process).
+
+    python benchmarks/bench_synthetic_data.py --sizes 100000,1000000,10000000 --no-baseline
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from schema_catalog import load_design  # noqa: E402
+from synthetic_data import CHUNK_ROWS, generate_dataset  # noqa: E402
+from upload_handling import peak_rss_mb  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def run(args: argparse.Namespace) -> dict:
+    """One generation in this process: the --run child mode."""
+    schema = load_design(args.design)
+    size, chunk_rows = args.run
+    rows = {"*": args.rows, **dict.fromkeys(args.tables.split(","), size)}
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        results = generate_dataset(schema, tmp, rows, args.format, seed=1, workers=args.workers, chunk_rows=chunk_rows)
+        elapsed = time.perf_counter() - started
+        size_mb = sum(Path(result["path"]).stat().st_size for result in results.values()) / 1e6
+    total = sum(result["rows"] for result in results.values())
+    return {"rows": total, "seconds": elapsed, "peak_mb": peak_rss_mb(), "file_mb": size_mb}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--design", default=str(ROOT / "database" / "database-design-pharma.sql"))
+    parser.add_argument("--tables", default="orders,order_items", help="comma-separated tables that get --sizes rows")
+    parser.add_argument("--sizes", default="100000,1000000", help="comma-separated row counts of those tables")
+    parser.add_argument("--rows", type=int, default=10_000, help="rows of every other table")
+    parser.add_argument("--format", default="csv", choices=["csv", "parquet"])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--no-baseline", action="store_true", help="skip the one-chunk-per-table baseline")
+    parser.add_argument("--run", type=int, nargs=2, metavar=("SIZE", "CHUNK_ROWS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        print(json.dumps(run(args)))
+        return
+
+    schema = load_design(args.design)
+    tables = [table.strip() for table in args.tables.split(",") if table.strip() in schema]
+    print(f"{len(schema)} tables; sized: {', '.join(tables)}\n")
+    print(f"{'rows':>10} {'mode':<9} {'seconds':>8} {'rows/s':>10} {'peak MB':>8} {'file MB':>8}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        modes = {"chunked": CHUNK_ROWS}
+        if not args.no_baseline:
+            modes["one-shot"] = max(size, args.rows)
+        for mode, chunk_rows in modes.items():
+            child = subprocess.run(
+                [sys.executable, __file__, "--design", args.design, "--tables", ",".join(tables), "--rows", str(args.rows),
+                 "--format", args.format, "--workers", str(args.workers), "--run", str(size), str(chunk_rows)],
+                check=True, capture_output=True, text=True,
+            )
+            result = json.loads(child.stdout.strip().splitlines()[-1])
+            print(f"{result['rows']:10d} {mode:<9} {result['seconds']:8.2f} {result['rows'] / result['seconds']:10.0f} "
+                  f"{result['peak_mb']:8.1f} {result['file_mb']:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
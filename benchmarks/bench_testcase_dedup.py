@@ -0,0 +1,142 @@
+"""
+Benchmark: near-duplicate detection of test cases with MinHash + LSH at 100k+ stored cases.
+
+Generates distinct test cases (random table, column, check and vocabulary words) plus
+reworded variants of some of them (words dropped or swapped, numbers changed), stores them
+report by report in a fresh TestCaseStore, and reports:
+  - indexing throughput with deduplication on,
+  - the cost of deduplicating one more report at the final size (LSH lookups), against a
+    brute-force comparison of each new signature with every stored one,
+  - precision and recall of the collapsed pairs against the exact Jaccard similarity of
+    the shingle sets.
+
+    python benchmarks/bench_testcase_dedup.py --cases 100000 --variant-rate 0.3
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from testcase_dedup import MinHasher, shingles, signature_from_bytes, similarity  # noqa: E402
+from testcase_store import _LABEL_RE, TestCaseStore  # noqa: E402
+
+TABLES = ["researchers", "compounds", "research_studies", "study_participants", "orders", "invoices",
+          "customers", "shipments", "payments", "accounts", "audit_log", "lab_results"]
+COLUMNS = ["email", "status", "created_at", "amount", "employee_id", "compound_id", "lead_researcher_id",
+           "password", "currency", "due_date", "country", "batch_number"]
+CHECKS = ["mandatory field", "unique constraint", "referential integrity", "boundary value", "enum domain",
+          "date ordering", "null handling", "duplicate detection", "format validation", "length limit"]
+SWAPS = {"ensure": "verify", "rejected": "refused", "rows": "records", "invalid": "bad", "the": "each"}
+
+
+def make_vocabulary(rng: random.Random, size: int = 2000) -> List[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+
+def make_case(rng: random.Random, vocabulary: List[str]) -> str:
+    table, column, check = rng.choice(TABLES), rng.choice(COLUMNS), rng.choice(CHECKS)
+    detail = " ".join(rng.sample(vocabulary, 6))
+    return (f"Ensure the {column} of {table} passes the {check} rule when {detail}. "
+            f"Insert {rng.randint(1, 500)} rows. Invalid rows are rejected.")
+
+
+def make_variant(rng: random.Random, text: str) -> str:
+    words = text.split()
+    for _ in range(rng.randint(1, 2)):
+        i = rng.randrange(len(words))
+        if rng.random() < 0.5 and len(words) > 10:
+            del words[i]
+        else:
+            words[i] = SWAPS.get(words[i].lower(), words[i])
+    return " ".join(words).replace(str(rng.randint(1, 9)), str(rng.randint(1, 9)))
+
+
+def report(cases: List[str], offset: int) -> str:
+    rows = "\n".join(f"| TC-{offset + i:06d} | {text} | P{1 + i % 3} |" for i, text in enumerate(cases))
+    return f"## 2. TEST CASES\n\n| Test ID | Objective | Priority |\n|---|---|---|\n{rows}\n"
+
+
+def exact_jaccard(a: str, b: str) -> float:
+    sa, sb = set(shingles(_LABEL_RE.sub(" ", a))), set(shingles(_LABEL_RE.sub(" ", b)))
+    return len(sa & sb) / max(1, len(sa | sb))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", type=int, default=100_000, help="test cases to store")
+    parser.add_argument("--variant-rate", type=float, default=0.3, help="fraction of cases that reword an earlier one")
+    parser.add_argument("--report-size", type=int, default=50, help="test cases per stored report")
+    parser.add_argument("--threshold", type=float, default=0.7)
+    parser.add_argument("--pairs", type=int, default=3000, help="sampled pairs for precision/recall")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    vocabulary = make_vocabulary(rng)
+    texts: List[str] = []
+    origin: List[int] = []  # index of the case a variant rewords, -1 for distinct cases
+    for _ in range(args.cases + args.report_size):
+        if texts and rng.random() < args.variant_rate:
+            source = rng.randrange(len(texts))
+            texts.append(make_variant(rng, texts[source]))
+            origin.append(source)
+        else:
+            texts.append(make_case(rng, vocabulary))
+            origin.append(-1)
+    stored, extra = texts[: args.cases], texts[args.cases:]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TestCaseStore(Path(tmp) / "testcases.sqlite3", dedup_threshold=args.threshold)
+        started = time.perf_counter()
+        duplicates = 0
+        for n in range(0, len(stored), args.report_size):
+            duplicates += store.add_analysis(report(stored[n:n + args.report_size], n), source_hash=f"r{n}")[2]
+        build_seconds = time.perf_counter() - started
+        print(f"stored {len(stored)} cases in {build_seconds:.1f}s ({len(stored) / build_seconds:.0f} cases/s), "
+              f"{duplicates} collapsed as near-duplicates "
+              f"({sum(1 for o in origin[: args.cases] if o >= 0)} generated as rewordings)")
+
+        # One more report at full size: brute force over every stored signature vs the LSH path
+        db = store._connect()
+        indexed = db.execute("SELECT signature FROM testcase_minhash").fetchall()
+        matrix = signature_from_bytes([row[0] for row in indexed])
+        started = time.perf_counter()
+        signatures = MinHasher().signatures([shingles(text) for text in extra])
+        brute = [bool((similarity(signature, matrix) >= args.threshold).any()) for signature in signatures]
+        brute_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        _, _, extra_duplicates = store.add_analysis(report(extra, args.cases), source_hash="extra")
+        lsh_ms = (time.perf_counter() - started) * 1000
+        print(f"\nincremental report of {len(extra)} cases against {len(indexed)} distinct stored signatures:")
+        print(f"  brute-force signature scan only:               {brute_ms:8.1f} ms, {sum(brute)} duplicates")
+        print(f"  store.add_analysis (parse, insert, LSH dedup): {lsh_ms:8.1f} ms, {extra_duplicates} duplicates")
+
+        # Precision/recall on sampled pairs: rewordings and random pairs
+        rows = db.execute("SELECT id, duplicate_of FROM testcases ORDER BY id").fetchall()
+        canonical = {row[0]: row[1] or row[0] for row in rows}
+        ids = [row[0] for row in rows[: args.cases]]
+        pairs: List[Tuple[int, int]] = [(origin[i], i) for i in range(args.cases) if origin[i] >= 0]
+        pairs = rng.sample(pairs, min(len(pairs), args.pairs // 2))
+        pairs += [tuple(rng.sample(range(args.cases), 2)) for _ in range(args.pairs // 2)]
+        tp = fp = fn = 0
+        for a, b in pairs:
+            similar = exact_jaccard(texts[a], texts[b]) >= args.threshold
+            collapsed = canonical[ids[a]] == canonical[ids[b]]
+            tp += similar and collapsed
+            fp += collapsed and not similar
+            fn += similar and not collapsed
+        print(f"\nsampled {len(pairs)} pairs: precision {tp / max(1, tp + fp):.3f} | recall {tp / max(1, tp + fn):.3f} "
+              f"(exact Jaccard >= {args.threshold} as truth)")
+        print(f"stats: {store.stats()} | median similarity of rewordings: "
+              f"{statistics.median(exact_jaccard(texts[a], texts[b]) for a, b in pairs[: args.pairs // 2]):.2f}")
+
+
+if __name__ == "__main__":
+    main()
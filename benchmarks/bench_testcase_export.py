@@ -0,0 +1,94 @@
+"""
+Benchmark: memory and time of exporting stored test cases to XLSX/CSV as the row count grows.
+
+Fills a fresh TestCaseStore with generated test cases, scenarios and SQL queries, then
+exports increasing numbers of them with:
+  - xlsx:      testcase_export.write_xlsx (openpyxl write-only) from TestCaseStore.iter_records,
+  - csv:       testcase_export.write_csv from the same iterator,
+  - dataframe: the naive route, records collected into a pandas DataFrame per section and
+               written with DataFrame.to_excel (baseline, skipped with --no-baseline).
+
+Python heap peaks are measured with tracemalloc; the streaming exports should stay flat.
+
+    python benchmarks/bench_testcase_export.py --sizes 10000,50000
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_testcase_search import make_report  # noqa: E402
+from testcase_export import COLUMNS, SHEET_TITLES, write_csv, write_xlsx  # noqa: E402
+from testcase_store import KINDS, TestCaseStore, body_fields  # noqa: E402
+
+
+def measure(fn: Callable[[], object]) -> Tuple[float, float]:
+    """(seconds, peak traced MB)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def dataframe_export(store: TestCaseStore, limit: int, path: Path) -> None:
+    import pandas as pd
+
+    records = [record for _, record in zip(range(limit), store.iter_records())]
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for kind in KINDS:
+            rows = []
+            for record in records:
+                if record["kind"] == kind:
+                    fields = body_fields(record["body"])
+                    rows.append({header: getter(record, fields) for header, getter in COLUMNS[kind]})
+            pd.DataFrame(rows).to_excel(writer, sheet_name=SHEET_TITLES[kind], index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="5000,20000,50000", help="comma-separated record counts to export")
+    parser.add_argument("--no-baseline", action="store_true", help="skip the DataFrame.to_excel baseline")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    # Imported up front so their module allocations are not counted in the first measurement
+    import openpyxl  # noqa: F401
+    import pandas  # noqa: F401
+
+    rng = random.Random(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        store = TestCaseStore(tmp / "testcases.sqlite3", dedup_threshold=0)
+        n = 0
+        while sum(store.stats()[kind] for kind in KINDS) < max(sizes):
+            store.add_analysis(make_report(rng, 100), source_hash=f"bench-{n}")
+            n += 1
+
+        def limited(limit: int):
+            return (record for _, record in zip(range(limit), store.iter_records()))
+
+        print(f"{'records':>8} {'mode':<10} {'seconds':>8} {'peak MB':>8} {'file MB':>8}")
+        for size in sizes:
+            modes = {
+                "xlsx": (tmp / "out.xlsx", lambda: write_xlsx(limited(size), tmp / "out.xlsx")),
+                "csv": (tmp / "out.csv", lambda: write_csv(limited(size), tmp / "out.csv")),
+            }
+            if not args.no_baseline:
+                modes["dataframe"] = (tmp / "df.xlsx", lambda: dataframe_export(store, size, tmp / "df.xlsx"))
+            for mode, (path, fn) in modes.items():
+                seconds, peak = measure(fn)
+                print(f"{size:8d} {mode:<10} {seconds:8.2f} {peak:8.1f} {path.stat().st_size / 1e6:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: test-case lookups in the FTS5 store vs grepping saved markdown reports.
+
+Generates synthetic analysis reports (scenario and test-case tables plus fenced SQL, like
+the model's output) over a pool of table and column names, indexes them into a fresh
+TestCaseStore, and times the same queries as:
+  - grep:   case-insensitive regex scan over every report's markdown (what finding a past
+            test case means when each run writes a file),
+  - fts:    TestCaseStore.search, BM25-ranked, top 20,
+  - fts+filter: the same with a kind and priority filter.
+
+    python benchmarks/bench_testcase_search.py --reports 500
+"""
+
+import argparse
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from testcase_store import TestCaseStore  # noqa: E402
+
+TABLES = ["researchers", "compounds", "research_studies", "study_participants", "orders", "invoices",
+          "customers", "shipments", "payments", "accounts", "audit_log", "lab_results"]
+COLUMNS = ["email", "status", "created_at", "amount", "employee_id", "compound_id", "lead_researcher_id",
+           "password", "currency", "due_date", "country", "batch_number"]
+CHECKS = ["Mandatory field", "Unique constraint", "Referential integrity", "Boundary value", "Enum domain",
+          "Date ordering", "Null handling", "Duplicate detection", "Format validation", "Length limit"]
+QUERIES = ["email unique", "referential integrity compound_id", "TC-007", "boundary amount", "duplicate",
+           "lead_researcher_id null", "format validation email", "shipments due_date"]
+
+
+def make_report(rng: random.Random, cases: int) -> str:
+    lines = ["## 1. TEST SCENARIOS", "", "| # | Scenario Name | Description | Risk Level |", "|---|---|---|---|"]
+    for i in range(cases // 2):
+        table, column, check = rng.choice(TABLES), rng.choice(COLUMNS), rng.choice(CHECKS)
+        risk = rng.choice(["High", "Medium", "Low"])
+        lines.append(f"| {i + 1} | {check} – {table} | Verify {column} in `{table}` ({check.lower()}). | {risk} |")
+    lines += ["", "## 2. TEST CASES", "",
+              "| Test ID | Test Name | Objective | Expected Results | Priority |", "|---|---|---|---|---|"]
+    for i in range(cases):
+        table, column, check = rng.choice(TABLES), rng.choice(COLUMNS), rng.choice(CHECKS)
+        lines.append(
+            f"| TC-{i + 1:03d} | {check} – {table}.{column} | Ensure `{column}` of `{table}` passes the "
+            f"{check.lower()} rule. | Invalid rows are rejected. | P{rng.randint(1, 3)} |"
+        )
+    lines += ["", "## 3. SQL VALIDATION QUERIES", ""]
+    for i in range(cases // 2):
+        table, column = rng.choice(TABLES), rng.choice(COLUMNS)
+        lines += [f"{i + 1}. **Nulls in {table}.{column}**", "```sql",
+                  f"SELECT id FROM {table} WHERE {column} IS NULL;", "```"]
+    return "\n".join(lines)
+
+
+def time_ms(fn, runs: int) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reports", type=int, default=300, help="number of generated reports to index")
+    parser.add_argument("--cases", type=int, default=20, help="test cases per report")
+    parser.add_argument("--runs", type=int, default=20, help="repetitions per query")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    reports = [make_report(rng, args.cases) for _ in range(args.reports)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Near-duplicate detection off: this measures indexing and lookups only
+        store = TestCaseStore(Path(tmp) / "testcases.sqlite3", dedup_threshold=0)
+        started = time.perf_counter()
+        for n, report in enumerate(reports):
+            store.add_analysis(report, source_hash=f"bench-{n}")
+        index_seconds = time.perf_counter() - started
+        counts = store.stats()
+        records = sum(counts[kind] for kind in ("scenario", "test_case", "sql"))
+        print(f"indexed {records} records from {args.reports} reports in {index_seconds:.2f}s "
+              f"({records / index_seconds:.0f} records/s)\n")
+
+        def grep(query: str) -> int:
+            patterns = [re.compile(re.escape(term), re.IGNORECASE) for term in query.split()]
+            return sum(
+                1 for report in reports for line in report.splitlines() if all(p.search(line) for p in patterns)
+            )
+
+        print(f"{'query':<36} {'grep ms':>9} {'fts ms':>8} {'fts+filter ms':>14} {'hits':>5}")
+        totals = {"grep": [], "fts": [], "filter": []}
+        for query in QUERIES:
+            grep_ms = statistics.median(time_ms(lambda: grep(query), max(3, args.runs // 5)))
+            fts_ms = statistics.median(time_ms(lambda: store.search(query, limit=20), args.runs))
+            filter_ms = statistics.median(
+                time_ms(lambda: store.search(query, kind="test_case", priority="P1", limit=20), args.runs)
+            )
+            hits = len(store.search(query, limit=20))
+            totals["grep"].append(grep_ms)
+            totals["fts"].append(fts_ms)
+            totals["filter"].append(filter_ms)
+            print(f"{query:<36} {grep_ms:9.2f} {fts_ms:8.2f} {filter_ms:14.2f} {hits:5d}")
+
+        print(f"\nmedian over queries: grep {statistics.median(totals['grep']):.2f} ms | "
+              f"fts {statistics.median(totals['fts']):.2f} ms | "
+              f"fts+filter {statistics.median(totals['filter']):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark: API throughput with 1, 2, 4 and 8 uvicorn workers sharing state.
+
+For each worker count, starts `server.py --workers N` (production mode, fresh shared-state
+and job databases, no LLM configured so chat-sql answers come from the heuristic path),
+waits until every worker reports ready, uploads one CSV through one worker and then drives
+POST /api/chat-sql from several client processes. Health checks spread over the workers
+verify that all of them see the uploaded context.
+
+    python benchmarks/bench_workers.py --workers 1,2,4,8 --seconds 10
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, tmp: str) -> subprocess.Popen:
+    env = {k: v for k, v in os.environ.items() if not k.startswith(("AZURE_OPENAI_", "HF_TOKEN", "LLM_"))}
+    env.update(
+        SERVER_MODE="production",
+        SHARED_STATE_DB=str(Path(tmp) / f"shared_{workers}.sqlite3"),
+        ANALYSIS_JOB_DB=str(Path(tmp) / f"jobs_{workers}.sqlite3"),
+        WORKER_HEARTBEAT_SECONDS="1",
+    )
+    return subprocess.Popen(
+        [sys.executable, "server.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(base: str, workers: int, timeout: float = 60.0) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            health = httpx.get(f"{base}/api/health", timeout=2).json()
+            ready = [w for w in health.get("workers", []) if w["ready"]]
+            if len(ready) >= workers:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{workers} worker(s) not ready after {timeout:.0f}s")
+
+
+async def drive(base: str, seconds: float, concurrency: int) -> Tuple[int, List[float], int]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=30) as client:
+        async def loop() -> None:
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/api/chat-sql", json={"message": "count active records"})
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+                except httpx.HTTPError:
+                    errors += 1
+
+        await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return len(latencies), latencies, errors
+
+
+def client_process(base: str, seconds: float, concurrency: int, results) -> None:
+    results.put(asyncio.run(drive(base, seconds, concurrency)))
+
+
+def context_seen_everywhere(base: str, expected: int, probes: int = 40) -> Tuple[int, int]:
+    """(probes that saw `expected` context items, total probes); new connections spread over workers."""
+    seen = 0
+    for _ in range(probes):
+        if httpx.get(f"{base}/api/health", timeout=5).json().get("context_items") == expected:
+            seen += 1
+    return seen, probes
+
+
+def run(workers: int, args, tmp: str) -> Dict[str, float]:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    proc = start_server(workers, port, tmp)
+    try:
+        ready_seconds = wait_ready(base, workers)
+        csv = "id,amount,status\n" + "".join(f"{i},{i * 1.5},active\n" for i in range(1000))
+        httpx.post(f"{base}/api/context/upload", files={"files": ("bench.csv", csv.encode())}, timeout=30)
+        seen, probes = context_seen_everywhere(base, expected=1)
+
+        results = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(target=client_process, args=(base, args.seconds, args.concurrency, results))
+            for _ in range(args.clients)
+        ]
+        for client in clients:
+            client.start()
+        collected = [results.get() for _ in clients]
+        for client in clients:
+            client.join()
+
+        requests = sum(c[0] for c in collected)
+        latencies = sorted(latency for c in collected for latency in c[1])
+        errors = sum(c[2] for c in collected)
+        return {
+            "workers": workers,
+            "ready_s": ready_seconds,
+            "rps": requests / args.seconds,
+            "p50_ms": statistics.median(latencies) * 1000 if latencies else float("nan"),
+            "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else float("nan"),
+            "errors": errors,
+            "consistent": f"{seen}/{probes}",
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4,8", help="comma-separated worker counts")
+    parser.add_argument("--seconds", type=float, default=10.0, help="load duration per worker count")
+    parser.add_argument("--clients", type=int, default=4, help="client processes generating load")
+    parser.add_argument("--concurrency", type=int, default=32, help="in-flight requests per client process")
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'ready s':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'context seen':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in (int(w) for w in args.workers.split(",")):
+            r = run(workers, args, tmp)
+            print(
+                f"{r['workers']:>7} {r['ready_s']:8.2f} {r['rps']:9.0f} {r['p50_ms']:8.1f} "
+                f"{r['p99_ms']:8.1f} {r['errors']:>7} {r['consistent']:>13}"
+            )
+
+
+if __name__ == "__main__":
+    main()
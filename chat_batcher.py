@@ -0,0 +1,98 @@
+"""
+Micro-batching of chat-sql questions that target the same uploaded context.
+
+Questions arriving within `window_ms` of each other for the same context fingerprint are
+sent to the model as one multi-question prompt. The model answers with a JSON array and
+each waiting request receives its own element. A batch is flushed early once it reaches
+`max_batch` questions.
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import STRUCTURED_OUTPUT
+from structured_output import extract_json
+
+# (context, questions) -> one answer dict (or None) per question, in order
+BatchRunner = Callable[[Any, List[str]], List[Optional[Dict[str, Any]]]]
+
+
+def build_batch_question(questions: List[str]) -> str:
+    """The varying tail of a batched prompt; the data context is sent ahead of it."""
+    numbered = "\n".join(f"{i}. {q}" for i, q in enumerate(questions))
+    return f"""Answer each of the following user requests independently:
+{numbered}
+
+Return a JSON array with exactly {len(questions)} objects, in the same order, each with fields
+"index" (the request number), "sqlQuery" and "description".
+Format strictly as JSON."""
+
+
+def parse_batch_response(content: str, count: int) -> List[Optional[Dict[str, Any]]]:
+    """Map a JSON array response back to question slots; unusable slots come back as None."""
+    answers: List[Optional[Dict[str, Any]]] = [None] * count
+    items = extract_json(content)
+    if isinstance(items, dict):
+        # json_object-style wrappers such as {"answers": [...]}
+        items = next((v for v in items.values() if isinstance(v, list)), None)
+    if not isinstance(items, list):
+        STRUCTURED_OUTPUT.inc(task="chat_sql_batch", outcome="failed")
+        return answers
+    STRUCTURED_OUTPUT.inc(task="chat_sql_batch", outcome="json")
+
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        try:
+            # models sometimes quote the request number ("index": "1")
+            index = int(item.get("index", position))
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < count and answers[index] is None:
+            answers[index] = item
+    return answers
+
+
+class ChatSqlBatcher:
+    def __init__(self, run_batch: BatchRunner, window_ms: float = 50.0, max_batch: int = 8):
+        self._run_batch = run_batch
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._pending: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
+        self._contexts: Dict[str, Any] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+
+    async def submit(self, context_key: str, context: Any, question: str) -> Optional[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.setdefault(context_key, [])
+        batch.append((question, future))
+        self._contexts[context_key] = context
+
+        if len(batch) >= self.max_batch:
+            self._flush(context_key)
+        elif context_key not in self._timers:
+            self._timers[context_key] = loop.call_later(self.window, self._flush, context_key)
+        return await future
+
+    def _flush(self, context_key: str) -> None:
+        timer = self._timers.pop(context_key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(context_key, [])
+        context = self._contexts.pop(context_key, None)
+        if batch:
+            asyncio.ensure_future(self._execute(context, batch))
+
+    async def _execute(self, context: Any, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        questions = [q for q, _ in batch]
+        try:
+            answers = await asyncio.to_thread(self._run_batch, context, questions)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for i, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result(answers[i] if i < len(answers) else None)
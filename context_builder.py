@@ -0,0 +1,304 @@
+"""
+Shared sheet-context builder used by the server, the Streamlit app and the CLI analyzers.
+
+Each parsed sheet becomes a plain dict (file, sheet, columns, sample_data, ...) that is
+serialised into the LLM prompt. A per-sheet fingerprint is attached so callers can tell
+which sheets changed between two uploads of the same workbook.
+
+`read_sheets` / `build_file_profiles` accept Excel workbooks, CSV and Parquet files. The
+format is detected from the extension (or the leading bytes), and CSV/Parquet use
+pyarrow, with Arrow-backed dtypes, when it is installed.
+
+With `profile_only=True` only what the prompt uses is read: the header first, then at most
+PROFILE_SAMPLE_ROWS rows of at most PROFILE_MAX_COLUMNS columns (`usecols` / `nrows`).
+The true row count comes from sheet metadata and is kept in `df.attrs["total_rows"]`;
+statistics are computed over the sampled rows. Formula-heavy and image-only (no cell
+data) Excel sheets are skipped.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import zipfile
+from pathlib import Path
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from metrics import observe_stage
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from sheet_profile import SheetProfile
+
+# pandas, pyarrow and openpyxl are imported on first use so importing this module (and the
+# server, which imports it) stays cheap
+HAVE_PYARROW = find_spec("pyarrow") is not None
+
+EXCEL_SUFFIXES = (".xlsx", ".xlsm", ".xls")
+CSV_SUFFIXES = (".csv", ".tsv", ".txt")
+PARQUET_SUFFIXES = (".parquet", ".pq")
+
+# Rows per chunk when CSVs are read without pyarrow
+CSV_CHUNK_ROWS = int(os.environ.get("CSV_CHUNK_ROWS", "200000"))
+
+# Profile-only reads
+PROFILE_SAMPLE_ROWS = int(os.environ.get("PROFILE_SAMPLE_ROWS", "1000"))
+PROFILE_MAX_COLUMNS = int(os.environ.get("PROFILE_MAX_COLUMNS", "200"))
+# Share of non-empty cells that are formulas above which a sheet is skipped
+PROFILE_FORMULA_SKIP_RATIO = float(os.environ.get("PROFILE_FORMULA_SKIP_RATIO", "0.5"))
+
+logger = logging.getLogger(__name__)
+
+Source = Union[str, Path, BinaryIO]
+
+
+def detect_format(file_name: str, source: Optional[Source] = None) -> str:
+    """'excel', 'csv' or 'parquet', from the extension or, failing that, the magic bytes."""
+    suffix = Path(file_name).suffix.lower()
+    if suffix in EXCEL_SUFFIXES:
+        return "excel"
+    if suffix in CSV_SUFFIXES:
+        return "csv"
+    if suffix in PARQUET_SUFFIXES:
+        return "parquet"
+
+    head = b""
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as fh:
+            head = fh.read(8)
+    elif source is not None:
+        position = source.tell()
+        head = source.read(8)
+        source.seek(position)
+    if head.startswith(b"PAR1"):
+        return "parquet"
+    # xlsx is a zip archive, xls an OLE2 compound document
+    if head.startswith(b"PK\x03\x04") or head.startswith(b"\xd0\xcf\x11\xe0"):
+        return "excel"
+    return "csv"
+
+
+def _read_csv(source: Source, file_name: str, columns: Optional[Sequence[Any]] = None) -> "pd.DataFrame":
+    import pandas as pd
+
+    sep = "\t" if Path(file_name).suffix.lower() == ".tsv" else ","
+    if HAVE_PYARROW:
+        # Multithreaded Arrow parser; Arrow-backed columns avoid object-dtype strings
+        return pd.read_csv(source, sep=sep, usecols=columns, engine="pyarrow", dtype_backend="pyarrow")
+    chunks = pd.read_csv(source, sep=sep, usecols=columns, chunksize=CSV_CHUNK_ROWS, low_memory=False)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _read_parquet(source: Source, columns: Optional[Sequence[Any]] = None) -> "pd.DataFrame":
+    import pandas as pd
+
+    # Column projection happens in the Parquet reader, so unused columns are never decoded
+    if HAVE_PYARROW:
+        return pd.read_parquet(source, columns=columns, engine="pyarrow", dtype_backend="pyarrow")
+    return pd.read_parquet(source, columns=columns)
+
+
+def _rewind(source: Source) -> None:
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def _count_csv_rows(source: Source) -> int:
+    """Data rows in a CSV, counted as newlines without parsing (quoted newlines count too)."""
+    fh = open(source, "rb") if isinstance(source, (str, Path)) else source
+    try:
+        _rewind(fh)
+        lines, last = 0, b"\n"
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+        if last != b"\n":
+            lines += 1
+        return max(lines - 1, 0)
+    finally:
+        if fh is not source:
+            fh.close()
+        else:
+            _rewind(fh)
+
+
+def _inspect_xlsx(source: Source) -> Dict[str, Tuple[Optional[int], Optional[str]]]:
+    """Per sheet: (data rows from the sheet dimension, reason to skip it or None)."""
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    _rewind(source)
+    try:
+        # data_only=False keeps formulas as "=..." strings so they can be counted
+        workbook = load_workbook(source, read_only=True, data_only=False)
+    except (zipfile.BadZipFile, InvalidFileException):
+        # Legacy .xls without its extension; pandas picks the xlrd engine itself
+        _rewind(source)
+        return {}
+    result: Dict[str, Tuple[Optional[int], Optional[str]]] = {}
+    try:
+        for name in workbook.sheetnames:
+            sheet = workbook[name]
+            if not hasattr(sheet, "iter_rows"):
+                result[name] = (0, "chart sheet")
+                continue
+            cells = formulas = 0
+            for row in sheet.iter_rows(max_row=PROFILE_SAMPLE_ROWS + 1, values_only=True):
+                for value in row:
+                    if value is None:
+                        continue
+                    cells += 1
+                    if isinstance(value, str) and value.startswith("="):
+                        formulas += 1
+            reason = None
+            if cells == 0:
+                reason = "no cell data (image-only or empty)"
+            elif formulas / cells > PROFILE_FORMULA_SKIP_RATIO:
+                reason = f"formula-heavy ({formulas}/{cells} cells are formulas)"
+            if sheet.max_row is None:
+                sheet.calculate_dimension(force=True)
+            result[name] = (max((sheet.max_row or 1) - 1, 0), reason)
+    finally:
+        workbook.close()
+        _rewind(source)
+    return result
+
+
+def _profile_columns(header: "pd.DataFrame") -> List[int]:
+    return list(range(min(len(header.columns), PROFILE_MAX_COLUMNS)))
+
+
+def _read_excel_profiles(source: Source, file_name: str) -> Iterator[Tuple[str, "pd.DataFrame"]]:
+    import pandas as pd
+
+    with observe_stage("parse"):
+        inspected = _inspect_xlsx(source) if Path(file_name).suffix.lower() != ".xls" else {}
+        excel_file = pd.ExcelFile(source)
+    for sheet_name in excel_file.sheet_names:
+        total_rows, skip_reason = inspected.get(sheet_name, (None, None))
+        if skip_reason:
+            logger.info("skipping sheet %s/%s: %s", file_name, sheet_name, skip_reason)
+            continue
+        with observe_stage("parse"):
+            header = excel_file.parse(sheet_name=sheet_name, nrows=0)
+            df = excel_file.parse(sheet_name=sheet_name, usecols=_profile_columns(header), nrows=PROFILE_SAMPLE_ROWS)
+        if total_rows is None:
+            book = excel_file.book
+            total_rows = book.sheet_by_name(sheet_name).nrows - 1 if hasattr(book, "sheet_by_name") else len(df)
+        df.attrs["total_rows"] = max(int(total_rows), len(df))
+        yield sheet_name, df
+
+
+def _read_csv_profile(source: Source, file_name: str) -> "pd.DataFrame":
+    import pandas as pd
+
+    sep = "\t" if Path(file_name).suffix.lower() == ".tsv" else ","
+    _rewind(source)
+    header = pd.read_csv(source, sep=sep, nrows=0)
+    _rewind(source)
+    df = pd.read_csv(source, sep=sep, usecols=_profile_columns(header), nrows=PROFILE_SAMPLE_ROWS)
+    df.attrs["total_rows"] = max(_count_csv_rows(source), len(df))
+    return df
+
+
+def _read_parquet_profile(source: Source) -> "pd.DataFrame":
+    import pandas as pd
+
+    if not HAVE_PYARROW:
+        df = _read_parquet(source)
+        sample = df.head(PROFILE_SAMPLE_ROWS).copy()
+        sample.attrs["total_rows"] = len(df)
+        return sample
+
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(source)
+    columns = parquet_file.schema_arrow.names[:PROFILE_MAX_COLUMNS]
+    # Only the first batch of the projected columns is decoded
+    batch = next(parquet_file.iter_batches(batch_size=PROFILE_SAMPLE_ROWS, columns=columns), None)
+    if batch is None:
+        df = parquet_file.schema_arrow.empty_table().select(columns).to_pandas(types_mapper=pd.ArrowDtype)
+    else:
+        df = batch.to_pandas(types_mapper=pd.ArrowDtype)
+    df.attrs["total_rows"] = parquet_file.metadata.num_rows
+    return df
+
+
+def read_sheets(source: Source, file_name: str, profile_only: bool = False) -> Iterator[Tuple[str, "pd.DataFrame"]]:
+    """Yield (sheet name, DataFrame) for every sheet of an Excel, CSV or Parquet file.
+
+    CSV and Parquet files have a single sheet named after the file stem. With
+    `profile_only` the frames are row/column-limited samples (see module docstring).
+    """
+    import pandas as pd
+
+    fmt = detect_format(file_name, source)
+    if fmt == "excel":
+        if profile_only:
+            yield from _read_excel_profiles(source, file_name)
+            return
+        with observe_stage("parse"):
+            excel_file = pd.ExcelFile(source)
+        for sheet_name in excel_file.sheet_names:
+            with observe_stage("parse"):
+                df = excel_file.parse(sheet_name=sheet_name)
+            yield sheet_name, df
+        return
+
+    with observe_stage("parse"):
+        if profile_only:
+            df = _read_parquet_profile(source) if fmt == "parquet" else _read_csv_profile(source, file_name)
+        else:
+            df = _read_parquet(source) if fmt == "parquet" else _read_csv(source, file_name)
+    yield Path(file_name).stem, df
+
+
+def sheet_fingerprint(df: "pd.DataFrame") -> Dict[str, str]:
+    """Return a schema hash (column names + dtypes) and a content hash for a sheet."""
+    import pandas as pd
+
+    schema = "\x1f".join(f"{col}:{dtype}" for col, dtype in zip(df.columns.astype(str), df.dtypes.astype(str)))
+    schema_hash = hashlib.sha256(schema.encode("utf-8")).hexdigest()[:16]
+
+    content = hashlib.sha256()
+    if len(df) > 0:
+        # Row hashes are order-sensitive, so a moved row counts as a change
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        content.update(row_hashes.tobytes())
+    if "total_rows" in df.attrs:
+        # Profile-only reads hash the sampled rows; the row count catches appended data
+        content.update(f"rows={df.attrs['total_rows']}".encode("ascii"))
+    content.update(schema_hash.encode("ascii"))
+    return {"schema": schema_hash, "content": content.hexdigest()[:16]}
+
+
+def build_sheet_profile(file_name: str, sheet_name: str, df: "pd.DataFrame") -> "SheetProfile":
+    """Compact typed profile of one sheet; reads like the legacy context dict."""
+    from sheet_profile import SheetProfile
+
+    with observe_stage("profile"):
+        return SheetProfile.from_dataframe(file_name, sheet_name, df, sheet_fingerprint(df))
+
+
+def build_file_profiles(source: Source, file_name: str, profile_only: bool = False) -> List["SheetProfile"]:
+    """Profiles of every sheet in an Excel, CSV or Parquet file."""
+    return [
+        build_sheet_profile(file_name, sheet_name, df)
+        for sheet_name, df in read_sheets(source, file_name, profile_only=profile_only)
+    ]
+
+
+def build_sheet_context(file_name: str, sheet_name: str, df: "pd.DataFrame") -> Dict[str, Any]:
+    """Build the structured context dict for one sheet."""
+    return build_sheet_profile(file_name, sheet_name, df).to_dict()
+
+
+def context_fingerprint(data_context: List[Dict[str, Any]]) -> str:
+    """Stable key for a whole parsed context, derived from the per-sheet fingerprints."""
+    parts = [
+        f"{ctx.get('file')}|{ctx.get('sheet')}|{json.dumps(ctx.get('fingerprint') or ctx.get('error'), sort_keys=True)}"
+        for ctx in data_context
+    ]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:32]
@@ -0,0 +1,612 @@
+"""
+Cross-validation of an FRS column mapping workbook against a database spec workbook.
+
+The two describe the same schema from two sides: the FRS mapping has one row per (table,
+column) with its data type, constraint and mapping/relationship; the database spec has one
+row per table with its primary key and relationships (or, for column-level specs, one row
+per column like the mapping). Instead of leaving the model to spot mismatches in 5-row
+samples, every row of both is checked here:
+
+- each side is reduced to catalog frames keyed on normalised (table, column) names (lower
+  case, quotes and schema prefixes dropped, other punctuation collapsed to "_"), with data
+  types reduced to families (int/bigint -> integer, varchar/text -> text, ...),
+- every check is a hash join (`merge(..., indicator=True)`) or hash lookup (`isin`, `map`)
+  on those keys, so the whole comparison is a fixed number of vectorised passes, linear in
+  the number of rows,
+- the findings come back as one DataFrame (check, table, column, detail, file, sheet, row).
+
+Sheets are recognised by their headers (`sheet_role`). A column-level sheet counts as the
+spec side when its file or sheet name says so (spec, schema, ddl, database) and as the
+mapping side otherwise.
+
+`validation_context` turns the findings into a context item for the prompt: counts per
+check plus at most CROSS_VALIDATION_MAX_FINDINGS findings, taken round-robin over checks.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+from context_builder import Source, detect_format
+from metrics import observe_stage
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+MAX_FINDINGS = int(os.environ.get("CROSS_VALIDATION_MAX_FINDINGS", "60"))
+
+CONTEXT_SHEET = "FRS mapping vs database spec cross-validation"
+
+# Check -> what it means, in report order
+CHECKS = {
+    "unmapped_table": "table in the spec with no column mapping",
+    "missing_mapping": "column the spec defines or uses as a key that the mapping lacks",
+    "orphan_column": "mapped column whose table or column the spec does not define",
+    "duplicate_mapping": "the same column mapped more than once",
+    "type_mismatch": "column types differ between spec and mapping, or between a foreign key and its target",
+    "pk_mismatch": "primary key differs between spec and mapping",
+    "relationship_mismatch": "foreign key on one side only, or pointing to different columns",
+    "dangling_reference": "foreign key to a table or column defined nowhere",
+    "unresolved_reference": "column marked FK without a target",
+}
+
+# Header aliases (normalised: lower case, single spaces) of the fields read from each sheet
+FIELDS = {
+    "table": ("table name", "table", "table_name", "entity", "entity name"),
+    "column": ("column name", "column", "column_name", "field name", "field", "attribute"),
+    "type": ("data type", "datatype", "data_type", "type"),
+    "constraint": ("constraint", "constraints", "key", "key type"),
+    "mapping": ("mapping/relationship", "mapping", "relationship", "references", "foreign key"),
+    "primary_key": ("primary key", "primary keys", "pk"),
+    "relationships": ("relationships", "foreign keys"),
+    "required": ("required/optional", "required", "mandatory"),
+    "description": ("description", "comment", "notes"),
+}
+_FIELD_OF = {alias: field for field, aliases in FIELDS.items() for alias in aliases}
+
+_SPEC_NAME_RE = re.compile(r"spec|schema|ddl|database", re.IGNORECASE)
+_MAPPING_NAME_RE = re.compile(r"frs|mapping", re.IGNORECASE)
+
+_TYPE_FAMILIES = {
+    **dict.fromkeys(("int", "integer", "bigint", "smallint", "tinyint", "mediumint", "serial", "bigserial",
+                     "smallserial", "long", "int2", "int4", "int8"), "integer"),
+    **dict.fromkeys(("numeric", "decimal", "number", "float", "double", "double precision", "real", "money",
+                     "float4", "float8"), "decimal"),
+    **dict.fromkeys(("varchar", "nvarchar", "char", "nchar", "text", "string", "str", "character",
+                     "character varying", "varchar2", "nvarchar2", "clob", "tinytext", "mediumtext",
+                     "longtext", "citext"), "text"),
+    **dict.fromkeys(("bool", "boolean", "bit"), "boolean"),
+    **dict.fromkeys(("datetime", "datetime2", "smalldatetime", "datetimeoffset", "timestamp", "timestamptz",
+                     "timestamp with time zone", "timestamp without time zone"), "datetime"),
+    **dict.fromkeys(("uuid", "uniqueidentifier", "guid"), "uuid"),
+    **dict.fromkeys(("json", "jsonb"), "json"),
+    **dict.fromkeys(("blob", "binary", "varbinary", "bytea", "longblob"), "binary"),
+}
+
+_QUOTES = r"[`\"\[\]]"
+_NAME = r"[\w`\"\[\]]+"
+# "> table.column", "-> schema.table.column", "references table(column)"
+_TARGET = rf"(?:->|>|→|\breferences?\b|\brefers to\b)\s*:?\s*((?:{_NAME}\.)*{_NAME})\s*(?:\(\s*({_NAME})\s*\))?"
+# "column > table.column" items of a table-level Relationships cell
+_RELATIONSHIP = rf"({_NAME})\s*{_TARGET}"
+_PK_FLAG = r"\bpk\b|primary"
+_FK_FLAG = r"\bfk\b|foreign"
+_UNIQUE_FLAG = r"\bunique\b|\buk\b|\bpk\b|primary"
+_REQUIRED_FLAG = r"^\s*(?:required|mandatory|yes|y|true|not null)\b"
+
+KEYS = ["table", "column"]
+FINDING_COLUMNS = ["check", "table", "column", "detail", "file", "sheet", "row"]
+
+
+@dataclass
+class CatalogSheet:
+    __slots__ = ("file", "sheet", "role", "frame")
+
+    file: str
+    sheet: str
+    # "mapping" or "spec"
+    role: str
+    # The recognised fields (columns named after FIELDS keys) as strings, plus the sheet "row"
+    frame: "pd.DataFrame"
+
+
+def _header(name: Any) -> str:
+    return " ".join(str(name).strip().lower().split())
+
+
+def sheet_role(columns: Iterable[Any], name: str = "") -> Optional[str]:
+    """"mapping", "spec" or None for a sheet with these headers; `name` is its file and sheet name."""
+    fields = {_FIELD_OF.get(_header(column)) for column in columns}
+    if "table" not in fields:
+        return None
+    if "column" not in fields:
+        return "spec" if fields & {"primary_key", "relationships"} else None
+    return "spec" if _SPEC_NAME_RE.search(name) and not _MAPPING_NAME_RE.search(name) else "mapping"
+
+
+def catalog_role(item: Any) -> Optional[str]:
+    """sheet_role of a parsed context item (profile or dict), None for errors."""
+    if "error" in item:
+        return None
+    return sheet_role(item.get("columns") or [], f"{item.get('file')} {item.get('sheet')}")
+
+
+def catalog_sheet(file_name: str, sheet_name: str, df: "pd.DataFrame") -> Optional[CatalogSheet]:
+    """The recognised fields of one sheet, or None when it is neither a mapping nor a spec sheet."""
+    role = sheet_role(df.columns, f"{file_name} {sheet_name}")
+    if role is None:
+        return None
+    selected: Dict[str, Any] = {}
+    for column in df.columns:
+        field = _FIELD_OF.get(_header(column))
+        if field is not None and field not in selected:
+            selected[field] = column
+    frame = df[list(selected.values())].copy()
+    frame.columns = list(selected)
+    frame = frame.astype(object).where(frame.notna(), "").astype(str)
+    # Spreadsheet row of each record (header on row 1)
+    frame["row"] = range(2, len(frame) + 2)
+    return CatalogSheet(file_name, sheet_name, role, frame)
+
+
+def read_catalog_sheets(source: Source, file_name: str) -> List[CatalogSheet]:
+    """Mapping and spec sheets of an Excel, CSV or Parquet file, all rows, recognised columns only."""
+    import pandas as pd
+
+    def wanted(column: Any) -> bool:
+        return _header(column) in _FIELD_OF
+
+    def rewind() -> None:
+        if hasattr(source, "seek"):
+            source.seek(0)
+
+    sheets: List[CatalogSheet] = []
+    fmt = detect_format(file_name, source)
+    with observe_stage("parse"):
+        if fmt == "excel":
+            rewind()
+            excel_file = pd.ExcelFile(source)
+            for sheet_name in excel_file.sheet_names:
+                header = excel_file.parse(sheet_name=sheet_name, nrows=0)
+                if sheet_role(header.columns, f"{file_name} {sheet_name}") is None:
+                    continue
+                sheet = catalog_sheet(file_name, sheet_name, excel_file.parse(sheet_name=sheet_name, usecols=wanted, dtype=str))
+                if sheet is not None:
+                    sheets.append(sheet)
+            return sheets
+        rewind()
+        if fmt == "parquet":
+            df = pd.read_parquet(source)
+        else:
+            sep = "\t" if Path(file_name).suffix.lower() == ".tsv" else ","
+            df = pd.read_csv(source, sep=sep, usecols=wanted, dtype=str)
+        rewind()
+    sheet = catalog_sheet(file_name, Path(file_name).stem, df)
+    return [sheet] if sheet is not None else []
+
+
+# -- normalisation ------------------------------------------------------------
+
+
+def _distinct(normalise: Callable[["pd.Series"], Any]) -> Callable[["pd.Series"], Any]:
+    """Run a Series -> Series/DataFrame normalisation once per distinct value and broadcast it back.
+
+    Table names, types, constraints and mapping texts repeat across many rows, and pandas
+    string methods on object columns are a Python call per element.
+    """
+
+    @functools.wraps(normalise)
+    def wrapper(values: "pd.Series") -> Any:
+        import pandas as pd
+
+        codes, uniques = pd.factorize(values.fillna(""))
+        result = normalise(pd.Series(uniques, dtype=object)).take(codes)
+        result.index = values.index
+        return result
+
+    return wrapper
+
+
+def normalise_name(name: Any) -> str:
+    """Identifier key: lower case, quotes dropped, other punctuation and spaces as '_'."""
+    name = re.sub(_QUOTES, "", str(name).lower())
+    return re.sub(r"[^0-9a-z_.]+", "_", name).strip("_.")
+
+
+def normalise_table(name: Any) -> str:
+    """normalise_name without a schema prefix."""
+    return normalise_name(name).rsplit(".", 1)[-1]
+
+
+@_distinct
+def _names(values: "pd.Series") -> "pd.Series":
+    return values.map(normalise_name)
+
+
+@_distinct
+def _tables(values: "pd.Series") -> "pd.Series":
+    return values.map(normalise_table)
+
+
+def type_family(declared: str) -> str:
+    """Family of a declared column type (varchar(50) -> text); unknown types stay as their base name."""
+    base = " ".join(re.sub(r"\(.*$|\bunsigned\b", "", str(declared).lower()).split())
+    return _TYPE_FAMILIES.get(base, base)
+
+
+@_distinct
+def _families(values: "pd.Series") -> "pd.Series":
+    return values.map(type_family)
+
+
+@_distinct
+def _is_pk(values: "pd.Series") -> "pd.Series":
+    return values.astype(str).str.contains(_PK_FLAG, case=False, regex=True)
+
+
+@_distinct
+def _is_fk(values: "pd.Series") -> "pd.Series":
+    return values.astype(str).str.contains(_FK_FLAG, case=False, regex=True)
+
+
+@_distinct
+def _is_unique(values: "pd.Series") -> "pd.Series":
+    return values.astype(str).str.contains(_UNIQUE_FLAG, case=False, regex=True)
+
+
+@_distinct
+def _is_required(values: "pd.Series") -> "pd.Series":
+    return values.astype(str).str.contains(_REQUIRED_FLAG, case=False, regex=True)
+
+
+def _targets(path: "pd.Series", parenthesised: "pd.Series") -> "pd.DataFrame":
+    """(ref_table, ref_column) from "schema.table.column" or "table(column)" matches; column '' when absent."""
+    import pandas as pd
+
+    path = path.fillna("")
+    parenthesised = parenthesised.fillna("")
+    dotted = path.str.contains(".", regex=False) & (parenthesised == "")
+    split = path.str.rsplit(".", n=1)
+    table = path.where(~dotted, split.str[0])
+    column = parenthesised.where(~dotted, split.str[-1])
+    return pd.DataFrame({"ref_table": _tables(table), "ref_column": _names(column)}, index=path.index)
+
+
+@_distinct
+def _mapping_targets(values: "pd.Series") -> "pd.DataFrame":
+    """Foreign key target named in each mapping/relationship cell ('' columns when there is none)."""
+    found = values.astype(str).str.extract(_TARGET, flags=re.IGNORECASE)
+    return _targets(found[0], found[1])
+
+
+class Catalog:
+    """Normalised catalog frames of some sheets (one side of the comparison), concatenated.
+
+    `columns` has one row per mapped column (table, column, type, family, pk, fk, unique,
+    required, description and its source), `tables` one per table, `pks` the primary key
+    columns and `fks` the foreign keys (table, column, ref_table, ref_column).
+    """
+
+    def __init__(self, sheets: Sequence[CatalogSheet]):
+        import pandas as pd
+
+        column_frames, table_frames, pk_frames, fk_frames = [], [], [], []
+        for sheet in sheets:
+            frame = sheet.frame
+            source = {"file": sheet.file, "sheet": sheet.sheet, "row": frame["row"].to_numpy()}
+            if "table" not in frame:
+                continue
+            table = _tables(frame["table"])
+            table_frames.append(pd.DataFrame({"table": table, **source}))
+            if "column" in frame:
+                blank = pd.Series("", index=frame.index)
+                constraint = frame["constraint"] if "constraint" in frame else blank
+                columns = pd.DataFrame({
+                    "table": table,
+                    "column": _names(frame["column"]),
+                    "type": frame["type"].str.strip() if "type" in frame else "",
+                    "family": _families(frame["type"]) if "type" in frame else "",
+                    "pk": _is_pk(constraint),
+                    "fk": _is_fk(constraint),
+                    "unique": _is_unique(constraint),
+                    # Unknown (no Required/Optional column) counts as optional
+                    "required": _is_required(frame["required"]) if "required" in frame else False,
+                    "description": frame["description"] if "description" in frame else blank,
+                    **source,
+                })
+                columns = columns[(columns["table"] != "") & (columns["column"] != "")]
+                column_frames.append(columns)
+                pk_frames.append(columns.loc[columns["pk"], KEYS])
+                if "mapping" in frame:
+                    targets = _mapping_targets(frame["mapping"])
+                    fk = pd.concat([columns[KEYS + ["file", "sheet", "row"]], targets.loc[columns.index]], axis=1)
+                    fk_frames.append(fk[fk["ref_table"] != ""])
+            if "primary_key" in frame:
+                pk = pd.DataFrame({"table": table, "column": frame["primary_key"].str.split(r"[,;/+&]|\band\b")})
+                pk = pk.explode("column")
+                pk["column"] = _names(pk["column"].str.replace(r"[()]", "", regex=True))
+                pk_frames.append(pk[(pk["table"] != "") & (pk["column"] != "")])
+            if "relationships" in frame:
+                found = frame["relationships"].str.extractall(_RELATIONSHIP, flags=re.IGNORECASE)
+                if len(found):
+                    rows = found.index.get_level_values(0)
+                    fk = _targets(found[1], found[2]).reset_index(drop=True)
+                    fk.insert(0, "column", _names(found[0]).to_numpy())
+                    fk.insert(0, "table", table.loc[rows].to_numpy())
+                    fk["file"], fk["sheet"], fk["row"] = sheet.file, sheet.sheet, frame["row"].loc[rows].to_numpy()
+                    fk_frames.append(fk[fk["table"] != ""])
+
+        def concat(frames: List["pd.DataFrame"], columns: List[str]) -> "pd.DataFrame":
+            frames = [frame for frame in frames if len(frame)]
+            return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+        self.columns = concat(column_frames, KEYS + ["type", "family", "pk", "fk", "unique", "required", "description",
+                                                     "file", "sheet", "row"])
+        self.tables = concat(table_frames, ["table", "file", "sheet", "row"])
+        self.tables = self.tables[self.tables["table"] != ""].drop_duplicates("table")
+        self.pks = concat(pk_frames, KEYS).drop_duplicates(KEYS)
+        self.fks = concat(fk_frames, KEYS + ["ref_table", "ref_column", "file", "sheet", "row"])
+        self.fks = self.fks.drop_duplicates(KEYS + ["ref_table", "ref_column"])
+
+
+def resolve_bare_targets(catalogs: Sequence[Catalog]) -> None:
+    """Point bare "> table" foreign keys at that table's primary key, when it is a single column."""
+    import pandas as pd
+
+    pks = pd.concat([frame for catalog in catalogs
+                     for frame in (catalog.pks, catalog.columns.loc[catalog.columns["pk"].astype(bool), KEYS])])
+    pks = pks.drop_duplicates(KEYS)
+    single_pk = pks[pks["table"].map(pks["table"].value_counts()) == 1].set_index("table")["column"]
+    for catalog in catalogs:
+        bare = catalog.fks["ref_column"] == ""
+        catalog.fks.loc[bare, "ref_column"] = catalog.fks.loc[bare, "ref_table"].map(single_pk).fillna("")
+
+
+class _KeyIndex:
+    """Dense int64 codes for the normalised names of both sides, so joins and lookups hash integers.
+
+    A (table, column) pair is `table code * width + column code`; a table alone is its code.
+    """
+
+    def __init__(self, catalogs: Sequence[Catalog]):
+        import pandas as pd
+
+        tables, columns = [], []
+        for catalog in catalogs:
+            tables += [catalog.columns["table"], catalog.tables["table"], catalog.pks["table"],
+                       catalog.fks["table"], catalog.fks["ref_table"]]
+            columns += [catalog.columns["column"], catalog.pks["column"], catalog.fks["column"],
+                        catalog.fks["ref_column"]]
+        self.tables = pd.Index(pd.concat(tables, ignore_index=True).astype(object).unique())
+        self.columns = pd.Index(pd.concat(columns, ignore_index=True).astype(object).unique())
+        self.width = max(len(self.columns), 1)
+
+    def table(self, names: "pd.Series") -> "np.ndarray":
+        return self.tables.get_indexer(names).astype("int64")
+
+    def key(self, tables: "pd.Series", columns: "pd.Series") -> "np.ndarray":
+        return self.table(tables) * self.width + self.columns.get_indexer(columns)
+
+    def encode(self, catalog: Catalog) -> None:
+        catalog.columns["key"] = self.key(catalog.columns["table"], catalog.columns["column"])
+        catalog.tables["t"] = self.table(catalog.tables["table"])
+        catalog.pks["t"] = self.table(catalog.pks["table"])
+        catalog.pks["key"] = self.key(catalog.pks["table"], catalog.pks["column"])
+        catalog.fks["key"] = self.key(catalog.fks["table"], catalog.fks["column"])
+        catalog.fks["ref_t"] = self.table(catalog.fks["ref_table"])
+        catalog.fks["ref_key"] = self.key(catalog.fks["ref_table"], catalog.fks["ref_column"])
+
+    def label(self, keys: "pd.Series") -> "pd.Series":
+        """ "table.column" for each key ('?' for a missing column)."""
+        import pandas as pd
+
+        keys = keys.to_numpy(dtype="int64")
+        columns = pd.Series(self.columns.take(keys % self.width), index=range(len(keys)), dtype=object)
+        tables = pd.Series(self.tables.take(keys // self.width), index=range(len(keys)), dtype=object)
+        return (tables + "." + columns.where(columns != "", "?")).to_numpy()
+
+    def findings(self, check: str, frame: "pd.DataFrame", detail: Union["pd.Series", str]) -> "pd.DataFrame":
+        """Finding rows for `frame`, which has a "key" column or, for table-level findings, a "t" column."""
+        import pandas as pd
+
+        if "key" in frame:
+            keys = frame["key"].to_numpy(dtype="int64")
+            tables, columns = self.tables.take(keys // self.width), self.columns.take(keys % self.width)
+        else:
+            tables, columns = self.tables.take(frame["t"].to_numpy(dtype="int64")), ""
+        return pd.DataFrame({
+            "check": check,
+            "table": tables,
+            "column": columns,
+            "detail": detail.to_numpy() if isinstance(detail, pd.Series) else detail,
+            **{name: frame[name].to_numpy() if name in frame else None for name in ("file", "sheet", "row")},
+        })
+
+
+def cross_validate(sheets: Sequence[CatalogSheet]) -> "pd.DataFrame":
+    """Findings (FINDING_COLUMNS) of comparing the mapping sheets against the spec sheets."""
+    import pandas as pd
+
+    with observe_stage("cross_validation"):
+        mapping = Catalog([sheet for sheet in sheets if sheet.role == "mapping"])
+        spec = Catalog([sheet for sheet in sheets if sheet.role == "spec"])
+
+        resolve_bare_targets([mapping, spec])
+
+        index = _KeyIndex([mapping, spec])
+        index.encode(mapping)
+        index.encode(spec)
+        width = index.width
+        mapped = mapping.columns
+        found: List[pd.DataFrame] = []
+
+        duplicated = mapped.duplicated("key")
+        first_row = mapped.groupby("key", sort=False)["row"].transform("first")
+        found.append(index.findings("duplicate_mapping", mapped[duplicated],
+                                    "mapped again (first at row " + first_row[duplicated].astype(str) + ")"))
+        mapped = mapped[~duplicated]
+        mapped_t = mapped["key"] // width
+        spec_t = spec.columns["key"] // width
+
+        mapped_tables = pd.Index(mapped_t.unique())
+        spec_column_tables = pd.Index(spec_t.unique())
+        spec_tables = pd.Index(spec.tables["t"].unique()).union(spec_column_tables)
+        unmapped = spec.tables[~spec.tables["t"].isin(mapped_tables)]
+        found.append(index.findings("unmapped_table", unmapped, "no column of this table is mapped"))
+
+        # Column-level specs: one outer join on the (table, column) key
+        fields = ["key", "type", "family", "file", "sheet", "row"]
+        joined = spec.columns.drop_duplicates("key")[fields].merge(
+            mapped[fields], on="key", how="outer", suffixes=("_spec", ""), indicator=True
+        )
+        joined_t = joined["key"] // width
+        missing = joined[(joined["_merge"] == "left_only") & joined_t.isin(mapped_tables)]
+        missing = missing.assign(file=missing["file_spec"], sheet=missing["sheet_spec"], row=missing["row_spec"])
+        found.append(index.findings("missing_mapping", missing, "defined in the spec, not mapped"))
+        if len(spec_tables):
+            in_spec = joined_t.isin(spec_tables)
+            outside = (joined["_merge"] == "right_only") & (joined_t.isin(spec_column_tables) | ~in_spec)
+            found.append(index.findings("orphan_column", joined[outside], in_spec[outside].map(
+                {True: "column not in the spec", False: "table not in the spec"})))
+        both = joined[joined["_merge"] == "both"]
+        differ = both[(both["family_spec"] != "") & (both["family"] != "") & (both["family_spec"] != both["family"])]
+        found.append(index.findings("type_mismatch", differ,
+                                    "mapping type " + differ["type"] + ", spec type " + differ["type_spec"]))
+
+        # Key columns named by a table-level spec must be mapped too
+        keys = pd.concat([spec.pks[["key"]].assign(detail="spec primary key not mapped"),
+                          spec.fks[["key"]].assign(detail="spec foreign key column not mapped")], ignore_index=True)
+        keys = keys.drop_duplicates("key")
+        keys_t = keys["key"] // width
+        keys = keys[keys_t.isin(mapped_tables) & ~keys_t.isin(spec_column_tables) & ~keys["key"].isin(mapped["key"])]
+        found.append(index.findings("missing_mapping", keys, keys["detail"]))
+
+        # Primary keys, for tables whose spec names one
+        spec_pk = spec.pks.groupby("t")["column"].agg(", ".join)
+        not_flagged = mapped[~mapped["pk"] & mapped["key"].isin(spec.pks["key"])]
+        found.append(index.findings("pk_mismatch", not_flagged, "spec primary key, not marked PK in the mapping"))
+        extra = mapped[mapped["pk"] & mapped_t.isin(spec_pk.index) & ~mapped["key"].isin(spec.pks["key"])]
+        found.append(index.findings("pk_mismatch", extra, "marked PK in the mapping, spec primary key is "
+                                    + (extra["key"] // width).map(spec_pk)))
+
+        # Relationships declared on both sides, for tables both describe
+        if len(spec.fks):
+            shared = mapped_tables.intersection(spec_tables)
+            fields = ["key", "ref_key", "file", "sheet", "row"]
+            relations = spec.fks.loc[(spec.fks["key"] // width).isin(shared), fields].merge(
+                mapping.fks.loc[(mapping.fks["key"] // width).isin(shared), fields],
+                on="key", how="outer", suffixes=("_spec", ""), indicator=True,
+            )
+            only_spec = relations[relations["_merge"] == "left_only"]
+            only_spec = only_spec.assign(file=only_spec["file_spec"], sheet=only_spec["sheet_spec"],
+                                         row=only_spec["row_spec"])
+            found.append(index.findings("relationship_mismatch", only_spec, "spec references "
+                                        + index.label(only_spec["ref_key_spec"]) + ", no foreign key in the mapping"))
+            only_mapping = relations[relations["_merge"] == "right_only"]
+            found.append(index.findings("relationship_mismatch", only_mapping, "mapping references "
+                                        + index.label(only_mapping["ref_key"]) + ", not in the spec"))
+            moved = relations[(relations["_merge"] == "both") & (relations["ref_key_spec"] != relations["ref_key"])]
+            found.append(index.findings("relationship_mismatch", moved, "mapping references "
+                                        + index.label(moved["ref_key"]) + ", spec references "
+                                        + index.label(moved["ref_key_spec"])))
+
+        # Every foreign key target must exist, with the referencing column's type
+        fks = pd.concat([mapping.fks, spec.fks], ignore_index=True).drop_duplicates(["key", "ref_key"])
+        known = pd.Index(pd.concat([mapped["key"], spec.columns["key"], spec.pks["key"]]).unique())
+        known_tables = spec_tables.union(mapped_tables)
+        described = mapped_tables.union(spec_column_tables)
+        unknown_table = ~fks["ref_t"].isin(known_tables)
+        unknown_column = ~unknown_table & ~fks["ref_key"].isin(known) & fks["ref_t"].isin(described)
+        found.append(index.findings("dangling_reference", fks[unknown_table],
+                                    "references unknown table " + fks.loc[unknown_table, "ref_table"]))
+        found.append(index.findings("dangling_reference", fks[unknown_column],
+                                    "references unknown column " + index.label(fks.loc[unknown_column, "ref_key"])))
+        types = pd.concat([mapped[["key", "type", "family"]], spec.columns[["key", "type", "family"]]])
+        types = types.drop_duplicates("key").set_index("key")
+        family = fks["key"].map(types["family"]).fillna("")
+        ref_family = fks["ref_key"].map(types["family"]).fillna("")
+        differ = fks[(family != "") & (ref_family != "") & (family != ref_family)]
+        found.append(index.findings("type_mismatch", differ, differ["key"].map(types["type"]) + " foreign key to "
+                                    + index.label(differ["ref_key"]) + " ("
+                                    + differ["ref_key"].map(types["type"]) + ")"))
+
+        unresolved = mapped[mapped["fk"] & ~mapped["key"].isin(fks["key"])]
+        found.append(index.findings("unresolved_reference", unresolved, "constraint says FK but no target is given"))
+
+        findings = pd.concat(found, ignore_index=True).drop_duplicates(["check", "table", "column", "detail"])
+        order = findings["check"].map({check: i for i, check in enumerate(CHECKS)})
+        findings = findings.assign(_order=order).sort_values(["_order", "table", "column"], kind="stable")
+        return findings.drop(columns="_order").reset_index(drop=True)
+
+
+def format_finding(finding: Dict[str, Any]) -> str:
+    target = f"{finding['table']}.{finding['column']}" if finding.get("column") else finding["table"]
+    source = f" [{finding['file']} / {finding['sheet']} row {finding['row']}]" if finding.get("file") else ""
+    return f"{finding['check']}: {target}: {finding['detail']}{source}"
+
+
+def validation_context(sheets: Sequence[CatalogSheet], max_findings: int = MAX_FINDINGS) -> Optional[Dict[str, Any]]:
+    """Context item with the cross-validation findings, or None without both a mapping and a spec sheet."""
+    roles = {sheet.role for sheet in sheets}
+    if roles != {"mapping", "spec"}:
+        return None
+    findings = cross_validate(sheets)
+    counts = findings["check"].value_counts()
+    # Round-robin over checks so one noisy check cannot crowd out the others
+    rank = findings.groupby("check", sort=False).cumcount()
+    order = findings["check"].map({check: i for i, check in enumerate(CHECKS)})
+    shown = findings.assign(_rank=rank, _order=order).sort_values(["_rank", "_order"], kind="stable")
+    shown = shown.head(max_findings).sort_values(["_order", "table", "column"], kind="stable")
+    lines = [format_finding(finding) for finding in shown.fillna("").to_dict("records")]
+    summary = {
+        "mapping_sheets": sorted(f"{sheet.file} / {sheet.sheet}" for sheet in sheets if sheet.role == "mapping"),
+        "spec_sheets": sorted(f"{sheet.file} / {sheet.sheet}" for sheet in sheets if sheet.role == "spec"),
+        "rows_checked": int(sum(len(sheet.frame) for sheet in sheets)),
+        "counts": {check: int(counts[check]) for check in CHECKS if check in counts},
+        "checks": {check: meaning for check, meaning in CHECKS.items() if check in counts},
+        "findings": lines,
+    }
+    if len(findings) > len(lines):
+        summary["omitted_findings"] = len(findings) - len(lines)
+    content = hashlib.sha256(
+        json.dumps([summary["mapping_sheets"], summary["spec_sheets"], lines, summary["counts"]]).encode("utf-8")
+    ).hexdigest()[:16]
+    return {
+        "file": ", ".join(sorted({sheet.file for sheet in sheets})),
+        "sheet": CONTEXT_SHEET,
+        "cross_validation": summary,
+        "fingerprint": {"schema": "cross_validation", "content": content},
+    }
+
+
+def cross_validate_files(paths: Iterable[Union[str, Path]], max_findings: int = MAX_FINDINGS) -> Optional[Dict[str, Any]]:
+    """validation_context over the mapping and spec sheets of files on disk."""
+    sheets: List[CatalogSheet] = []
+    for path in paths:
+        if os.path.exists(path):
+            sheets.extend(read_catalog_sheets(path, Path(path).name))
+    return validation_context(sheets, max_findings)
+
+
+def findings_text(item: Dict[str, Any]) -> str:
+    """Plain-text form of a validation_context item, for prompts built from text rather than JSON."""
+    summary = item["cross_validation"]
+    lines = [
+        f"=== {CONTEXT_SHEET.upper()} ===",
+        f"Mapping: {', '.join(summary['mapping_sheets'])} | Spec: {', '.join(summary['spec_sheets'])} | "
+        f"rows checked: {summary['rows_checked']}",
+    ]
+    if not summary["counts"]:
+        lines.append("No mismatches found.")
+        return "\n".join(lines)
+    lines.append("Counts: " + ", ".join(f"{check}={count}" for check, count in summary["counts"].items()))
+    lines += [f"- {finding}" for finding in summary["findings"]]
+    if summary.get("omitted_findings"):
+        lines.append(f"... and {summary['omitted_findings']} more findings")
+    return "\n".join(lines)
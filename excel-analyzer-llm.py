@@ -1,48 +1,42 @@
 import os
-import pandas as pd
-from openai import OpenAI, AzureOpenAI
+import argparse
+import hashlib
 import json
 from pathlib import Path
 from dotenv import load_dotenv, find_dotenv
 
+from context_builder import read_sheets
+from cross_validation import cross_validate_files, findings_text
+from llm_client import create_client, resolve_model
+from testcase_export import export_report
+from testcase_store import index_report
+from token_budget import PromptTooLarge, message_tokens, plan_completion
+
 # Load environment variables from .env (search upwards and fallback to repo paths)
 load_dotenv(find_dotenv(usecwd=True), override=False)
 script_dir = Path(__file__).resolve().parent
 load_dotenv(script_dir / ".env", override=False)
 load_dotenv(script_dir.parent / ".env", override=False)
 
-# Client initialization: Prefer Azure OpenAI if configured, else HuggingFace router
-AZURE_ENDPOINT = os.environ.get("AZURE_OPENAI_ENDPOINT")
-AZURE_API_KEY = os.environ.get("AZURE_OPENAI_API_KEY")
-AZURE_API_VERSION = os.environ.get("AZURE_OPENAI_API_VERSION", "2025-01-01-preview")
-AZURE_DEPLOYMENT = os.environ.get("AZURE_OPENAI_DEPLOYMENT")
-
-client = None
-MODEL_NAME = None
-
-if AZURE_ENDPOINT and AZURE_API_KEY and AZURE_DEPLOYMENT:
-    client = AzureOpenAI(
-        azure_endpoint=AZURE_ENDPOINT,
-        api_key=AZURE_API_KEY,
-        api_version=AZURE_API_VERSION,
-    )
-    MODEL_NAME = AZURE_DEPLOYMENT
-    print(f"Using Azure OpenAI | endpoint={AZURE_ENDPOINT} | deployment={AZURE_DEPLOYMENT} | api_version={AZURE_API_VERSION}")
-else:
-    # Initialize the OpenAI client with HuggingFace
-    hf_api_key = os.environ.get("HF_TOKEN")
-    if not hf_api_key:
-        raise RuntimeError(
-            "Missing configuration. Set Azure OpenAI envs (AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_API_KEY, AZURE_OPENAI_DEPLOYMENT) or set HF_TOKEN."
-        )
-    client = OpenAI(
-        base_url="https://router.huggingface.co/v1",
-        api_key=hf_api_key,
-    )
-    MODEL_NAME = "moonshotai/Kimi-K2-Instruct"
-    print(f"Using HuggingFace Inference API | router=https://router.huggingface.co/v1 | model={MODEL_NAME}")
-
-def read_excel_files(file_paths):
+# Prefer Azure OpenAI if configured, otherwise use HuggingFace router. The client (and the
+# OpenAI SDK) is only built once main() has parsed its arguments, so --help stays fast.
+HF_MODEL = "moonshotai/Kimi-K2-Instruct"
+MODEL_NAME, PROVIDER = resolve_model(hf_model=HF_MODEL)
+_client = None
+
+def get_client():
+    """Build the LLM client on first use"""
+    global _client
+    if _client is None:
+        if MODEL_NAME is None:
+            raise RuntimeError(
+                "Missing configuration. Set Azure OpenAI envs (AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_API_KEY, AZURE_OPENAI_DEPLOYMENT) or set HF_TOKEN."
+            )
+        _client = create_client(hf_model=HF_MODEL)[0]
+        print(f"Using {PROVIDER} | model={MODEL_NAME}")
+    return _client
+
+def read_excel_files(file_paths, profile_only=False):
     """Read Excel files and return their content as structured text"""
     all_data = []
 
@@ -55,15 +49,15 @@ def read_excel_files(file_paths):
         file_name = Path(file_path).name
 
         try:
-            # Read all sheets from Excel file
-            excel_file = pd.ExcelFile(file_path)
+            # Read all sheets (Excel workbooks, CSV and Parquet files)
             file_content = f"\n=== FILE: {file_name} ===\n"
 
-            for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
+            for sheet_name, df in read_sheets(file_path, file_name, profile_only=profile_only):
+                # Profile-only reads are a row sample; the real count is kept in attrs
+                num_rows = df.attrs.get("total_rows", len(df))
                 file_content += f"\n--- Sheet: {sheet_name} ---\n"
                 file_content += f"Columns: {', '.join(df.columns.tolist())}\n"
-                file_content += f"Number of rows: {len(df)}\n\n"
+                file_content += f"Number of rows: {num_rows}\n\n"
 
                 # Convert dataframe to string (first 10 rows for preview)
                 if len(df) > 0:
@@ -71,8 +65,8 @@ def read_excel_files(file_paths):
                     file_content += "Data Preview (first 10 rows):\n"
                     file_content += df.head(preview_rows).to_string()
 
-                    if len(df) > 10:
-                        file_content += f"\n... and {len(df) - 10} more rows\n"
+                    if num_rows > 10:
+                        file_content += f"\n... and {num_rows - 10} more rows\n"
 
                 # Add summary statistics for numerical columns
                 numeric_cols = df.select_dtypes(include=['number']).columns
@@ -86,6 +80,15 @@ def read_excel_files(file_paths):
             print(f"Error reading {file_path}: {str(e)}")
             continue
 
+    # Every row of an FRS mapping and a database spec among the files, compared locally
+    try:
+        validation = cross_validate_files(file_paths)
+        if validation is not None:
+            print(f"Cross-validated FRS mapping vs database spec: {sum(validation['cross_validation']['counts'].values())} findings")
+            all_data.append(findings_text(validation))
+    except Exception as e:
+        print(f"Error cross-validating the workbooks: {str(e)}")
+
     return "\n\n".join(all_data)
 
 def analyze_with_llm(excel_content):
@@ -109,23 +112,34 @@ Please provide a comprehensive analysis with:
 
 Format your response in a clear, structured manner with proper headings and numbering."""
 
+    messages = [
+        {
+            "role": "system",
+            "content": "You are a QA expert who creates comprehensive test documentation based on data analysis."
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+    # Check the prompt fits the context window and size the answer before calling the LLM
+    try:
+        plan = plan_completion("analysis", message_tokens(messages), items=excel_content.count("--- Sheet: "))
+    except PromptTooLarge as e:
+        print(f"Error: {e}")
+        print("Try --profile-only or fewer files.")
+        return None
+
     try:
         print("\nSending data to LLM for analysis...")
+        print(f"Prompt: ~{plan.prompt_tokens} tokens | max_tokens: {plan.max_tokens}")
         print("This may take a moment...")
 
-        completion = client.chat.completions.create(
+        completion = get_client().chat.completions.create(
             model=MODEL_NAME,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a QA expert who creates comprehensive test documentation based on data analysis."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            max_tokens=2000,
+            messages=messages,
+            max_tokens=plan.max_tokens,
             temperature=0.7
         )
 
@@ -135,8 +149,8 @@ Format your response in a clear, structured manner with proper headings and numb
         print(f"Error calling LLM: {str(e)}")
         return None
 
-def save_results(analysis, output_file="test_analysis_output.md"):
-    """Save the analysis results to a markdown file"""
+def save_results(analysis, output_file="test_analysis_output.md", excel_content=None):
+    """Save the analysis results to a markdown file and index its test cases"""
     try:
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write("# Excel Data Test Analysis Report\n\n")
@@ -146,10 +160,33 @@ def save_results(analysis, output_file="test_analysis_output.md"):
         print(f"\nResults saved to: {output_file}")
     except Exception as e:
         print(f"Error saving results: {str(e)}")
+    try:
+        # The markdown file is overwritten by the next run; the store keeps every run
+        source_hash = hashlib.sha256(excel_content.encode("utf-8")).hexdigest()[:32] if excel_content else None
+        indexed, duplicates = index_report(analysis, source_hash=source_hash, model=MODEL_NAME, origin="excel-analyzer-llm")
+        print(f"Indexed {indexed} test scenarios, cases and queries for search ({duplicates} near-duplicates of earlier ones)")
+    except Exception as e:
+        print(f"Error indexing test cases: {str(e)}")
 
 def main():
     """Main function to run the Excel analysis"""
 
+    parser = argparse.ArgumentParser(description="Analyze Excel specs with an LLM.")
+    parser.add_argument(
+        "--profile-only",
+        action="store_true",
+        help="Read headers and a row sample only; skip formula-heavy/image-only sheets",
+    )
+    parser.add_argument(
+        "--export",
+        metavar="PATH",
+        help="Also export the test scenarios, cases and SQL to a spreadsheet (.xlsx, one sheet per section, or .csv)",
+    )
+    args = parser.parse_args()
+
+    # Fail fast on missing LLM configuration, before any parsing
+    get_client()
+
     # Define the Excel files to analyze
     # Using the actual Excel files from sample-document folder
     excel_files = [
@@ -179,7 +216,7 @@ def main():
         return
 
     # Read Excel files
-    excel_content = read_excel_files(existing_files)
+    excel_content = read_excel_files(existing_files, profile_only=args.profile_only)
 
     if not excel_content:
         print("No data could be read from the Excel files.")
@@ -195,7 +232,13 @@ def main():
         print(analysis)
 
         # Save results to file
-        save_results(analysis)
+        save_results(analysis, excel_content=excel_content)
+        if args.export:
+            try:
+                counts = export_report(analysis, args.export)
+                print(f"Exported {sum(counts.values())} test artifacts to: {args.export}")
+            except Exception as e:
+                print(f"Error exporting test cases: {str(e)}")
     else:
         print("Failed to get analysis from LLM.")
 
@@ -0,0 +1,90 @@
+"""
+Shared HTTP transport for every LLM provider client.
+
+Building an `OpenAI`/`AzureOpenAI`/`Groq` client per call (or calling `requests.post`
+without a session) opens a new TCP connection, resolves DNS, loads the CA bundle into a
+fresh SSL context and completes a full TLS handshake on every request. `get_http_client()`
+returns one long-lived `httpx.Client` per process instead:
+
+- keep-alive pooling (LLM_HTTP_MAX_CONNECTIONS / LLM_HTTP_MAX_KEEPALIVE, idle connections
+  kept for LLM_HTTP_KEEPALIVE_EXPIRY seconds), so repeat calls to a provider skip DNS,
+  TCP and TLS setup entirely,
+- one SSL context per client, so the CA bundle is loaded once,
+- optional HTTP/2 (LLM_HTTP2=1, needs the `h2` package) to multiplex concurrent calls
+  over a single connection,
+- explicit connect / read / write / pool timeouts (LLM_HTTP_*_TIMEOUT) instead of the
+  SDK default of ten minutes.
+
+Set LLM_HTTP_VERIFY=0 to disable certificate verification (development behind intercepting
+proxies only). httpx is imported on first use so importing this module stays cheap.
+"""
+
+import atexit
+import os
+import threading
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    import httpx
+
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("LLM_HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.environ.get("LLM_HTTP_READ_TIMEOUT", "120"))
+HTTP_WRITE_TIMEOUT = float(os.environ.get("LLM_HTTP_WRITE_TIMEOUT", "30"))
+HTTP_POOL_TIMEOUT = float(os.environ.get("LLM_HTTP_POOL_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("LLM_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("LLM_HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP2_REQUESTED = os.environ.get("LLM_HTTP2", "0") == "1"
+HTTP_VERIFY = os.environ.get("LLM_HTTP_VERIFY", "1") != "0"
+
+HAVE_H2 = find_spec("h2") is not None
+
+# verify flag -> shared client
+_CLIENTS: Dict[bool, "httpx.Client"] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def http2_enabled() -> bool:
+    return HTTP2_REQUESTED and HAVE_H2
+
+
+def http_timeout() -> "httpx.Timeout":
+    import httpx
+
+    return httpx.Timeout(
+        connect=HTTP_CONNECT_TIMEOUT, read=HTTP_READ_TIMEOUT, write=HTTP_WRITE_TIMEOUT, pool=HTTP_POOL_TIMEOUT
+    )
+
+
+def get_http_client(verify: Optional[bool] = None) -> "httpx.Client":
+    """The process-wide pooled client (one per verify setting), created on first use."""
+    verify = HTTP_VERIFY if verify is None else verify
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(verify)
+        if client is None or client.is_closed:
+            import httpx
+
+            client = httpx.Client(
+                http2=http2_enabled(),
+                verify=verify,
+                timeout=http_timeout(),
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                ),
+                follow_redirects=True,
+            )
+            _CLIENTS[verify] = client
+        return client
+
+
+def close_http_clients() -> None:
+    with _CLIENTS_LOCK:
+        for client in _CLIENTS.values():
+            client.close()
+        _CLIENTS.clear()
+
+
+atexit.register(close_http_clients)
@@ -0,0 +1,84 @@
+"""
+Incremental re-analysis: only regenerate the report sections of sheets that changed.
+
+Fragments (the generated analysis for one sheet) are stored on disk next to the sheet
+fingerprint they were generated from. On a new upload, sheets whose fingerprint matches
+the stored one reuse their fragment; added or edited sheets go to the LLM.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import record_cache
+
+DEFAULT_FRAGMENT_DIR = Path("./cache/analysis_fragments")
+
+
+class FragmentStore:
+    """Per-sheet analysis fragments persisted as small JSON files."""
+
+    def __init__(self, root: Optional[Path] = None, namespace: str = "default"):
+        self.root = Path(root or os.environ.get("ANALYSIS_FRAGMENT_DIR") or DEFAULT_FRAGMENT_DIR)
+        self.namespace = namespace
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, file_name: str, sheet_name: str) -> Path:
+        key = f"{self.namespace}\x1f{file_name}\x1f{sheet_name}"
+        return self.root / (hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + ".json")
+
+    def get(self, file_name: str, sheet_name: str, fingerprint: Dict[str, str]) -> Optional[str]:
+        path = self._path(file_name, sheet_name)
+        if not path.exists():
+            return None
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if record.get("fingerprint") != fingerprint:
+            return None
+        return record.get("fragment")
+
+    def put(self, file_name: str, sheet_name: str, fingerprint: Dict[str, str], fragment: str) -> None:
+        record = {"file": file_name, "sheet": sheet_name, "fingerprint": fingerprint, "fragment": fragment}
+        path = self._path(file_name, sheet_name)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(record), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+def run_incremental_analysis(
+    data_context: List[Dict[str, Any]],
+    generate: Callable[[Dict[str, Any]], Optional[str]],
+    store: FragmentStore,
+) -> Tuple[str, Dict[str, int]]:
+    """Assemble a report from per-sheet fragments, calling `generate` only for changed sheets.
+
+    Returns the assembled markdown report and a stats dict with `reused`, `regenerated`
+    and `failed` counts.
+    """
+    stats = {"reused": 0, "regenerated": 0, "failed": 0}
+    sections: List[str] = []
+
+    for ctx in data_context:
+        if "error" in ctx or "fingerprint" not in ctx:
+            continue
+        file_name, sheet_name, fingerprint = ctx["file"], ctx["sheet"], ctx["fingerprint"]
+
+        fragment = store.get(file_name, sheet_name, fingerprint)
+        record_cache("analysis_fragment", fragment is not None)
+        if fragment is not None:
+            stats["reused"] += 1
+        else:
+            fragment = generate(ctx)
+            if not fragment:
+                stats["failed"] += 1
+                continue
+            store.put(file_name, sheet_name, fingerprint, fragment)
+            stats["regenerated"] += 1
+
+        sections.append(f"# {file_name} — {sheet_name}\n\n{fragment.strip()}\n")
+
+    return "\n---\n\n".join(sections), stats
@@ -0,0 +1,229 @@
+"""
+Background job queue for long-running analyses.
+
+Jobs are persisted in SQLite so a restart does not lose queued or interrupted work, and
+executed by a bounded thread pool. Admission control rejects new jobs once the number of
+queued + running jobs reaches `max_queue_depth`, counted across every worker sharing the
+database.
+
+Several worker processes may share one database (WAL mode): a job is claimed atomically by
+the worker that runs it, and its id is recorded so `resume_pending` only re-queues running
+jobs whose worker is gone.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Collection, Dict, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    params TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job handler to stop work after a cancel request."""
+
+
+class JobHandle:
+    """Passed to job handlers so they can report progress and observe cancellation."""
+
+    def __init__(self, queue: "JobQueue", job_id: str):
+        self._queue = queue
+        self.id = job_id
+
+    def report_progress(self, fraction: float) -> None:
+        self._queue._update(self.id, progress=max(0.0, min(1.0, float(fraction))))
+
+    def cancelled(self) -> bool:
+        return self._queue._cancel_requested(self.id)
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled():
+            raise JobCancelled()
+
+
+Handler = Callable[[Dict[str, Any], JobHandle], Any]
+
+
+class JobQueue:
+    def __init__(self, db_path: Path, max_workers: int = 2, max_queue_depth: int = 20):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(_SCHEMA)
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "worker" not in columns:
+            # databases created before jobs recorded their worker
+            self._db.execute("ALTER TABLE jobs ADD COLUMN worker TEXT")
+        self._db.commit()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._handlers: Dict[str, Handler] = {}
+        self._futures: Dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis-job")
+        self.max_queue_depth = max_queue_depth
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            # The count and the insert share one write transaction, so workers sharing the
+            # database cannot both pass the check while the queue has room for one job
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                active = self._db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+                ).fetchone()[0]
+                if active >= self.max_queue_depth:
+                    raise QueueFullError(f"Job queue is full ({active}/{self.max_queue_depth})")
+                self._db.execute(
+                    "INSERT INTO jobs (id, kind, status, params, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, QUEUED, json.dumps(params, default=str), now, now),
+                )
+            except BaseException:
+                self._db.rollback()
+                raise
+            self._db.commit()
+        self._dispatch(job_id)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, kind, status, progress, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job immediately, or flag a running one. Returns False if unknown or finished."""
+        with self._lock:
+            row = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["status"] not in (QUEUED, RUNNING):
+                return False
+            self._db.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ?", (time.time(), job_id)
+            )
+            self._db.commit()
+        future = self._futures.get(job_id)
+        if row["status"] == QUEUED and (future is None or future.cancel()):
+            self._update(job_id, status=CANCELLED)
+        return True
+
+    def resume_pending(self, live_workers: Optional[Collection[str]] = None) -> int:
+        """Re-dispatch jobs left queued or running by a previous process.
+
+        With `live_workers` (multi-worker deployments) running jobs are only re-queued when
+        the worker that claimed them is not in the collection.
+        """
+        with self._lock:
+            if not live_workers:
+                self._db.execute("UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+            else:
+                live = list(live_workers)
+                placeholders = ", ".join("?" * len(live))
+                self._db.execute(
+                    f"UPDATE jobs SET status = ? WHERE status = ? AND (worker IS NULL OR worker NOT IN ({placeholders}))",
+                    (QUEUED, RUNNING, *live),
+                )
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+            self._db.commit()
+        for row in rows:
+            self._dispatch(row["id"])
+        return len(rows)
+
+    def shutdown(self) -> None:
+        # Queued jobs stay in SQLite and are picked up by resume_pending on the next start
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _dispatch(self, job_id: str) -> None:
+        self._futures[job_id] = self._executor.submit(self._run, job_id)
+
+    def _run(self, job_id: str) -> None:
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT kind, params, cancel_requested FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+            if row is None:
+                return
+            if row["cancel_requested"]:
+                self._update(job_id, status=CANCELLED)
+                return
+
+            if not self._claim(job_id):
+                # Another worker sharing the database got to it first
+                return
+            handler = self._handlers[row["kind"]]
+            try:
+                result = handler(json.loads(row["params"]), JobHandle(self, job_id))
+            except JobCancelled:
+                self._update(job_id, status=CANCELLED)
+            except Exception as e:
+                self._update(job_id, status=FAILED, error=str(e))
+            else:
+                self._update(job_id, status=SUCCEEDED, progress=1.0, result=json.dumps(result, default=str))
+        finally:
+            self._futures.pop(job_id, None)
+
+    def _claim(self, job_id: str) -> bool:
+        with self._lock:
+            claimed = self._db.execute(
+                "UPDATE jobs SET status = ?, worker = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, self.worker_id, time.time(), job_id, QUEUED),
+            ).rowcount
+            self._db.commit()
+        return claimed == 1
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._db.commit()
@@ -4,39 +4,26 @@ This script parses Excel files and generates test scenarios, test cases, and que
 """
 
 import os
+import argparse
 from pathlib import Path
-from typing import List
-import pandas as pd
+from typing import TYPE_CHECKING, List
 from dotenv import load_dotenv, find_dotenv
 
+from context_builder import read_sheets
+from cross_validation import cross_validate_files, findings_text
+from testcase_export import export_report
+from testcase_store import index_report
+
 # Load environment variables from .env (search upwards and fallback to repo paths)
 load_dotenv(find_dotenv(usecwd=True), override=False)
 script_dir = Path(__file__).resolve().parent
 load_dotenv(script_dir / ".env", override=False)
 load_dotenv(script_dir.parent / ".env", override=False)
 
-# LlamaIndex imports
-from llama_index.core import (
-    Document,
-    VectorStoreIndex,
-    SimpleDirectoryReader,
-    ServiceContext,
-    StorageContext,
-    load_index_from_storage
-)
-from llama_index.core.node_parser import SimpleNodeParser
-from llama_index.core.extractors import TitleExtractor
-from llama_index.core.ingestion import IngestionPipeline
-from llama_index.llms.openai import OpenAI
-from llama_index.core.query_engine import RetrieverQueryEngine
-from llama_index.core.indices.struct_store import PandasIndex
-from llama_index.core.schema import TextNode
-from llama_index.readers.file import PandasExcelReader
-from llama_index.core.prompts import PromptTemplate
-
-# For using HuggingFace models with LlamaIndex
-from llama_index.llms.huggingface import HuggingFaceInferenceAPI
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+# LlamaIndex, the HuggingFace LLM and the embedding model are imported where they are first
+# used: they take seconds to load and are not needed for --help or argument errors.
+if TYPE_CHECKING:
+    from llama_index.core import Document
 
 class ExcelDocumentAnalyzer:
     def __init__(self, hf_token=None):
@@ -50,6 +37,9 @@ class ExcelDocumentAnalyzer:
 
     def setup_llm(self):
         """Setup LLM configuration for LlamaIndex"""
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+        from llama_index.llms.huggingface import HuggingFaceInferenceAPI
+
         # Use HuggingFace Inference API with the working model
         self.llm = HuggingFaceInferenceAPI(
             model_name="moonshotai/Kimi-K2-Instruct",
@@ -73,23 +63,24 @@ class ExcelDocumentAnalyzer:
             cache_folder=str(cache_dir)
         )
 
-    def parse_excel_with_pandas(self, file_path: str) -> List[Document]:
+    def parse_excel_with_pandas(self, file_path: str, profile_only: bool = False) -> List["Document"]:
         """Parse Excel file using Pandas and convert to LlamaIndex Documents"""
+        from llama_index.core import Document
+
         documents = []
         file_name = Path(file_path).name
 
         try:
-            # Read all sheets
-            excel_file = pd.ExcelFile(file_path)
-
-            for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
+            # Read all sheets (Excel workbooks, CSV and Parquet files)
+            for sheet_name, df in read_sheets(file_path, file_name, profile_only=profile_only):
+                # Profile-only reads are a row sample; the real count is kept in attrs
+                num_rows = df.attrs.get("total_rows", len(df))
 
                 # Create structured content
                 content = f"File: {file_name}\n"
                 content += f"Sheet: {sheet_name}\n"
                 content += f"Columns: {', '.join(df.columns.tolist())}\n"
-                content += f"Number of rows: {len(df)}\n\n"
+                content += f"Number of rows: {num_rows}\n\n"
 
                 # Add data preview
                 content += "Data Sample:\n"
@@ -105,7 +96,7 @@ class ExcelDocumentAnalyzer:
                 metadata = {
                     "file_name": file_name,
                     "sheet_name": sheet_name,
-                    "num_rows": len(df),
+                    "num_rows": num_rows,
                     "num_columns": len(df.columns),
                     "columns": df.columns.tolist()
                 }
@@ -122,18 +113,33 @@ class ExcelDocumentAnalyzer:
 
         return documents
 
-    def load_excel_documents(self, file_paths: List[str]):
+    def load_excel_documents(self, file_paths: List[str], profile_only: bool = False):
         """Load multiple Excel files"""
         print("Loading Excel documents...")
 
         for file_path in file_paths:
             if os.path.exists(file_path):
                 print(f"  Parsing: {file_path}")
-                docs = self.parse_excel_with_pandas(file_path)
+                docs = self.parse_excel_with_pandas(file_path, profile_only=profile_only)
                 self.documents.extend(docs)
             else:
                 print(f"  File not found: {file_path}")
 
+        # Findings of comparing every row of an FRS mapping with a database spec, as one more document
+        try:
+            validation = cross_validate_files(file_paths)
+            if validation is not None:
+                from llama_index.core import Document
+
+                summary = validation["cross_validation"]
+                print(f"  Cross-validated FRS mapping vs database spec: {sum(summary['counts'].values())} findings")
+                self.documents.append(Document(
+                    text=findings_text(validation),
+                    metadata={"file_name": validation["file"], "sheet_name": validation["sheet"], "counts": summary["counts"]},
+                ))
+        except Exception as e:
+            print(f"  Error cross-validating the workbooks: {str(e)}")
+
         print(f"Loaded {len(self.documents)} document chunks")
 
     def build_index(self):
@@ -145,7 +151,8 @@ class ExcelDocumentAnalyzer:
         print("Building index...")
 
         # Create service context with our LLM and embedding model
-        from llama_index.core import Settings
+        from llama_index.core import Settings, VectorStoreIndex
+
         Settings.llm = self.llm
         Settings.embed_model = self.embed_model
         Settings.chunk_size = 1024
@@ -228,7 +235,7 @@ class ExcelDocumentAnalyzer:
         return str(response)
 
     def save_analysis(self, analysis: str, output_file: str = "llamaindex_test_analysis.md"):
-        """Save analysis results to file"""
+        """Save analysis results to file and index its test cases"""
         try:
             with open(output_file, 'w', encoding='utf-8') as f:
                 f.write("# Excel Data Test Analysis Report\n")
@@ -238,11 +245,30 @@ class ExcelDocumentAnalyzer:
             print(f"\n✅ Results saved to: {output_file}")
         except Exception as e:
             print(f"Error saving results: {str(e)}")
+        try:
+            # The markdown file is overwritten by the next run; the store keeps every run
+            indexed, duplicates = index_report(analysis, origin="llamaindex-excel-analyzer")
+            print(f"✅ Indexed {indexed} test scenarios, cases and queries for search ({duplicates} near-duplicates of earlier ones)")
+        except Exception as e:
+            print(f"Error indexing test cases: {str(e)}")
 
 
 def main():
     """Main function to run the analysis"""
 
+    parser = argparse.ArgumentParser(description="Analyze Excel specs with LlamaIndex.")
+    parser.add_argument(
+        "--profile-only",
+        action="store_true",
+        help="Read headers and a row sample only; skip formula-heavy/image-only sheets",
+    )
+    parser.add_argument(
+        "--export",
+        metavar="PATH",
+        help="Also export the test scenarios, cases and SQL to a spreadsheet (.xlsx, one sheet per section, or .csv)",
+    )
+    args = parser.parse_args()
+
     print("=" * 60)
     print("EXCEL ANALYZER WITH LLAMAINDEX")
     print("=" * 60)
@@ -257,7 +283,7 @@ def main():
     analyzer = ExcelDocumentAnalyzer()
 
     # Load documents
-    analyzer.load_excel_documents(excel_files)
+    analyzer.load_excel_documents(excel_files, profile_only=args.profile_only)
 
     if not analyzer.documents:
         print("No documents loaded. Exiting.")
@@ -277,6 +303,12 @@ def main():
 
         # Save to file
         analyzer.save_analysis(analysis)
+        if args.export:
+            try:
+                counts = export_report(analysis, args.export)
+                print(f"Exported {sum(counts.values())} test artifacts to: {args.export}")
+            except Exception as e:
+                print(f"Error exporting test cases: {str(e)}")
 
         # Interactive query mode
         print("\n" + "=" * 60)
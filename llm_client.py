@@ -0,0 +1,64 @@
+"""
+Shared LLM client factory.
+
+LLM_BASE_URL (any OpenAI-compatible endpoint, e.g. `mock_llm_server`) takes priority,
+then Azure OpenAI when configured, otherwise the HuggingFace router (OpenAI-compatible). Returns (client, model_name, provider); client is None when
+nothing is configured.
+
+The OpenAI SDK is imported inside `create_client`, so entry points can resolve the model
+with `resolve_model()` at import time and build the client on first use. Every client
+shares the pooled transport from `http_transport`.
+"""
+
+import os
+from typing import Any, Optional, Tuple
+
+from http_transport import get_http_client, http_timeout
+
+HF_ROUTER_URL = "https://router.huggingface.co/v1"
+DEFAULT_HF_MODEL = "moonshotai/Kimi-K2-Instruct"
+
+
+def resolve_model(hf_model: str = DEFAULT_HF_MODEL) -> Tuple[Optional[str], Optional[str]]:
+    """(model_name, provider) that create_client() would use, from the environment alone."""
+    if os.environ.get("LLM_BASE_URL"):
+        return os.environ.get("LLM_MODEL") or hf_model, f"OpenAI-compatible ({os.environ['LLM_BASE_URL']})"
+    if (os.environ.get("AZURE_OPENAI_ENDPOINT") and os.environ.get("AZURE_OPENAI_API_KEY")
+            and os.environ.get("AZURE_OPENAI_DEPLOYMENT")):
+        return os.environ["AZURE_OPENAI_DEPLOYMENT"], "Azure OpenAI"
+    if os.environ.get("HF_TOKEN"):
+        return hf_model, "Hugging Face Inference API"
+    return None, None
+
+
+def create_client(hf_model: str = DEFAULT_HF_MODEL) -> Tuple[Optional[Any], Optional[str], Optional[str]]:
+    from openai import OpenAI, AzureOpenAI
+
+    transport = {"http_client": get_http_client(), "timeout": http_timeout()}
+
+    base_url = os.environ.get("LLM_BASE_URL")
+    if base_url:
+        client = OpenAI(base_url=base_url, api_key=os.environ.get("LLM_API_KEY") or "not-needed", **transport)
+        model, provider = resolve_model(hf_model)
+        return client, model, provider
+
+    azure_endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT")
+    azure_api_key = os.environ.get("AZURE_OPENAI_API_KEY")
+    azure_api_version = os.environ.get("AZURE_OPENAI_API_VERSION", "2025-01-01-preview")
+    azure_deployment = os.environ.get("AZURE_OPENAI_DEPLOYMENT")
+
+    if azure_endpoint and azure_api_key and azure_deployment:
+        client = AzureOpenAI(
+            azure_endpoint=azure_endpoint,
+            api_key=azure_api_key,
+            api_version=azure_api_version,
+            **transport,
+        )
+        return client, azure_deployment, "Azure OpenAI"
+
+    hf_token = os.environ.get("HF_TOKEN")
+    if hf_token:
+        client = OpenAI(base_url=HF_ROUTER_URL, api_key=hf_token, **transport)
+        return client, hf_model, "Hugging Face Inference API"
+
+    return None, None, None
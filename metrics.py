@@ -0,0 +1,188 @@
+"""
+In-process metrics: per-stage latency, token accounting, cache hit rates and fallbacks.
+
+Metrics are rendered in the Prometheus text exposition format by `render_prometheus()`
+(served at /metrics by server.py). `collect_timings()` additionally captures the stage
+durations of the current request/run so they can be returned as a JSON timing block.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144)
+
+_current_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("current_timings", default=None)
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name, self.help, self.label_names = name, help_text, tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels.get(n, "")) for n in self.label_names), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], label_names: Sequence[str] = ()):
+        self.name, self.help, self.label_names = name, help_text, tuple(label_names)
+        self.buckets = tuple(buckets)
+        # per label set: [bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    labels = _format_labels(self.label_names, key, f'le="{bound:g}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                cumulative += counts[-1]
+                labels = _format_labels(self.label_names, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total[0]:g}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "testcase_gpt_stage_seconds", "Latency of pipeline stages in seconds.", LATENCY_BUCKETS, ["stage"]
+)
+PROMPT_TOKENS = Histogram(
+    "testcase_gpt_prompt_tokens", "Prompt tokens per LLM call (from completion.usage).", TOKEN_BUCKETS, ["task"]
+)
+COMPLETION_TOKENS = Histogram(
+    "testcase_gpt_completion_tokens", "Completion tokens per LLM call (from completion.usage).", TOKEN_BUCKETS, ["task"]
+)
+CACHED_PROMPT_TOKENS = Counter(
+    "testcase_gpt_cached_prompt_tokens_total", "Prompt tokens served from the provider prompt cache.", ["task"]
+)
+CACHE_REQUESTS = Counter(
+    "testcase_gpt_cache_requests_total", "Local cache lookups by cache and result (hit/miss).", ["cache", "result"]
+)
+FALLBACKS = Counter(
+    "testcase_gpt_heuristic_fallbacks_total", "Responses served by the heuristic fallback instead of the LLM.", ["reason"]
+)
+STRUCTURED_OUTPUT = Counter(
+    "testcase_gpt_structured_output_total",
+    "Parsing outcomes of JSON completions (json, extracted, failed).",
+    ["task", "outcome"],
+)
+MODEL_ROUTES = Counter(
+    "testcase_gpt_model_routes_total",
+    "LLM attempts by task, model tier and outcome (accepted, rejected by validation, error).",
+    ["task", "tier", "outcome"],
+)
+TIER_SECONDS = Histogram(
+    "testcase_gpt_model_tier_seconds", "LLM call latency per task and model tier.", LATENCY_BUCKETS, ["task", "tier"]
+)
+
+REGISTRY = [
+    STAGE_SECONDS,
+    PROMPT_TOKENS,
+    COMPLETION_TOKENS,
+    CACHED_PROMPT_TOKENS,
+    CACHE_REQUESTS,
+    FALLBACKS,
+    STRUCTURED_OUTPUT,
+    MODEL_ROUTES,
+    TIER_SECONDS,
+]
+
+
+@contextmanager
+def observe_stage(stage: str) -> Iterator[None]:
+    """Time a pipeline stage into the histogram and the active timing block, if any."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def collect_timings() -> Iterator[Dict[str, float]]:
+    """Collect per-stage seconds for everything timed inside the block."""
+    timings: Dict[str, float] = {}
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+def record_usage(task: str, completion: Any) -> None:
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return
+    if getattr(usage, "prompt_tokens", None) is not None:
+        PROMPT_TOKENS.observe(usage.prompt_tokens, task=task)
+    if getattr(usage, "completion_tokens", None) is not None:
+        COMPLETION_TOKENS.observe(usage.completion_tokens, task=task)
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    if cached:
+        CACHED_PROMPT_TOKENS.inc(cached, task=task)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_fallback(reason: str) -> None:
+    FALLBACKS.inc(reason=reason)
+
+
+def record_route(task: str, tier: str, outcome: str, seconds: float) -> None:
+    MODEL_ROUTES.inc(task=task, tier=tier, outcome=outcome)
+    TIER_SECONDS.observe(seconds, task=task, tier=tier)
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
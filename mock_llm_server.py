@@ -0,0 +1,351 @@
+"""
+Local OpenAI-compatible mock LLM for offline load and latency benchmarks.
+
+Serves POST /v1/chat/completions (plain and streaming) with:
+
+- a configurable time-to-first-token distribution (`fixed:S`, `uniform:A,B`,
+  `normal:MU,SIGMA`, `lognormal:MU,SIGMA`, in seconds) and a token throughput, so
+  completion time grows with the response length like a real provider,
+- 429 / 500 error injection at configurable rates (429s carry Retry-After),
+- canned outputs per task, recognised by the system prompt from `prompt_builder`:
+  a markdown analysis (or only the requested section), chat-sql JSON objects, batched JSON arrays with one answer per
+  request, and follow-up answers; `responses` overrides by substring of the last message
+  and `model_responses` by requested model,
+- optional rejection of `response_format` to exercise the structured-output fallbacks,
+- `usage` with estimated prompt/completion tokens, and GET /mock/stats with counters.
+
+Every entry point builds its client through `llm_client.create_client`, which honours
+LLM_BASE_URL, so `running_mock_llm()` points all of them at the mock:
+
+    with running_mock_llm(MockLLMConfig(latency="lognormal:-1.5,0.4", error_429_rate=0.05)) as mock:
+        ...  # server / CLIs / benchmarks now talk to mock.base_url
+
+    python mock_llm_server.py --port 8001 --latency uniform:0.2,0.8 --tokens-per-second 80
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from prompt_builder import ANALYSIS_SECTIONS, SYSTEM_PROMPTS
+
+MOCK_MODEL = "mock-llm"
+
+# Canned body of each section of prompt_builder.ANALYSIS_SECTIONS, in order; the headings come
+# from the analysis prompt itself so sectioned runs and the report parsers see the real titles
+_SECTION_BODIES = [
+    """1. Verify every mandatory column is populated.
+2. Validate value ranges of numeric columns against the specification.
+3. Check referential integrity between related sheets.
+4. Confirm enumerated columns only contain allowed values.
+5. Exercise boundary values for dates and amounts.""",
+    """| ID | Description | Expected Result |
+|----|-------------|-----------------|
+| TC-001 | Load the sheet with all mandatory fields | Load succeeds |
+| TC-002 | Null in a NOT NULL column | Row rejected |
+| TC-003 | Duplicate primary key | Row rejected |""",
+    """```sql
+SELECT COUNT(*) FROM data WHERE id IS NULL;
+SELECT id, COUNT(*) FROM data GROUP BY id HAVING COUNT(*) > 1;
+```""",
+    """- Null counts per column are within the documented limits.
+- Unique counts match the key columns.""",
+    """- Run the SQL checks in CI after every load.
+- Keep one minimal valid row, one maximal valid row and one row per invalid rule as fixtures.""",
+    """- High: duplicate keys break downstream joins.
+- Medium: out-of-range amounts skew reports.""",
+]
+_SECTIONS = {
+    number: f"## {number}. {title}\n{_SECTION_BODIES[index] if index < len(_SECTION_BODIES) else '- Mock section.'}"
+    for index, (number, title) in enumerate(ANALYSIS_SECTIONS)
+}
+_ANALYSIS = "# Test Analysis\n\n" + "\n\n".join(_SECTIONS.values()) + "\n"
+
+_SQL = {"sqlQuery": "SELECT COUNT(*) AS total_records FROM data;", "description": "Mock answer: count all records."}
+_FOLLOWUP = "Mock answer: the data context above covers this; start with the null and duplicate checks."
+
+_SECTION_REQUEST_RE = re.compile(r"Write only section (\d+)")
+_LATENCY_RE = re.compile(r"^(fixed|uniform|normal|lognormal):([-\d.eE]+)(?:,([-\d.eE]+))?$")
+
+
+@dataclass
+class MockLLMConfig:
+    # time to first token, e.g. "fixed:0.05", "uniform:0.2,0.8", "lognormal:-1.5,0.4"
+    latency: str = "fixed:0.05"
+    tokens_per_second: float = 400.0
+    error_429_rate: float = 0.0
+    error_500_rate: float = 0.0
+    reject_response_format: bool = False
+    # substring of the last message -> response content
+    responses: Dict[str, str] = field(default_factory=dict)
+    # requested model -> response content (e.g. a small model that answers badly, to test escalation)
+    model_responses: Dict[str, str] = field(default_factory=dict)
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "MockLLMConfig":
+        return cls(
+            latency=os.environ.get("MOCK_LLM_LATENCY", cls.latency),
+            tokens_per_second=float(os.environ.get("MOCK_LLM_TOKENS_PER_SECOND", cls.tokens_per_second)),
+            error_429_rate=float(os.environ.get("MOCK_LLM_429_RATE", cls.error_429_rate)),
+            error_500_rate=float(os.environ.get("MOCK_LLM_500_RATE", cls.error_500_rate)),
+            reject_response_format=os.environ.get("MOCK_LLM_REJECT_RESPONSE_FORMAT", "0") == "1",
+            responses=json.loads(os.environ.get("MOCK_LLM_RESPONSES", "{}")),
+            model_responses=json.loads(os.environ.get("MOCK_LLM_MODEL_RESPONSES", "{}")),
+        )
+
+
+def sample_latency(spec: str, rng: random.Random) -> float:
+    match = _LATENCY_RE.match(spec.strip())
+    if not match:
+        raise ValueError(f"Unsupported latency spec: {spec!r}")
+    kind, a, b = match.group(1), float(match.group(2)), float(match.group(3) or 0)
+    if kind == "fixed":
+        return a
+    if kind == "uniform":
+        return rng.uniform(a, b)
+    if kind == "normal":
+        return max(0.0, rng.gauss(a, b))
+    return rng.lognormvariate(a, b)
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / 4))
+
+
+def _task(messages: List[Dict[str, Any]]) -> Optional[str]:
+    system = next((m.get("content") for m in messages if m.get("role") == "system"), None)
+    for task, prompt in SYSTEM_PROMPTS.items():
+        if system == prompt:
+            return task
+    return None
+
+
+def canned_content(messages: List[Dict[str, Any]], config: MockLLMConfig, model: Optional[str] = None) -> str:
+    if model in config.model_responses:
+        return config.model_responses[model]
+    last = str(messages[-1].get("content", "")) if messages else ""
+    for needle, content in config.responses.items():
+        if needle in last:
+            return content
+
+    task = _task(messages)
+    if task == "chat_sql_batch":
+        expected = re.search(r"exactly (\d+) objects", last)
+        count = int(expected.group(1)) if expected else 1
+        return json.dumps([{"index": i, **_SQL} for i in range(count)])
+    if task == "chat_sql" or "JSON" in last:
+        return json.dumps(_SQL)
+    if task == "followup" or last.startswith("Question:"):
+        return _FOLLOWUP
+    section = _SECTION_REQUEST_RE.search(last)
+    if section:
+        number = int(section.group(1))
+        return _SECTIONS.get(number) or f"## {number}. Section {number}\n- Mock section."
+    return _ANALYSIS
+
+
+def _chunks(text: str, size: int = 4) -> Iterator[str]:
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+def create_app(config: Optional[MockLLMConfig] = None) -> FastAPI:
+    config = config or MockLLMConfig.from_env()
+    rng = random.Random(config.seed)
+    stats = {"requests": 0, "streamed": 0, "errors_429": 0, "errors_500": 0, "rejected_response_format": 0}
+    app = FastAPI(title="Mock LLM", version="1.0.0")
+    app.state.config, app.state.stats = config, stats
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": MOCK_MODEL, "object": "model", "owned_by": "mock"}]}
+
+    @app.get("/mock/stats")
+    async def mock_stats():
+        return stats
+
+    @app.post("/v1/chat/completions")
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def chat_completions(request: Request, deployment: Optional[str] = None):
+        body = await request.json()
+        stats["requests"] += 1
+        roll = rng.random()
+        if roll < config.error_429_rate:
+            stats["errors_429"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error"}},
+                status_code=429,
+                headers={"Retry-After": "1"},
+            )
+        if roll < config.error_429_rate + config.error_500_rate:
+            stats["errors_500"] += 1
+            return JSONResponse({"error": {"message": "Internal error (mock)", "type": "server_error"}}, status_code=500)
+        if config.reject_response_format and body.get("response_format"):
+            stats["rejected_response_format"] += 1
+            return JSONResponse(
+                {"error": {"message": "response_format is not supported by this model (mock)", "type": "invalid_request_error"}},
+                status_code=400,
+            )
+
+        messages = body.get("messages") or []
+        content = canned_content(messages, config, body.get("model"))
+        max_tokens = body.get("max_tokens")
+        if max_tokens:
+            content = content[: int(max_tokens) * 4]
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+        completion_tokens = estimate_tokens(content)
+        model = body.get("model") or deployment or MOCK_MODEL
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        first_token = sample_latency(config.latency, rng)
+        per_chunk = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+
+        if body.get("stream"):
+            stats["streamed"] += 1
+
+            async def events():
+                await asyncio.sleep(first_token)
+                for piece in _chunks(content):
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    if per_chunk:
+                        await asyncio.sleep(per_chunk)
+                final = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    final["usage"] = usage
+                yield f"data: {json.dumps(final)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(first_token + completion_tokens * per_chunk)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+            ],
+            "usage": usage,
+        }
+
+    return app
+
+
+class MockLLM:
+    """Handle of a running mock: base URL, live stats and the env that points clients at it."""
+
+    def __init__(self, app: FastAPI, host: str, port: int):
+        self.app = app
+        self.base_url = f"http://{host}:{port}/v1"
+        self.env = {"LLM_BASE_URL": self.base_url, "LLM_API_KEY": "mock-key", "LLM_MODEL": MOCK_MODEL}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self.app.state.stats)
+
+
+@contextmanager
+def running_mock_llm(config: Optional[MockLLMConfig] = None, host: str = "127.0.0.1",
+                     port: int = 0, set_env: bool = True) -> Iterator[MockLLM]:
+    """Run the mock on a background thread; with `set_env`, LLM_BASE_URL etc. point at it for the block.
+
+    The `mock_llm` and `server` fixtures in tests/conftest.py wrap it for the test suite. Entry
+    points that resolve their client at import time (server.py) must be imported, or started as
+    subprocesses with `mock.env`, inside the block.
+    """
+    import uvicorn
+
+    if port == 0:
+        with socket.socket() as sock:
+            sock.bind((host, 0))
+            port = sock.getsockname()[1]
+    app = create_app(config or MockLLMConfig())
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, name="mock-llm", daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline or not thread.is_alive():
+            raise RuntimeError("mock LLM server did not start")
+        time.sleep(0.01)
+
+    mock = MockLLM(app, host, port)
+    previous = {key: os.environ.get(key) for key in mock.env}
+    if set_env:
+        os.environ.update(mock.env)
+    try:
+        yield mock
+    finally:
+        if set_env:
+            for key, value in previous.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    defaults = MockLLMConfig.from_env()
+    parser = argparse.ArgumentParser(description="Run the mock OpenAI-compatible LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default=defaults.latency, help="fixed:S | uniform:A,B | normal:MU,SIGMA | lognormal:MU,SIGMA")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--error-429-rate", type=float, default=defaults.error_429_rate)
+    parser.add_argument("--error-500-rate", type=float, default=defaults.error_500_rate)
+    parser.add_argument("--reject-response-format", action="store_true", default=defaults.reject_response_format)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = MockLLMConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_429_rate=args.error_429_rate,
+        error_500_rate=args.error_500_rate,
+        reject_response_format=args.reject_response_format,
+        responses=defaults.responses,
+        model_responses=defaults.model_responses,
+        seed=args.seed,
+    )
+    print(f"Mock LLM on http://{args.host}:{args.port}/v1 | export LLM_BASE_URL=http://{args.host}:{args.port}/v1")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,104 @@
+"""
+Cost/latency-aware model tiering per task type.
+
+Short structured tasks (chat-sql answers, follow-up questions) go to a small, fast model;
+long generation (the full test analysis) goes to the large model. When the small model's
+output fails validation (no usable SQL, missing batch answers, an empty reply) or the
+call errors, `ModelRouter.run` escalates the same request to the next tier up.
+
+Tiers come from the environment:
+
+- large: the model `llm_client.resolve_model()` picks (Azure deployment, HF model, LLM_MODEL)
+- small: LLM_MODEL_SMALL (an Azure deployment name, HF model id or OpenAI-compatible model);
+  on the HF router it defaults to DEFAULT_HF_SMALL_MODEL
+
+Without a distinct small model, or with MODEL_TIERING=0, every task uses the large model
+and no escalation happens. Every attempt is counted by task, tier and outcome
+(`metrics.MODEL_ROUTES`) and timed per tier (`metrics.TIER_SECONDS`).
+"""
+
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from metrics import record_route
+from token_budget import PromptTooLarge
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+MODEL_TIERING = os.environ.get("MODEL_TIERING", "1") != "0"
+DEFAULT_HF_SMALL_MODEL = "openai/gpt-oss-20b:fireworks-ai"
+
+# Cheapest first; escalation walks up from a task's starting tier
+TIERS: Tuple[str, ...] = ("small", "large")
+TASK_TIERS: Dict[str, str] = {
+    "chat_sql": "small",
+    "chat_sql_batch": "small",
+    "followup": "small",
+    "analysis": "large",
+    "analysis_section": "large",
+}
+
+
+def resolve_tier_models(large_model: Optional[str], provider: Optional[str]) -> Dict[str, Optional[str]]:
+    """tier -> model name; the small tier falls back to the large model when none is configured."""
+    small_model = os.environ.get("LLM_MODEL_SMALL")
+    if not small_model and provider == "Hugging Face Inference API":
+        small_model = DEFAULT_HF_SMALL_MODEL
+    if not MODEL_TIERING or not small_model or large_model is None:
+        small_model = large_model
+    return {"small": small_model, "large": large_model}
+
+
+class ModelRouter:
+    def __init__(self, models: Dict[str, Optional[str]]):
+        self.models = models
+
+    @property
+    def tiered(self) -> bool:
+        return self.models["small"] != self.models["large"]
+
+    def tier_for(self, task: str) -> str:
+        return TASK_TIERS.get(task, "large")
+
+    def model_for(self, task: str) -> Optional[str]:
+        return self.models[self.tier_for(task)]
+
+    def run(self, task: str, attempt: Callable[[str], T], accept: Callable[[T], bool] = bool) -> T:
+        """attempt(model) on the task's tier, escalating while the result is not accepted.
+
+        Returns the first accepted result, or the top tier's result when none is. Errors
+        escalate too, except PromptTooLarge (the prompt is the same on every tier); the
+        top tier's error is raised.
+        """
+        tiers = TIERS[TIERS.index(self.tier_for(task)):]
+        tried = set()
+        result: Optional[T] = None
+        for position, tier in enumerate(tiers):
+            model = self.models[tier]
+            if model is None or model in tried:
+                continue
+            tried.add(model)
+            last = all(self.models[t] in tried for t in tiers[position + 1:])
+            started = time.perf_counter()
+            try:
+                result = attempt(model)
+            except PromptTooLarge:
+                raise
+            except Exception:
+                record_route(task, tier, "error", time.perf_counter() - started)
+                if last:
+                    raise
+                logger.warning("task=%s tier=%s model=%s failed; escalating", task, tier, model, exc_info=True)
+                continue
+            accepted = accept(result)
+            record_route(task, tier, "accepted" if accepted else "rejected", time.perf_counter() - started)
+            if accepted:
+                logger.info("task=%s routed to tier=%s model=%s", task, tier, model)
+                return result
+            if not last:
+                logger.info("task=%s tier=%s model=%s output failed validation; escalating", task, tier, model)
+        return result
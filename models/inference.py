@@ -1,8 +1,15 @@
 import os
-import requests
+import sys
 import json
+from pathlib import Path
+
+import httpx
 from dotenv import load_dotenv
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from http_transport import get_http_client  # noqa: E402
+
 # Load environment variables from .env file in parent directory
 load_dotenv("../.env")
 
@@ -15,24 +22,27 @@ headers = {
     "Content-Type": "application/json"
 }
 
+# One pooled connection to the router for the model listing and every model attempt
+http = get_http_client()
+
 def get_available_models():
     """Get list of available models from the API"""
     try:
-        response = requests.get(f"{BASE_URL}/models", headers=headers)
+        response = http.get(f"{BASE_URL}/models", headers=headers)
         response.raise_for_status()
         return response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Error getting models: {e}")
         return None
 
 def query(payload):
     try:
-        response = requests.post(f"{BASE_URL}/chat/completions", headers=headers, json=payload)
+        response = http.post(f"{BASE_URL}/chat/completions", headers=headers, json=payload)
         response.raise_for_status()
         return response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Request error: {e}")
-        if hasattr(e.response, 'text'):
+        if isinstance(e, httpx.HTTPStatusError):
             error_data = json.loads(e.response.text)
             if 'error' in error_data:
                 print(f"Error message: {error_data['error']['message']}")
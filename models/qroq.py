@@ -1,9 +1,15 @@
 import os
-import httpx
+import sys
 import warnings
+from pathlib import Path
+
 from groq import Groq
 from dotenv import load_dotenv
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from http_transport import get_http_client, http_timeout  # noqa: E402
+
 # Load environment variables
 load_dotenv()
 
@@ -19,14 +25,15 @@ if not api_key:
     print("GROQ_API_KEY=your_groq_key_here")
     exit(1)
 
-# Create a custom httpx client that bypasses SSL verification
+# Shared pooled httpx client with SSL verification disabled
 # Note: Only use this in development or if you trust the network
-http_client = httpx.Client(verify=False)
+http_client = get_http_client(verify=False)
 
 try:
     client = Groq(
         api_key=api_key,
-        http_client=http_client  # Use custom client with SSL verification disabled
+        http_client=http_client,  # Use the shared client with SSL verification disabled
+        timeout=http_timeout(),
     )
 
     chat_completion = client.chat.completions.create(
@@ -48,8 +55,3 @@ except Exception as e:
     print(f"Error: {e}")
     print("\nIf you're getting SSL errors, you might be behind a corporate firewall.")
     print("The script is configured to bypass SSL verification for development purposes.")
-
-finally:
-    # Close the HTTP client
-    if 'http_client' in locals():
-        http_client.close()
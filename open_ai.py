@@ -1,9 +1,13 @@
 import os
 from openai import OpenAI
 
+from http_transport import get_http_client, http_timeout
+
 client = OpenAI(
     base_url="https://router.huggingface.co/v1",
     api_key=os.environ["HF_TOKEN"],
+    http_client=get_http_client(),
+    timeout=http_timeout(),
 )
 
 completion = client.chat.completions.create(
@@ -0,0 +1,243 @@
+"""
+Prompt builder with a byte-stable prefix for provider-side prompt caching.
+
+Every prompt is laid out as:
+
+    1. a fixed system message per task (instructions never change between calls)
+    2. the data context, serialised deterministically (sorted keys, sheets in file/sheet order)
+    3. the varying part (question, request) as the final user message
+
+Azure OpenAI and compatible backends cache prompts by exact prefix, so keeping 1 and 2
+identical across calls lets repeated questions against the same upload reuse the cache.
+
+`prepare_messages` also budgets the prompt before the call (see `token_budget`): it sizes
+max_tokens for the task, falls back to a compact context without sample rows when the
+full one does not fit, and raises `PromptTooLarge` when neither does.
+"""
+
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from context_builder import context_fingerprint
+from metrics import observe_stage, record_cache, record_usage
+from token_budget import PromptTooLarge, TokenPlan, cached_count, count_tokens, message_tokens, plan_completion
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_SYSTEM_PROMPT = """You are a Senior QA Engineer analyzing Excel data specifications for comprehensive testing.
+You will be given a Data Context (summaries of Excel sheets). When it includes an "FRS mapping vs database spec cross-validation" entry, its findings come from comparing every row of both workbooks: treat them as confirmed defects and cover them in the test cases, SQL queries and data quality checks.
+Based on this data, provide a detailed test analysis including:
+
+## 1. TEST SCENARIOS (5+ scenarios)
+For each scenario provide:
+- Scenario Name
+- Description
+- Business Value
+- Risk Level (High/Medium/Low)
+
+## 2. TEST CASES (10+ detailed test cases)
+For each test case provide:
+- Test ID
+- Test Name
+- Objective
+- Prerequisites
+- Test Steps (numbered)
+- Expected Results
+- Test Data Required
+- Priority (P1/P2/P3)
+
+## 3. SQL VALIDATION QUERIES (5+ queries)
+Provide SQL queries for:
+- Data integrity checks
+- Referential integrity validation
+- Data quality verification
+- Performance testing
+- Edge case validation
+
+## 4. DATA QUALITY CHECKS
+Identify:
+- Potential data quality issues
+- Missing data patterns
+- Data validation rules needed
+- Data cleansing requirements
+
+## 5. TEST AUTOMATION STRATEGY
+Recommend:
+- Which tests to automate
+- Testing framework suggestions
+- CI/CD integration approach
+- Test data management strategy
+
+## 6. RISK ASSESSMENT
+Identify:
+- Critical data risks
+- Potential failure points
+- Mitigation strategies
+
+Please provide detailed, actionable recommendations specific to the data structure provided."""
+
+SYSTEM_PROMPTS = {
+    "analysis": ANALYSIS_SYSTEM_PROMPT,
+    "followup": "You are a QA expert. Answer questions about testing and data quality based on the provided context.",
+    "chat_sql": (
+        "You are a Senior QA Engineer. Use the Data Context (summaries of uploaded Excel sheets) to answer. "
+        'Return only a JSON object with fields "sqlQuery" and "description".'
+    ),
+    "chat_sql_batch": (
+        "You are a Senior QA Engineer. Use the Data Context (summaries of uploaded Excel sheets) to answer. "
+        'Return only a JSON array of objects with fields "index", "sqlQuery" and "description".'
+    ),
+    # Same system prompt as "analysis", so section prompts share the full analysis' cached prefix
+    "analysis_section": ANALYSIS_SYSTEM_PROMPT,
+}
+
+ANALYSIS_REQUEST = "Provide the detailed test analysis for the data context above."
+
+# (number, title) of each "## N. TITLE" section of the analysis system prompt, in report order
+ANALYSIS_SECTIONS = [
+    (int(number), title.strip()) for number, title in re.findall(r"^## (\d+)\. (.+)$", ANALYSIS_SYSTEM_PROMPT, re.MULTILINE)
+]
+
+# Keys that describe the parse itself rather than the data; kept out of the prompt
+_INTERNAL_KEYS = {"fingerprint"}
+# Dropped from the compact context used when the full one does not fit the window
+_COMPACT_DROP_KEYS = frozenset({"sample_data"})
+
+_SERIALISED: "OrderedDict[str, str]" = OrderedDict()
+_SERIALISED_MAX = 32
+# Job-queue workers and section threads serialise contexts concurrently
+_serialised_lock = threading.Lock()
+
+
+def _canonical(value: Any) -> Any:
+    """Stringify mapping keys so json.dumps(sort_keys=True) works on mixed int/str keys."""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+
+def _context_key(data_context: List[Dict[str, Any]], compact: bool) -> Optional[str]:
+    if not all("fingerprint" in ctx or "error" in ctx for ctx in data_context):
+        return None
+    return context_fingerprint(data_context) + (":compact" if compact else "")
+
+
+def serialise_context(data_context: List[Dict[str, Any]], compact: bool = False) -> str:
+    """Deterministic JSON for a parsed context; cached per context fingerprint."""
+    key = _context_key(data_context, compact)
+    dropped: FrozenSet[str] = _COMPACT_DROP_KEYS if compact else frozenset()
+    if key is not None:
+        with _serialised_lock:
+            cached = _SERIALISED.get(key)
+            if cached is not None:
+                _SERIALISED.move_to_end(key)
+        record_cache("serialised_context", cached is not None)
+        if cached is not None:
+            return cached
+
+    sheets = sorted(
+        ({k: v for k, v in ctx.items() if k not in _INTERNAL_KEYS and k not in dropped} for ctx in data_context),
+        key=lambda ctx: (str(ctx.get("file")), str(ctx.get("sheet"))),
+    )
+    serialised = json.dumps(_canonical(sheets), indent=2, sort_keys=True, ensure_ascii=False, default=str)
+
+    if key is not None:
+        with _serialised_lock:
+            _SERIALISED[key] = serialised
+            if len(_SERIALISED) > _SERIALISED_MAX:
+                _SERIALISED.popitem(last=False)
+    return serialised
+
+
+def build_messages(task: str, data_context: List[Dict[str, Any]], question: str,
+                   compact: bool = False) -> List[Dict[str, str]]:
+    """Messages for `task` with the cacheable prefix first and `question` last."""
+    with observe_stage("prompt_build"):
+        return [
+            {"role": "system", "content": SYSTEM_PROMPTS[task]},
+            {"role": "user", "content": "Data Context:\n" + serialise_context(data_context, compact=compact)},
+            {"role": "user", "content": question},
+        ]
+
+
+def _prompt_tokens(task: str, data_context: List[Dict[str, Any]], messages: List[Dict[str, str]],
+                   compact: bool) -> int:
+    # The system prompt and the data context repeat across calls; only the question is counted fresh
+    key = _context_key(data_context, compact)
+    counts = [
+        cached_count(f"system:{task}", messages[0]["content"]),
+        cached_count(key, messages[1]["content"]) if key is not None else count_tokens(messages[1]["content"]),
+        None,
+    ]
+    return message_tokens(messages, counts)
+
+
+def prepare_messages(task: str, data_context: List[Dict[str, Any]], question: str,
+                     items: Optional[int] = None) -> Tuple[List[Dict[str, str]], TokenPlan]:
+    """build_messages() plus a token plan; raises PromptTooLarge when even the compact context is too big.
+
+    `items` is the number of answers (batched chat-sql) or sheets (analysis) the output
+    budget must cover; by default the sheet count for analysis and 1 otherwise.
+    """
+    if items is None:
+        items = sum(1 for ctx in data_context if "error" not in ctx) if task == "analysis" else 1
+    messages = build_messages(task, data_context, question)
+    with observe_stage("token_estimate"):
+        try:
+            return messages, plan_completion(task, _prompt_tokens(task, data_context, messages, False), items)
+        except PromptTooLarge as e:
+            logger.warning("%s; retrying without sample rows", e)
+    messages = build_messages(task, data_context, question, compact=True)
+    with observe_stage("token_estimate"):
+        plan = plan_completion(task, _prompt_tokens(task, data_context, messages, True), items, trimmed=True)
+    return messages, plan
+
+
+def create_test_analysis_prompt(data_context: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    return build_messages("analysis", data_context, ANALYSIS_REQUEST)
+
+
+def prepare_test_analysis_prompt(data_context: List[Dict[str, Any]]) -> Tuple[List[Dict[str, str]], TokenPlan]:
+    return prepare_messages("analysis", data_context, ANALYSIS_REQUEST)
+
+
+def analysis_section_request(index: int) -> str:
+    """The varying last message asking for one report section; the prefix matches the full analysis."""
+    number, title = ANALYSIS_SECTIONS[index]
+    return (
+        f"Write only section {number} of the test analysis, {title}, for the data context above, following "
+        f'the instructions for that section in the system prompt. Start with the heading "## {number}. {title}" '
+        "and do not write any other section."
+    )
+
+
+def prepare_section_prompt(data_context: List[Dict[str, Any]], index: int) -> Tuple[List[Dict[str, str]], TokenPlan]:
+    return prepare_messages("analysis_section", data_context, analysis_section_request(index))
+
+
+def log_prompt_cache_usage(task: str, completion: Any, plan: Optional[TokenPlan] = None) -> Optional[int]:
+    """Log prompt vs cached prompt tokens reported by the provider, next to the pre-flight
+    estimate when a plan is given; returns the cached count."""
+    record_usage(task, completion)
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    logger.info(
+        "prompt cache task=%s prompt_tokens=%s cached_tokens=%s estimated_prompt_tokens=%s "
+        "max_tokens=%s completion_tokens=%s",
+        task,
+        getattr(usage, "prompt_tokens", None),
+        cached,
+        plan.prompt_tokens if plan is not None else None,
+        plan.max_tokens if plan is not None else None,
+        getattr(usage, "completion_tokens", None),
+    )
+    return cached
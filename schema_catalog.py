@@ -0,0 +1,359 @@
+"""
+Table and column definitions parsed from database designs and spec workbooks.
+
+`parse_design` reads both notations used under database/:
+
+- the DBML-like one (`users { id int pk ... role_id int > roles.id }`), also inside ```dbml
+  fences of markdown files: `pk`, `unique`, `not null` and `> table.column` after the type,
+  DBML `[pk, ref: > t.c]` settings, `Ref:` lines and `Enum` blocks, with enum values from
+  quoted strings in `--` / `//` comments (`-- 'pending', 'paid', 'shipped'`),
+- MySQL-style DDL: CREATE TABLE with PRIMARY KEY, UNIQUE, NOT NULL, REFERENCES and FOREIGN
+  KEY clauses (ALTER TABLE ... ADD FOREIGN KEY too), with enum values from ENUM(...) types,
+  CHECK (col IN (...)) and COMMENT 'a, b, c' value lists.
+
+`schema_from_sheets` builds the same model from the FRS mapping and database spec sheets
+recognised by `cross_validation`. Table and column names are normalised the same way as
+there, so a design and a workbook describing one schema produce the same keys.
+"""
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple, Union
+
+from cross_validation import (
+    KEYS,
+    Catalog,
+    CatalogSheet,
+    normalise_name,
+    normalise_table,
+    read_catalog_sheets,
+    resolve_bare_targets,
+    type_family,
+)
+
+DESIGN_SUFFIXES = (".sql", ".dbml", ".md", ".txt")
+
+
+@dataclass
+class ColumnDef:
+    __slots__ = ("name", "type", "pk", "unique", "required", "ref", "enum")
+
+    name: str
+    # declared type in lower case, e.g. "varchar(255)"; "" when unknown
+    type: str
+    pk: bool
+    unique: bool
+    required: bool
+    # referenced "table.column", for foreign keys
+    ref: Optional[str]
+    # allowed values, when the design lists them
+    enum: Optional[Tuple[str, ...]]
+
+    @property
+    def family(self) -> str:
+        return type_family(self.type) if self.type else ""
+
+
+@dataclass
+class TableDef:
+    __slots__ = ("name", "columns")
+
+    name: str
+    columns: Dict[str, ColumnDef]
+
+
+Schema = Dict[str, TableDef]
+
+_BLOCK_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+_FENCE_RE = re.compile(r"^```(?:dbml|sql)?\s*$(.*?)^```", re.MULTILINE | re.DOTALL | re.IGNORECASE)
+_QUOTED_RE = re.compile(r"'((?:[^']|'')*)'")
+_NAME = r"[\w\"`\[\]]+"
+_QUALIFIED = rf"{_NAME}(?:\s*\.\s*{_NAME})*"
+
+# DBML-like notation
+_DBML_BLOCK_RE = re.compile(rf"^\s*(?:(table|enum)\s+)?({_QUALIFIED})(?:\s+as\s+\w+)?\s*(?:\[[^\]]*\])?\s*\{{\s*$", re.IGNORECASE)
+_DBML_COLUMN_RE = re.compile(rf"^\s*({_NAME})\s+(\w+(?:\s*\([^)]*\))?)(.*)$")
+_DBML_COMMENT_RE = re.compile(r"\s(?:--|//)(.*)$")
+_DBML_REF_RE = re.compile(rf"(?:\bref\s*:\s*)?(?<![\w-])[<>-]\s*({_QUALIFIED})", re.IGNORECASE)
+_DBML_REF_LINE_RE = re.compile(rf"^\s*ref\b[^:]*:\s*({_QUALIFIED})\s*([<>-])\s*({_QUALIFIED})", re.IGNORECASE)
+
+# DDL
+_CREATE_RE = re.compile(rf"\bcreate\s+(?:temporary\s+)?table\s+(?:if\s+not\s+exists\s+)?({_QUALIFIED})\s*\(", re.IGNORECASE)
+_ALTER_FK_RE = re.compile(
+    rf"\balter\s+table\s+({_QUALIFIED})\s+add\s+(?:constraint\s+{_NAME}\s+)?foreign\s+key\s*\(\s*({_NAME})\s*\)"
+    rf"\s*references\s+({_QUALIFIED})\s*\(\s*({_NAME})\s*\)",
+    re.IGNORECASE,
+)
+_DDL_COLUMN_RE = re.compile(
+    rf"^\s*({_NAME})\s+(\w+(?:\s+(?:varying|precision|unsigned))?(?:\s*\((?:[^()']|'[^']*')*\))?)(.*)$", re.IGNORECASE | re.DOTALL
+)
+_DDL_REFERENCES_RE = re.compile(rf"\breferences\s+({_QUALIFIED})\s*(?:\(\s*({_NAME})\s*\))?", re.IGNORECASE)
+_DDL_COMMENT_RE = re.compile(r"\bcomment\s+'((?:[^']|'')*)'", re.IGNORECASE)
+_DDL_CHECK_IN_RE = re.compile(r"\bcheck\s*\(\s*[\w\"`]*\s+in\s*\(([^)]*)\)", re.IGNORECASE)
+_DDL_FK_RE = re.compile(
+    rf"^\s*(?:constraint\s+{_NAME}\s+)?foreign\s+key\s*\(\s*({_NAME})\s*\)\s*references\s+({_QUALIFIED})\s*\(\s*({_NAME})\s*\)",
+    re.IGNORECASE,
+)
+_DDL_KEY_RE = re.compile(r"^\s*(?:constraint\s+\S+\s+)?(primary\s+key|unique(?:\s+(?:key|index))?)\s*(?:\w+\s*)?\(([^)]*)\)", re.IGNORECASE)
+_BODY_TOKEN_RE = re.compile(r"'(?:[^']|'')*'|\"[^\"]*\"|`[^`]*`|[(),]")
+_UNIQUE_RE = re.compile(r"\bunique\b")
+_DDL_SKIP_RE = re.compile(r"^\s*(?:constraint|key|index|fulltext|spatial|check|period)\b", re.IGNORECASE)
+
+
+def _column(name: str, declared: str = "") -> ColumnDef:
+    return ColumnDef(normalise_name(name), " ".join(declared.lower().split()), False, False, False, None, None)
+
+
+def _reference(target: str, column: Optional[str] = None) -> str:
+    """"table.column" from "schema.table.column" or a table plus column."""
+    if column is not None:
+        return f"{normalise_table(target)}.{normalise_name(column)}"
+    table, _, column = normalise_name(target).rpartition(".")
+    return f"{normalise_table(table)}.{column}" if table else f"{column}."
+
+
+def _value_list(text: str) -> Optional[Tuple[str, ...]]:
+    """Values of a comment: quoted strings ('a', 'b'), else a short comma list (a, b, c)."""
+    quoted = [value.replace("''", "'") for value in _QUOTED_RE.findall(text)]
+    if len(quoted) >= 2:
+        return tuple(quoted)
+    items = [item.strip() for item in text.split(",")]
+    if len(items) >= 2 and all(item and len(item) <= 40 and len(item.split()) <= 3 for item in items):
+        return tuple(items)
+    return None
+
+
+def _table_body(text: str, start: int) -> Tuple[List[str], int]:
+    """Comma-separated items of a CREATE TABLE body starting after its "(", and the index of the closing ")".
+
+    Only parentheses, commas and quoted strings matter, so the scan jumps between them.
+    """
+    items, depth, item_start = [], 1, start
+    for token in _BODY_TOKEN_RE.finditer(text, start):
+        char = token.group()
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                items.append(text[item_start:token.start()])
+                return items, token.start()
+        elif char == "," and depth == 1:
+            items.append(text[item_start:token.start()])
+            item_start = token.end()
+    items.append(text[item_start:])
+    return items, len(text)
+
+
+def _parse_ddl(text: str) -> Schema:
+    text = re.sub(r"--[^\n]*", "", text)
+    schema: Schema = {}
+    for match in _CREATE_RE.finditer(text):
+        body, _ = _table_body(text, match.end())
+        table = TableDef(normalise_table(match.group(1)), {})
+        keys: List[Tuple[str, List[str]]] = []
+        for item in body:
+            if not item.strip():
+                continue
+            fk = _DDL_FK_RE.match(item)
+            if fk:
+                column = table.columns.setdefault(normalise_name(fk.group(1)), _column(fk.group(1)))
+                column.ref = _reference(fk.group(2), fk.group(3))
+                continue
+            key = _DDL_KEY_RE.match(item)
+            if key:
+                keys.append((key.group(1).lower(), [normalise_name(name) for name in key.group(2).split(",")]))
+                continue
+            if _DDL_SKIP_RE.match(item):
+                continue
+            definition = _DDL_COLUMN_RE.match(item)
+            if not definition:
+                continue
+            declared, rest = definition.group(2), definition.group(3)
+            column = _column(definition.group(1), declared)
+            lowered = rest.lower()
+            column.pk = "primary key" in lowered
+            column.unique = column.pk or bool(_UNIQUE_RE.search(lowered))
+            column.required = column.pk or "not null" in lowered
+            references = _DDL_REFERENCES_RE.search(rest)
+            if references:
+                column.ref = _reference(references.group(1), references.group(2))
+            if declared.lower().startswith(("enum", "set")):
+                column.enum = tuple(value.replace("''", "'") for value in _QUOTED_RE.findall(declared))
+            else:
+                check = _DDL_CHECK_IN_RE.search(rest)
+                comment = _DDL_COMMENT_RE.search(rest)
+                if check:
+                    column.enum = tuple(value.replace("''", "'") for value in _QUOTED_RE.findall(check.group(1)))
+                elif comment:
+                    column.enum = _value_list(comment.group(1).replace("''", "'"))
+            existing = table.columns.get(column.name)
+            if existing is not None and existing.ref and not column.ref:
+                # A FOREIGN KEY clause listed before the column definition
+                column.ref = existing.ref
+            table.columns[column.name] = column
+        for kind, names in keys:
+            for name in names:
+                column = table.columns.setdefault(name, _column(name))
+                if kind == "primary key":
+                    column.pk = column.required = True
+                if kind == "primary key" and len(names) > 1:
+                    continue
+                column.unique = True
+        schema[table.name] = table
+    for match in _ALTER_FK_RE.finditer(text):
+        table = schema.setdefault(normalise_table(match.group(1)), TableDef(normalise_table(match.group(1)), {}))
+        column = table.columns.setdefault(normalise_name(match.group(2)), _column(match.group(2)))
+        column.ref = _reference(match.group(3), match.group(4))
+    return schema
+
+
+def _parse_dbml(text: str) -> Schema:
+    schema: Schema = {}
+    enums: Dict[str, Tuple[str, ...]] = {}
+    refs: List[Tuple[str, str]] = []
+    table: Optional[TableDef] = None
+    enum: Optional[List[str]] = None
+    enum_name = ""
+    depth = 0
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith(("--", "//", "#")):
+            continue
+        if depth == 0:
+            block = _DBML_BLOCK_RE.match(line)
+            if block:
+                depth = 1
+                if (block.group(1) or "").lower() == "enum":
+                    enum, enum_name = [], normalise_name(block.group(2))
+                else:
+                    table = TableDef(normalise_table(block.group(2)), {})
+                    schema[table.name] = table
+                continue
+            ref = _DBML_REF_LINE_RE.match(line)
+            if ref:
+                source, target = (ref.group(3), ref.group(1)) if ref.group(2) == "<" else (ref.group(1), ref.group(3))
+                refs.append((_reference(source), _reference(target)))
+            continue
+        if stripped.startswith("}"):
+            depth -= 1
+            if depth == 0:
+                if enum is not None:
+                    enums[enum_name] = tuple(enum)
+                table, enum = None, None
+            continue
+        if stripped.endswith("{"):
+            # indexes { ... } and other nested blocks
+            depth += 1
+            continue
+        if depth > 1:
+            continue
+        if enum is not None:
+            value = _QUOTED_RE.match(stripped) or re.match(r'"([^"]*)"|(\S+)', stripped)
+            enum.append(next(group for group in value.groups() if group is not None))
+            continue
+        comment = _DBML_COMMENT_RE.search(line)
+        body = line[: comment.start()] if comment else line
+        definition = _DBML_COLUMN_RE.match(body)
+        if table is None or not definition or definition.group(1).lower() == "note":
+            continue
+        column = _column(definition.group(1), definition.group(2))
+        rest = definition.group(3)
+        settings = " ".join(re.findall(r"\[([^\]]*)\]", rest)) + " " + re.sub(r"\[[^\]]*\]", " ", rest)
+        lowered = settings.lower()
+        column.pk = bool(re.search(r"\b(?:pk|primary key)\b", lowered))
+        column.unique = column.pk or bool(_UNIQUE_RE.search(lowered))
+        column.required = column.pk or "not null" in lowered
+        ref = _DBML_REF_RE.search(settings)
+        if ref:
+            column.ref = _reference(ref.group(1))
+        if comment:
+            column.enum = _value_list(comment.group(1)) if _QUOTED_RE.search(comment.group(1)) else None
+        table.columns[column.name] = column
+    for table in schema.values():
+        for column in table.columns.values():
+            if column.enum is None and normalise_name(column.type) in enums:
+                column.enum = enums[normalise_name(column.type)]
+    for source, target in refs:
+        table_name, _, column_name = source.partition(".")
+        if table_name in schema and column_name in schema[table_name].columns:
+            schema[table_name].columns[column_name].ref = target
+    return schema
+
+
+def _resolve_bare_references(schema: Schema) -> None:
+    """"table." references (a bare "> table") point at that table's single-column primary key."""
+    for table in schema.values():
+        for column in table.columns.values():
+            if column.ref and column.ref.endswith("."):
+                target = schema.get(column.ref[:-1])
+                pks = [name for name, other in target.columns.items() if other.pk] if target else []
+                column.ref = f"{column.ref}{pks[0]}" if len(pks) == 1 else f"{column.ref}id"
+
+
+def parse_design(text: str) -> Schema:
+    """Tables of a DBML-like design or of SQL DDL; markdown is reduced to its ```dbml/```sql fences."""
+    fences = _FENCE_RE.findall(text)
+    if fences:
+        text = "\n".join(fences)
+    text = _BLOCK_COMMENT_RE.sub("", text)
+    schema = _parse_ddl(text) if _CREATE_RE.search(text) else _parse_dbml(text)
+    _resolve_bare_references(schema)
+    return schema
+
+
+def load_design(path: Union[str, Path]) -> Schema:
+    return parse_design(Path(path).read_text(encoding="utf-8"))
+
+
+def _description_values(description: str) -> Optional[Tuple[str, ...]]:
+    quoted = _QUOTED_RE.findall(description)
+    return tuple(quoted) if len(quoted) >= 2 else None
+
+
+def schema_from_sheets(sheets: Sequence[CatalogSheet]) -> Schema:
+    """Tables of the FRS mapping and database spec sheets; the first definition of a column wins."""
+    catalog = Catalog(sheets)
+    resolve_bare_targets([catalog])
+    schema: Schema = {}
+    for table in catalog.tables["table"]:
+        schema.setdefault(table, TableDef(table, {}))
+    columns = catalog.columns.drop_duplicates(KEYS)
+    for table, name, declared, pk, unique, required, description in zip(
+        columns["table"], columns["column"], columns["type"], columns["pk"], columns["unique"],
+        columns["required"], columns["description"],
+    ):
+        schema.setdefault(table, TableDef(table, {})).columns[name] = ColumnDef(
+            name, " ".join(str(declared).lower().split()), bool(pk), bool(unique) or bool(pk),
+            bool(required) or bool(pk), None, _description_values(str(description)),
+        )
+    for table, name in zip(catalog.pks["table"], catalog.pks["column"]):
+        column = schema.setdefault(table, TableDef(table, {})).columns.setdefault(name, ColumnDef(name, "", False, False, False, None, None))
+        column.pk = column.unique = column.required = True
+    fks = catalog.fks.drop_duplicates(KEYS)
+    for table, name, ref_table, ref_column in zip(fks["table"], fks["column"], fks["ref_table"], fks["ref_column"]):
+        column = schema.setdefault(table, TableDef(table, {})).columns.setdefault(name, ColumnDef(name, "", False, False, False, None, None))
+        column.ref = f"{ref_table}.{ref_column or 'id'}"
+    return schema
+
+
+def load_schema(sources: Sequence[Union[str, Path, Tuple[BinaryIO, str]]]) -> Schema:
+    """Tables of design files and of the spec/mapping sheets of workbooks; later files add to earlier ones.
+
+    Sources are paths or (binary file object, file name) pairs, e.g. uploads.
+    """
+    schema: Schema = {}
+    sheets: List[CatalogSheet] = []
+    for source in sources:
+        source, file_name = source if isinstance(source, tuple) else (source, Path(source).name)
+        if Path(file_name).suffix.lower() in DESIGN_SUFFIXES:
+            if isinstance(source, (str, Path)):
+                schema.update(load_design(source))
+            else:
+                schema.update(parse_design(source.read().decode("utf-8", errors="replace")))
+        else:
+            sheets.extend(read_catalog_sheets(source, file_name))
+    if sheets:
+        schema.update(schema_from_sheets(sheets))
+    return schema
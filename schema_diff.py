@@ -0,0 +1,264 @@
+"""
+Schema diff between two versions of a database design or of an uploaded workbook.
+
+A snapshot is the table schema (`schema_catalog`: parsed from a design file, or from the
+FRS mapping and database spec sheets of a workbook) plus, for workbooks, the profile of
+every sheet. `diff_snapshots` compares two of them in one pass over dicts keyed by table,
+column and sheet name, so the cost is linear in the size of the two versions:
+
+- tables and columns added or removed; per column, changed type, primary key, unique,
+  required, foreign key target and enum values,
+- sheets added or removed; per sheet, added/removed columns, changed dtypes and drift in
+  the profile (row count, null rate, numeric mean and spread). Sheets whose fingerprint is
+  unchanged are skipped without looking at their columns.
+
+The result is a compact JSON-able dict with only the non-empty parts, plus a `regenerate`
+list of the tables (changed, added, and those with foreign keys into a changed or removed
+table) and sheets whose test cases should be generated again.
+
+    python schema_diff.py database/design-v1.sql database/design-v2.sql
+    python schema_diff.py FRS_v1.xlsx FRS_v2.xlsx
+"""
+
+import argparse
+import json
+import math
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Dict, List, Mapping, Optional, Sequence, Set, Union
+
+from context_builder import build_file_profiles
+from cross_validation import read_catalog_sheets
+from schema_catalog import DESIGN_SUFFIXES, ColumnDef, Schema, TableDef, parse_design, schema_from_sheets
+
+# Profile drift thresholds
+ROW_COUNT_DRIFT = float(os.environ.get("SCHEMA_DIFF_ROW_COUNT_DRIFT", "0.2"))
+NULL_RATE_DRIFT = float(os.environ.get("SCHEMA_DIFF_NULL_RATE_DRIFT", "0.1"))
+# mean shift, in standard deviations of the old version
+MEAN_DRIFT = float(os.environ.get("SCHEMA_DIFF_MEAN_DRIFT", "0.5"))
+# ratio between the larger and the smaller standard deviation
+STD_DRIFT = float(os.environ.get("SCHEMA_DIFF_STD_DRIFT", "1.5"))
+
+_COLUMN_FIELDS = ("type", "pk", "unique", "required", "ref", "enum")
+
+
+@dataclass
+class Snapshot:
+    __slots__ = ("name", "schema", "profiles")
+
+    name: str
+    schema: Schema
+    # SheetProfiles or legacy context dicts; empty for design files
+    profiles: List[Mapping[str, Any]]
+
+
+def load_snapshot(source: Union[str, Path, IO[bytes]], file_name: Optional[str] = None) -> Snapshot:
+    """A design file (.sql/.dbml/.md/.txt) gives its schema; a workbook its profiles and catalog schema."""
+    file_name = file_name or str(source)
+    if Path(file_name).suffix.lower() in DESIGN_SUFFIXES:
+        if isinstance(source, (str, Path)):
+            text = Path(source).read_text(encoding="utf-8")
+        else:
+            text = source.read().decode("utf-8", errors="replace")
+        return Snapshot(Path(file_name).name, parse_design(text), [])
+    profiles = build_file_profiles(source, Path(file_name).name, profile_only=True)
+    if not isinstance(source, (str, Path)):
+        source.seek(0)
+    return Snapshot(Path(file_name).name, schema_from_sheets(read_catalog_sheets(source, Path(file_name).name)), profiles)
+
+
+def _column_changes(old: ColumnDef, new: ColumnDef) -> Dict[str, list]:
+    changes = {}
+    for field in _COLUMN_FIELDS:
+        before, after = getattr(old, field), getattr(new, field)
+        if field == "type":
+            # "decimal(10, 2)" and "decimal(10,2)" are the same type; an unknown type is no change
+            before, after = before.replace(" ", ""), after.replace(" ", "")
+            if not before or not after:
+                continue
+        if before != after:
+            changes[field] = [list(before) if isinstance(before, tuple) else before,
+                              list(after) if isinstance(after, tuple) else after]
+    return changes
+
+
+def _table_changes(old: TableDef, new: TableDef) -> Dict[str, Any]:
+    changes: Dict[str, Any] = {}
+    added = [name for name in new.columns if name not in old.columns]
+    removed = [name for name in old.columns if name not in new.columns]
+    changed = {}
+    for name, column in new.columns.items():
+        before = old.columns.get(name)
+        if before is not None:
+            column_changes = _column_changes(before, column)
+            if column_changes:
+                changed[name] = column_changes
+    if added:
+        changes["columns_added"] = added
+    if removed:
+        changes["columns_removed"] = removed
+    if changed:
+        changes["columns_changed"] = changed
+    return changes
+
+
+def diff_schemas(old: Schema, new: Schema) -> Dict[str, Any]:
+    """Tables and columns added, removed or changed between two schemas."""
+    diff: Dict[str, Any] = {}
+    added = [name for name in new if name not in old]
+    removed = [name for name in old if name not in new]
+    changed = {}
+    for name, table in new.items():
+        before = old.get(name)
+        if before is not None:
+            table_changes = _table_changes(before, table)
+            if table_changes:
+                changed[name] = table_changes
+    if added:
+        diff["tables_added"] = added
+    if removed:
+        diff["tables_removed"] = removed
+    if changed:
+        diff["tables_changed"] = changed
+    return diff
+
+
+def _profile_key(profile: Mapping[str, Any], duplicated: Set[str]) -> str:
+    sheet = str(profile["sheet"])
+    return f"{profile['file']} / {sheet}" if sheet in duplicated else sheet
+
+
+def _keyed_profiles(profiles: Sequence[Mapping[str, Any]]) -> Dict[str, Mapping[str, Any]]:
+    """Profiles by sheet name, so renamed workbook versions line up; "file / sheet" when a name repeats."""
+    seen: Set[str] = set()
+    duplicated: Set[str] = set()
+    for profile in profiles:
+        sheet = str(profile.get("sheet"))
+        (duplicated if sheet in seen else seen).add(sheet)
+    return {_profile_key(profile, duplicated): profile for profile in profiles if "error" not in profile}
+
+
+def _drift(old: Mapping[str, Any], new: Mapping[str, Any]) -> Dict[str, Any]:
+    drift: Dict[str, Any] = {}
+    old_rows, new_rows = int(old["num_rows"]), int(new["num_rows"])
+    if abs(new_rows - old_rows) > ROW_COUNT_DRIFT * max(old_rows, 1):
+        drift["num_rows"] = [old_rows, new_rows]
+    # Null counts of a profile-only read come from the sampled rows
+    old_read, new_read = max(old.get("sampled_rows") or old_rows, 1), max(new.get("sampled_rows") or new_rows, 1)
+    old_nulls, new_nulls = old["null_counts"], new["null_counts"]
+    old_stats, new_stats = old.get("statistics") or {}, new.get("statistics") or {}
+    columns = {}
+    for column, new_null in new_nulls.items():
+        if column not in old_nulls:
+            continue
+        column_drift = {}
+        old_rate, new_rate = old_nulls[column] / old_read, new_null / new_read
+        if abs(new_rate - old_rate) > NULL_RATE_DRIFT:
+            column_drift["null_rate"] = [round(old_rate, 3), round(new_rate, 3)]
+        before, after = old_stats.get(column), new_stats.get(column)
+        if before and after:
+            old_std, new_std = before["std"], after["std"]
+            if not (math.isnan(before["mean"]) or math.isnan(after["mean"])):
+                scale = old_std if old_std and not math.isnan(old_std) else abs(before["mean"]) or 1.0
+                if abs(after["mean"] - before["mean"]) > MEAN_DRIFT * scale:
+                    column_drift["mean"] = [round(before["mean"], 4), round(after["mean"], 4)]
+            if old_std and new_std and not (math.isnan(old_std) or math.isnan(new_std)):
+                if max(old_std, new_std) > STD_DRIFT * min(old_std, new_std):
+                    column_drift["std"] = [round(old_std, 4), round(new_std, 4)]
+        if column_drift:
+            columns[str(column)] = column_drift
+    if columns:
+        drift["columns"] = columns
+    return drift
+
+
+def _sheet_changes(old: Mapping[str, Any], new: Mapping[str, Any]) -> Dict[str, Any]:
+    changes: Dict[str, Any] = {}
+    old_types, new_types = old["data_types"], new["data_types"]
+    added = [str(column) for column in new_types if column not in old_types]
+    removed = [str(column) for column in old_types if column not in new_types]
+    dtypes = {
+        str(column): [old_types[column], dtype]
+        for column, dtype in new_types.items()
+        if column in old_types and old_types[column] != dtype
+    }
+    if added:
+        changes["columns_added"] = added
+    if removed:
+        changes["columns_removed"] = removed
+    if dtypes:
+        changes["dtypes"] = dtypes
+    drift = _drift(old, new)
+    if drift:
+        changes["drift"] = drift
+    return changes
+
+
+def diff_profiles(old: Sequence[Mapping[str, Any]], new: Sequence[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Sheets added, removed, restructured or drifting between two sets of sheet profiles."""
+    diff: Dict[str, Any] = {}
+    before, after = _keyed_profiles(old), _keyed_profiles(new)
+    added = [key for key in after if key not in before]
+    removed = [key for key in before if key not in after]
+    changed = {}
+    for key, profile in after.items():
+        previous = before.get(key)
+        if previous is None or previous.get("fingerprint") == profile.get("fingerprint"):
+            continue
+        sheet_changes = _sheet_changes(previous, profile)
+        if sheet_changes:
+            changed[key] = sheet_changes
+    if added:
+        diff["sheets_added"] = added
+    if removed:
+        diff["sheets_removed"] = removed
+    if changed:
+        diff["sheets_changed"] = changed
+    return diff
+
+
+def regeneration_targets(diff: Mapping[str, Any], new: Schema) -> Dict[str, List[str]]:
+    """Tables and sheets whose test cases are stale: what changed, plus tables with foreign keys into it."""
+    changed = set(diff.get("tables_added", ())) | set(diff.get("tables_changed", ()))
+    touched = changed | set(diff.get("tables_removed", ()))
+    referencing = {
+        table.name
+        for table in new.values()
+        for column in table.columns.values()
+        if column.ref and column.ref.partition(".")[0] in touched and table.name != column.ref.partition(".")[0]
+    }
+    targets = {}
+    tables = [name for name in new if name in changed or name in referencing]
+    sheets = [*diff.get("sheets_added", ()), *diff.get("sheets_changed", ())]
+    if tables:
+        targets["tables"] = tables
+    if sheets:
+        targets["sheets"] = sheets
+    return targets
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> Dict[str, Any]:
+    """Compact diff of two snapshots; only the parts that changed appear."""
+    diff = {"old": old.name, "new": new.name, **diff_schemas(old.schema, new.schema), **diff_profiles(old.profiles, new.profiles)}
+    summary = {key: len(value) for key, value in diff.items() if key not in ("old", "new")}
+    targets = regeneration_targets(diff, new.schema)
+    if targets:
+        diff["regenerate"] = targets
+    diff["summary"] = summary
+    return diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two versions of a database design or workbook.")
+    parser.add_argument("old", help="older design (.sql/.dbml/.md) or workbook (.xlsx/.csv/.parquet)")
+    parser.add_argument("new", help="newer version of the same design or workbook")
+    parser.add_argument("--indent", type=int, default=2, help="JSON indentation (0 for one line)")
+    args = parser.parse_args()
+
+    diff = diff_snapshots(load_snapshot(args.old), load_snapshot(args.new))
+    print(json.dumps(diff, indent=args.indent or None, ensure_ascii=False, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Section-wise analysis: one concurrent completion per report section.
+
+A single analysis completion writes all six sections (scenarios, test cases, SQL, data
+quality, automation, risk) one token after another, and a timeout loses all of them.
+`run_sectioned_analysis` asks for each section separately and concurrently instead. The
+prompts differ only in their last message (see `prompt_builder.prepare_section_prompt`),
+so they share the cacheable system + data-context prefix. Sections are assembled in report
+order as they finish; each one is retried on its own, and a section that keeps failing
+becomes a placeholder instead of failing the report.
+
+Wall-clock time drops to roughly that of the longest section, i.e. about the number of
+sections when the provider serves them in parallel.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from prompt_builder import ANALYSIS_SECTIONS, prepare_section_prompt
+from token_budget import PromptTooLarge, TokenPlan
+
+logger = logging.getLogger(__name__)
+
+SECTION_RETRIES = int(os.environ.get("ANALYSIS_SECTION_RETRIES", "2"))
+SECTION_RETRY_BACKOFF = float(os.environ.get("ANALYSIS_SECTION_RETRY_BACKOFF", "1.0"))
+SECTION_WORKERS = int(os.environ.get("ANALYSIS_SECTION_WORKERS", str(len(ANALYSIS_SECTIONS))))
+
+# complete(messages, plan) -> section markdown
+SectionCompleter = Callable[[List[Dict[str, str]], TokenPlan], Optional[str]]
+
+
+def _generate_section(data_context: List[Dict[str, Any]], index: int, complete: SectionCompleter,
+                      retries: int, stop: Tuple[type, ...]) -> Tuple[str, int]:
+    """(section markdown, retries used); raises the last error once retries are exhausted."""
+    messages, plan = prepare_section_prompt(data_context, index)
+    for attempt in range(retries + 1):
+        try:
+            text = complete(messages, plan)
+            if text and text.strip():
+                return text.strip(), attempt
+            raise ValueError("empty section")
+        except (PromptTooLarge, *stop):
+            raise
+        except Exception:
+            if attempt == retries:
+                raise
+            logger.warning("analysis section %d failed (attempt %d); retrying", index + 1, attempt + 1, exc_info=True)
+            time.sleep(SECTION_RETRY_BACKOFF * (attempt + 1))
+    raise RuntimeError("unreachable")
+
+
+def run_sectioned_analysis(
+    data_context: List[Dict[str, Any]],
+    complete: SectionCompleter,
+    on_section: Optional[Callable[[int, str], None]] = None,
+    retries: int = SECTION_RETRIES,
+    max_workers: int = SECTION_WORKERS,
+    stop: Tuple[type, ...] = (),
+) -> Tuple[str, Dict[str, int]]:
+    """Generate every report section concurrently and assemble them in order.
+
+    `on_section(index, markdown)` is called as each section finishes (in completion order).
+    Exceptions of the types in `stop` (e.g. a job cancellation) are not retried and abort
+    the report. Returns the markdown report and stats with `sections`, `failed` and `retries`.
+    """
+    sections: List[Optional[str]] = [None] * len(ANALYSIS_SECTIONS)
+    stats = {"sections": len(ANALYSIS_SECTIONS), "failed": 0, "retries": 0}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="analysis-section") as pool:
+        futures = {
+            pool.submit(_generate_section, data_context, index, complete, retries, stop): index
+            for index in range(len(ANALYSIS_SECTIONS))
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            number, title = ANALYSIS_SECTIONS[index]
+            try:
+                text, used = future.result()
+                stats["retries"] += used
+            except (PromptTooLarge, *stop):
+                for pending in futures:
+                    pending.cancel()
+                raise
+            except Exception as e:
+                logger.error("analysis section %d (%s) failed after %d retries: %s", number, title, retries, e)
+                stats["failed"] += 1
+                stats["retries"] += retries
+                text = f"## {number}. {title}\n\n_This section could not be generated: {e}_"
+            sections[index] = text
+            if on_section is not None:
+                on_section(index, text)
+
+    return "\n\n".join(s for s in sections if s), stats
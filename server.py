@@ -1,16 +1,55 @@
 import os
-import io
-from typing import List, Optional
+import logging
+import shutil
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from typing import Dict, List, Mapping, Optional
 from pathlib import Path
-import json
 
-import pandas as pd
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv, find_dotenv
-from openai import OpenAI, AzureOpenAI
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+
+from chat_batcher import ChatSqlBatcher, build_batch_question, parse_batch_response
+from context_builder import build_file_profiles, context_fingerprint
+from cross_validation import catalog_role, read_catalog_sheets, validation_context
+from http_transport import close_http_clients
+from incremental_analysis import FragmentStore, run_incremental_analysis
+from job_queue import JobCancelled, JobQueue, QueueFullError
+from llm_client import create_client, resolve_model
+from metrics import collect_timings, observe_stage, record_cache, record_fallback, render_prometheus
+from model_tiers import ModelRouter, resolve_tier_models
+from prompt_builder import (
+    ANALYSIS_SECTIONS,
+    log_prompt_cache_usage,
+    prepare_messages,
+    prepare_section_prompt,
+    prepare_test_analysis_prompt,
+)
+from schema_catalog import load_schema
+from schema_diff import diff_snapshots, load_snapshot
+from sectioned_analysis import run_sectioned_analysis
+from shared_state import SharedState
+from structured_output import CHAT_SQL_SCHEMA, create_structured_completion, extract_fields
+from synthetic_data import generate_dataset
+from testcase_export import FORMATS, iter_csv, write_xlsx
+from testcase_store import KINDS, TestCaseStore
+from token_budget import PromptTooLarge, TokenPlan
+from upload_handling import (
+    MAX_UPLOAD_REQUEST_BYTES,
+    UploadLimitMiddleware,
+    UploadTooLarge,
+    check_file_size,
+    current_rss_mb,
+    open_upload,
+    peak_rss_mb,
+)
 
 # Load env from common locations
 load_dotenv(find_dotenv(usecwd=True), override=False)
@@ -18,32 +57,101 @@ src_dir = Path(__file__).resolve().parent
 load_dotenv(src_dir / ".env", override=False)
 load_dotenv(src_dir.parent / ".env", override=False)
 
-# In-memory context parsed from latest uploads
-DATA_CONTEXT: List[dict] = []
+logging.basicConfig(format="%(levelname)s %(name)s: %(message)s")
+logging.getLogger("prompt_builder").setLevel(logging.INFO)
+logger = logging.getLogger("server")
+
+# Parsed sheets of recent uploads keyed by (sha256, filename, profile_only), so re-uploads skip parsing
+_UPLOAD_CACHE: "OrderedDict[tuple, List[Mapping]]" = OrderedDict()
+_UPLOAD_CACHE_MAX = 32
+
+# In-memory context parsed from latest uploads. Sheets are kept as compact SheetProfile
+# objects (read-only mappings with the legacy dict keys); failed files as {"file", "error"} dicts.
+DATA_CONTEXT: List[Mapping] = []
+
+# Production mode (uvicorn --workers N): the context, the upload parse cache and worker
+# readiness live in a shared SQLite WAL database so every worker sees the same uploads.
+SERVER_MODE = os.environ.get("SERVER_MODE", "single")
+SHARED_STATE: Optional[SharedState] = (
+    SharedState(
+        Path(os.environ.get("SHARED_STATE_DB", src_dir / "cache" / "shared_state.sqlite3")),
+        upload_cache_max=_UPLOAD_CACHE_MAX,
+    )
+    if SERVER_MODE == "production"
+    else None
+)
+
+def current_context() -> List[Mapping]:
+    return SHARED_STATE.load_context() if SHARED_STATE is not None else DATA_CONTEXT
+
+def add_to_context(items: List[Mapping]) -> int:
+    """Append parsed items to the context; returns the new total."""
+    if SHARED_STATE is not None:
+        return SHARED_STATE.append_context(items)
+    DATA_CONTEXT.extend(items)
+    return len(DATA_CONTEXT)
 
-# Initialize client (prefer Azure)
+def _cached_upload(key: tuple) -> Optional[List[Mapping]]:
+    if SHARED_STATE is not None:
+        return SHARED_STATE.get_upload("|".join(map(str, key)))
+    cached = _UPLOAD_CACHE.get(key)
+    if cached is not None:
+        _UPLOAD_CACHE.move_to_end(key)
+    return cached
+
+def _cache_upload(key: tuple, items: List[Mapping]) -> None:
+    if SHARED_STATE is not None:
+        SHARED_STATE.put_upload("|".join(map(str, key)), items)
+        return
+    _UPLOAD_CACHE[key] = items
+    if len(_UPLOAD_CACHE) > _UPLOAD_CACHE_MAX:
+        _UPLOAD_CACHE.popitem(last=False)
+
+# LLM client (prefer Azure). The model is resolved from the environment up front; the client,
+# and with it the OpenAI SDK, is built on first use or by the warm-up hook.
 AZURE_ENDPOINT = os.environ.get("AZURE_OPENAI_ENDPOINT")
 AZURE_API_KEY = os.environ.get("AZURE_OPENAI_API_KEY")
-AZURE_API_VERSION = os.environ.get("AZURE_OPENAI_API_VERSION", "2025-01-01-preview")
 AZURE_DEPLOYMENT = os.environ.get("AZURE_OPENAI_DEPLOYMENT")
 HF_TOKEN = os.environ.get("HF_TOKEN")
+LLM_BASE_URL = os.environ.get("LLM_BASE_URL")
 
-client = None
-MODEL_NAME: Optional[str] = None
+MODEL_NAME, PROVIDER = resolve_model()
+# Short structured tasks go to the small tier and escalate to MODEL_NAME when their output fails validation
+ROUTER = ModelRouter(resolve_tier_models(MODEL_NAME, PROVIDER))
+_client = None
+_client_lock = threading.Lock()
 
-if AZURE_ENDPOINT and AZURE_API_KEY and AZURE_DEPLOYMENT:
-    client = AzureOpenAI(
-        azure_endpoint=AZURE_ENDPOINT,
-        api_key=AZURE_API_KEY,
-        api_version=AZURE_API_VERSION,
-    )
-    MODEL_NAME = AZURE_DEPLOYMENT
-else:
-    if HF_TOKEN:
-        client = OpenAI(base_url="https://router.huggingface.co/v1", api_key=HF_TOKEN)
-        MODEL_NAME = "moonshotai/Kimi-K2-Instruct"
+def get_client():
+    global _client
+    if _client is None and MODEL_NAME:
+        with _client_lock:
+            if _client is None:
+                _client = create_client()[0]
+    return _client
+
+# Heavy imports (pandas, openpyxl, OpenAI SDK) happen in a background warm-up after the port
+# is bound; /api/ready reports 503 until it has finished.
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "1") != "0"
+READY = threading.Event()
+
+def warm_up() -> None:
+    try:
+        with observe_stage("warmup"):
+            import openpyxl  # noqa: F401
+            import pandas  # noqa: F401
+            import sheet_profile  # noqa: F401
+            get_client()
+            # Decode the shared context once so the first chat request does not pay for it
+            current_context()
+    except Exception:
+        logger.exception("warm-up failed; dependencies will load on first use")
+    finally:
+        READY.set()
+        if SHARED_STATE is not None:
+            SHARED_STATE.mark_ready()
 
 app = FastAPI(title="Simple LlamaIndex Analyzer API", version="1.0.0")
+app.add_middleware(UploadLimitMiddleware, max_bytes=MAX_UPLOAD_REQUEST_BYTES)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -57,58 +165,404 @@ app.add_middleware(
 async def favicon() -> Response:
     return Response(status_code=204)
 
+# Background analysis jobs (persisted so a restart resumes queued work)
+JOB_QUEUE = JobQueue(
+    Path(os.environ.get("ANALYSIS_JOB_DB", src_dir / "cache" / "jobs.sqlite3")),
+    max_workers=int(os.environ.get("ANALYSIS_JOB_WORKERS", "2")),
+    max_queue_depth=int(os.environ.get("ANALYSIS_JOB_MAX_QUEUE", "20")),
+)
+
+# Scenarios, test cases and SQL of every finished analysis, searchable across runs
+TESTCASE_STORE = TestCaseStore(Path(os.environ.get("TESTCASE_DB", src_dir / "cache" / "testcases.sqlite3")))
+
+@app.on_event("startup")
+async def register_worker() -> None:
+    if SHARED_STATE is not None:
+        SHARED_STATE.register_worker()
+        SHARED_STATE.start_heartbeat()
+
+@app.on_event("startup")
+async def resume_analysis_jobs() -> None:
+    if SHARED_STATE is not None:
+        # Leave jobs alone that another live worker is still running
+        JOB_QUEUE.resume_pending(live_workers=[w["id"] for w in SHARED_STATE.workers()])
+    else:
+        JOB_QUEUE.resume_pending()
+
+@app.on_event("startup")
+async def start_warm_up() -> None:
+    if WARMUP_ON_STARTUP:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    else:
+        READY.set()
+        if SHARED_STATE is not None:
+            SHARED_STATE.mark_ready()
+
+@app.on_event("shutdown")
+async def stop_analysis_jobs() -> None:
+    JOB_QUEUE.shutdown()
+    if SHARED_STATE is not None:
+        SHARED_STATE.unregister_worker()
+    close_http_clients()
+
 class ChatRequest(BaseModel):
     message: str
 
 class ChatResponse(BaseModel):
     sqlQuery: str
     description: str
+    # Per-stage seconds, only included when requested with ?timings=true
+    timings: Optional[Dict[str, float]] = None
+
+class AnalysisJobRequest(BaseModel):
+    # "full": one completion over all sheets; "per_sheet": one per sheet, reusing unchanged fragments;
+    # "sections": one concurrent completion per report section
+    mode: str = "full"
+
 
+def parse_excel_to_context_from_uploads(files: List[UploadFile], profile_only: bool = False) -> List[Mapping]:
+    """Mirror of parse_excel_to_context but for uploaded files (file-like): Excel, CSV or Parquet.
 
-def parse_excel_to_context_from_uploads(files: List[UploadFile]) -> List[dict]:
-    """Mirror of parse_excel_to_context but for uploaded files (file-like)."""
-    all_content: List[dict] = []
+    Reads the spooled upload in place (memory-mapped when on disk) and reuses the parsed
+    sheets of a byte-identical file uploaded earlier.
+    """
+    all_content: List[Mapping] = []
+    # Files with FRS mapping or database spec sheets, by hash, cross-validated below
+    catalog_files: Dict[str, UploadFile] = {}
 
     for uf in files:
         try:
-            content = io.BytesIO(uf.file.read())
-            excel_file = pd.ExcelFile(content)
-            file_name = uf.filename
-
-            for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(content, sheet_name=sheet_name)
-                context = {
-                    "file": file_name,
-                    "sheet": sheet_name,
-                    "columns": df.columns.tolist(),
-                    "num_rows": int(len(df)),
-                    "sample_data": df.head(5).to_dict(),
-                    "data_types": df.dtypes.astype(str).to_dict(),
-                    "null_counts": df.isnull().sum().to_dict(),
-                    "unique_counts": {col: int(df[col].nunique()) for col in df.columns},
-                }
-                numeric_cols = df.select_dtypes(include=["number"]).columns
-                if len(numeric_cols) > 0:
-                    context["statistics"] = df[numeric_cols].describe().to_dict()
-                all_content.append(context)
+            with open_upload(uf.file) as (buffer, file_hash):
+                key = (file_hash, uf.filename, profile_only)
+                cached = _cached_upload(key)
+                record_cache("upload_parse", cached is not None)
+                if cached is None:
+                    cached = build_file_profiles(buffer, uf.filename, profile_only=profile_only)
+                    _cache_upload(key, cached)
+            all_content.extend(cached)
+            if any(catalog_role(item) for item in cached):
+                catalog_files[file_hash] = uf
         except Exception as e:
             all_content.append({"file": uf.filename, "error": str(e)})
 
+    if {"mapping", "spec"} <= {catalog_role(item) for item in all_content}:
+        all_content.extend(_cross_validate_uploads(catalog_files))
     return all_content
 
+def _cross_validate_uploads(uploads: Dict[str, UploadFile]) -> List[Mapping]:
+    """Findings of comparing every row of the uploaded FRS mapping and database spec sheets.
+
+    The profiles only hold a sample, so the files are read again (recognised columns only);
+    the resulting context item is cached under the files' hashes like a parsed upload.
+    """
+    key = ("cross_validation", *sorted(f"{file_hash}:{uf.filename}" for file_hash, uf in uploads.items()))
+    cached = _cached_upload(key)
+    record_cache("cross_validation", cached is not None)
+    if cached is not None:
+        return cached
+    try:
+        sheets = []
+        for uf in uploads.values():
+            with open_upload(uf.file) as (buffer, _):
+                sheets.extend(read_catalog_sheets(buffer, uf.filename))
+        validation = validation_context(sheets)
+    except Exception:
+        logger.exception("cross-validating the FRS mapping and database spec failed")
+        return []
+    cached = [validation] if validation is not None else []
+    _cache_upload(key, cached)
+    return cached
+
 @app.get("/api/health")
 async def health():
-    provider = "azure" if (AZURE_ENDPOINT and AZURE_API_KEY and AZURE_DEPLOYMENT) else ("huggingface" if HF_TOKEN else "none")
-    return {"ok": True, "provider": provider, "model": MODEL_NAME, "context_items": len(DATA_CONTEXT)}
+    if LLM_BASE_URL:
+        provider = "openai-compatible"
+    else:
+        provider = "azure" if (AZURE_ENDPOINT and AZURE_API_KEY and AZURE_DEPLOYMENT) else ("huggingface" if HF_TOKEN else "none")
+    result = {
+        "ok": True,
+        "ready": READY.is_set(),
+        "provider": provider,
+        "model": MODEL_NAME,
+        "models": ROUTER.models,
+        "context_items": len(current_context()),
+        "mode": SERVER_MODE,
+    }
+    if SHARED_STATE is not None:
+        # This worker plus every worker seen recently, with its readiness
+        result["worker"] = SHARED_STATE.worker_id
+        result["workers"] = SHARED_STATE.workers()
+    return result
+
+@app.get("/api/ready")
+async def ready():
+    if not READY.is_set():
+        raise HTTPException(status_code=503, detail="Warming up")
+    return {"ready": True}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
 
 @app.post("/api/context/upload")
-async def context_upload(files: List[UploadFile] = File(...)):
-    global DATA_CONTEXT
-    before = len(DATA_CONTEXT)
-    new_items = parse_excel_to_context_from_uploads(files)
+async def context_upload(files: List[UploadFile] = File(...), timings: bool = False, profile_only: bool = False):
+    # Reject oversized files before any parsing work
+    try:
+        for uf in files:
+            check_file_size(uf.file, uf.filename)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    rss_before = current_rss_mb()
+    with collect_timings() as stage_timings:
+        new_items = parse_excel_to_context_from_uploads(files, profile_only=profile_only)
+    rss_after = current_rss_mb()
     # Append only new parsed entries
-    DATA_CONTEXT.extend(new_items)
-    return {"ok": True, "added": len(new_items), "total": len(DATA_CONTEXT)}
+    total = add_to_context(new_items)
+    result = {"ok": True, "added": len(new_items), "total": total}
+    if timings:
+        result["timings"] = {stage: round(seconds, 6) for stage, seconds in stage_timings.items()}
+        # Resident memory gained while parsing this upload; the peak is the whole process's
+        result["rss_delta_mb"] = round(rss_after - rss_before, 1) if rss_before is not None and rss_after is not None else None
+        result["process_peak_rss_mb"] = peak_rss_mb()
+    return result
+
+def _complete_text(task: str, messages: List[Dict[str, str]], plan: TokenPlan) -> str:
+    def attempt(model: str) -> str:
+        with observe_stage("llm_call"):
+            completion = get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=plan.max_tokens,
+                temperature=0.7,
+            )
+        log_prompt_cache_usage(task, completion, plan)
+        return completion.choices[0].message.content or ""
+
+    return ROUTER.run(task, attempt, accept=lambda text: bool(text.strip()))
+
+def _complete_analysis(data_context: List[dict]) -> str:
+    messages, plan = prepare_test_analysis_prompt(data_context)
+    return _complete_text("analysis", messages, plan)
+
+def _index_analysis(result: dict, data_context: List[dict], mode: str) -> dict:
+    """Store the report's test cases for search; indexing problems never fail the job."""
+    try:
+        result["run_id"], result["indexed"], result["duplicates"] = TESTCASE_STORE.add_analysis(
+            result["analysis"], data_context, model=MODEL_NAME, origin=f"analysis_job:{mode}"
+        )
+    except Exception:
+        logger.exception("indexing the analysis test cases failed")
+    return result
+
+def run_analysis_job(params: dict, job) -> dict:
+    data_context = params["data_context"]
+    mode = params.get("mode") or "full"
+    if mode == "sections":
+        finished = 0
+
+        def complete_section(messages: List[Dict[str, str]], plan: TokenPlan) -> str:
+            job.raise_if_cancelled()
+            return _complete_text("analysis_section", messages, plan)
+
+        def section_done(index: int, text: str) -> None:
+            nonlocal finished
+            finished += 1
+            job.report_progress(finished / len(ANALYSIS_SECTIONS))
+
+        analysis, stats = run_sectioned_analysis(data_context, complete_section, section_done, stop=(JobCancelled,))
+        job.raise_if_cancelled()
+        return _index_analysis({"analysis": analysis, "stats": stats}, data_context, mode)
+
+    if mode != "per_sheet":
+        job.raise_if_cancelled()
+        analysis = _complete_analysis(data_context)
+        # A cancel that arrived mid-completion still discards the result
+        job.raise_if_cancelled()
+        return _index_analysis({"analysis": analysis}, data_context, mode)
+
+    sheets = [ctx for ctx in data_context if "error" not in ctx]
+    done = 0
+
+    def generate(ctx: dict) -> str:
+        nonlocal done
+        job.raise_if_cancelled()
+        fragment = _complete_analysis([ctx])
+        done += 1
+        job.report_progress(done / max(len(sheets), 1))
+        return fragment
+
+    analysis, stats = run_incremental_analysis(data_context, generate, FragmentStore(namespace=MODEL_NAME or "default"))
+    return _index_analysis({"analysis": analysis, "stats": stats}, data_context, mode)
+
+JOB_QUEUE.register("analysis", run_analysis_job)
+
+@app.post("/api/analysis/jobs", status_code=202)
+async def create_analysis_job(req: AnalysisJobRequest):
+    if not MODEL_NAME:
+        raise HTTPException(status_code=503, detail="No LLM configured")
+    data_context = current_context()
+    if not data_context:
+        raise HTTPException(status_code=400, detail="Upload files before starting an analysis")
+    if req.mode not in ("full", "per_sheet", "sections"):
+        raise HTTPException(status_code=400, detail="mode must be 'full', 'per_sheet' or 'sections'")
+    # Reject prompts that cannot fit the context window now rather than after queueing
+    try:
+        if req.mode == "full":
+            prepare_test_analysis_prompt(data_context)
+        elif req.mode == "sections":
+            for index in range(len(ANALYSIS_SECTIONS)):
+                prepare_section_prompt(data_context, index)
+        else:
+            for ctx in data_context:
+                if "error" not in ctx:
+                    prepare_test_analysis_prompt([ctx])
+    except PromptTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        job_id = JOB_QUEUE.submit(
+            "analysis", {"mode": req.mode, "data_context": [dict(ctx) for ctx in data_context]}
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"id": job_id, "status": "queued"}
+
+@app.get("/api/analysis/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/analysis/jobs/{job_id}/cancel")
+async def cancel_analysis_job(job_id: str):
+    if not JOB_QUEUE.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job not found or already finished")
+    return JOB_QUEUE.get(job_id)
+
+@app.get("/api/testcases/search")
+async def search_testcases(
+    q: str = "",
+    kind: Optional[str] = None,
+    priority: Optional[str] = None,
+    file: Optional[str] = None,
+    sheet: Optional[str] = None,
+    workbook: Optional[str] = None,
+    limit: int = 20,
+    include_duplicates: bool = False,
+):
+    if kind is not None and kind not in KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(KINDS)}")
+    if not 1 <= limit <= 200:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 200")
+    with collect_timings() as stage_timings, observe_stage("testcase_search"):
+        results = TESTCASE_STORE.search(q, kind, priority, file, sheet, workbook, limit, include_duplicates)
+    return {
+        "query": q,
+        "count": len(results),
+        "results": results,
+        "took_ms": round(stage_timings.get("testcase_search", 0.0) * 1000, 3),
+    }
+
+# Plain def: FastAPI runs it in the threadpool, so writing a large workbook does not block the event loop
+@app.get("/api/testcases/export")
+def export_testcases(
+    format: str = "xlsx",
+    kind: Optional[str] = None,
+    priority: Optional[str] = None,
+    file: Optional[str] = None,
+    sheet: Optional[str] = None,
+    workbook: Optional[str] = None,
+    run: Optional[int] = None,
+    include_duplicates: bool = False,
+):
+    """Stored test cases as a download: XLSX with one sheet per section, or CSV (pass `run` from an analysis job's result)."""
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    if kind is not None and kind not in KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(KINDS)}")
+    records = TESTCASE_STORE.iter_records(kind, priority, file, sheet, workbook, run, include_duplicates)
+    name = f"testcases{f'-run{run}' if run is not None else ''}.{format}"
+    if format == "csv":
+        return StreamingResponse(
+            iter_csv(records, kind),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{name}"'},
+        )
+    # The zip container is only complete once saved, so the workbook goes through a temporary file
+    fd, path = tempfile.mkstemp(suffix=".xlsx", prefix="testcases-")
+    os.close(fd)
+    try:
+        with observe_stage("testcase_export"):
+            write_xlsx(records, path)
+    except Exception:
+        os.unlink(path)
+        raise
+    return FileResponse(
+        path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename=name,
+        background=BackgroundTask(os.unlink, path),
+    )
+
+# Plain def: both versions are parsed in the threadpool
+@app.post("/api/schema/diff")
+def schema_diff(old: UploadFile = File(...), new: UploadFile = File(...)):
+    """Compact diff of two versions of a database design (.sql/.dbml/.md) or workbook, with the tables and sheets to regenerate."""
+    try:
+        for uf in (old, new):
+            check_file_size(uf.file, uf.filename)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    snapshots = []
+    for uf in (old, new):
+        try:
+            with open_upload(uf.file) as (buffer, _):
+                snapshots.append(load_snapshot(buffer, uf.filename or "upload"))
+        except Exception as e:
+            logger.exception("reading %s for the schema diff failed", uf.filename)
+            raise HTTPException(status_code=400, detail=f"Could not read {uf.filename}: {e}")
+    with observe_stage("schema_diff"):
+        return diff_snapshots(*snapshots)
+
+# Upper bound of rows per table for /api/testdata; larger volumes go through `python synthetic_data.py`
+TESTDATA_MAX_ROWS = int(os.environ.get("TESTDATA_MAX_ROWS", "100000"))
+
+@app.post("/api/testdata")
+def generate_testdata(files: List[UploadFile] = File(...), rows: int = 1000, seed: int = 0):
+    """Synthetic rows for the tables of uploaded designs or spec/mapping workbooks, as a zip of CSV files."""
+    if not 1 <= rows <= TESTDATA_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"rows must be between 1 and {TESTDATA_MAX_ROWS}")
+    try:
+        for uf in files:
+            check_file_size(uf.file, uf.filename)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        schema = load_schema([(uf.file, uf.filename or "upload") for uf in files])
+    except Exception as e:
+        logger.exception("reading the table definitions for test data failed")
+        raise HTTPException(status_code=400, detail=f"Could not read the table definitions: {e}")
+    if not schema:
+        raise HTTPException(status_code=400, detail="No table definitions found in the uploaded files")
+    out_dir = tempfile.mkdtemp(prefix="testdata-")
+    try:
+        with observe_stage("testdata"):
+            # One process: request threads should not fork worker pools
+            results = generate_dataset(schema, out_dir, rows, "csv", seed, workers=1)
+            path = os.path.join(out_dir, "testdata.zip")
+            with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+                for result in results.values():
+                    archive.write(result["path"], os.path.basename(result["path"]))
+                    os.unlink(result["path"])
+    except Exception:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        raise
+    return FileResponse(
+        path,
+        media_type="application/zip",
+        filename="testdata.zip",
+        background=BackgroundTask(shutil.rmtree, out_dir, ignore_errors=True),
+    )
 
 _HEURISTICS = [
     (
@@ -139,42 +593,68 @@ _HEURISTICS = [
     ),
 ]
 
-@app.post("/api/chat-sql", response_model=ChatResponse)
-async def chat_sql(req: ChatRequest):
-    user_message = req.message.strip()
+def _has_sql(data: Optional[Mapping]) -> bool:
+    return bool(data and (data.get("sqlQuery") or data.get("sql")))
 
-    if client and MODEL_NAME and DATA_CONTEXT:
-        try:
-            context_str = json.dumps(DATA_CONTEXT, indent=2, default=str)
-            prompt = f"""
-You are a Senior QA Engineer. Use the following Data Context (summaries of uploaded Excel sheets) to answer.
-Return a JSON object with fields "sqlQuery" and "description".
-
-Data Context:
-{context_str}
-
-User request: {user_message}
-Format strictly as JSON.
-"""
-            completion = client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=[
-                    {"role": "system", "content": "Return only JSON with sqlQuery and description."},
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=600,
+def _run_chat_sql_batch(data_context: List[Mapping], questions: List[str]) -> List[Optional[dict]]:
+    messages, plan = prepare_messages(
+        "chat_sql_batch", data_context, build_batch_question(questions), items=len(questions)
+    )
+
+    def attempt(model: str) -> List[Optional[dict]]:
+        with observe_stage("llm_call"):
+            completion = get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=plan.max_tokens,
+                temperature=0.3,
+            )
+        log_prompt_cache_usage("chat_sql_batch", completion, plan)
+        with observe_stage("response_parse"):
+            return parse_batch_response(completion.choices[0].message.content or "", len(questions))
+
+    # A batch with any unanswered question is retried on the larger model
+    return ROUTER.run("chat_sql_batch", attempt, accept=lambda answers: all(_has_sql(a) for a in answers))
+
+# Optional micro-batching of chat-sql calls against the same context (disabled when window is 0)
+CHAT_SQL_BATCH_WINDOW_MS = float(os.environ.get("CHAT_SQL_BATCH_WINDOW_MS", "0"))
+CHAT_SQL_BATCH_MAX = int(os.environ.get("CHAT_SQL_BATCH_MAX", "8"))
+CHAT_BATCHER: Optional[ChatSqlBatcher] = (
+    ChatSqlBatcher(_run_chat_sql_batch, window_ms=CHAT_SQL_BATCH_WINDOW_MS, max_batch=CHAT_SQL_BATCH_MAX)
+    if CHAT_SQL_BATCH_WINDOW_MS > 0
+    else None
+)
+
+def _answer_chat_sql_single(data_context: List[Mapping], user_message: str) -> Optional[ChatResponse]:
+    messages, plan = prepare_messages(
+        "chat_sql", data_context, f"User request: {user_message}\nFormat strictly as JSON."
+    )
+
+    def attempt(model: str) -> Optional[ChatResponse]:
+        with observe_stage("llm_call"):
+            completion = create_structured_completion(
+                get_client(),
+                model,
+                messages,
+                "chat_sql",
+                CHAT_SQL_SCHEMA,
+                max_tokens=plan.max_tokens,
                 temperature=0.3,
             )
+        log_prompt_cache_usage("chat_sql", completion, plan)
+        with observe_stage("response_parse"):
             content = completion.choices[0].message.content or ""
-            data = json.loads(content)
-            sql = data.get("sqlQuery") or data.get("sql") or ""
-            desc = data.get("description") or "Suggested SQL."
-            if sql:
-                return ChatResponse(sqlQuery=sql, description=desc)
-        except Exception:
-            pass
-
-    # Heuristic fallback
+            data = extract_fields(content, ("sqlQuery", "sql", "description"), task="chat_sql")
+        if not _has_sql(data):
+            return None
+        return ChatResponse(
+            sqlQuery=data.get("sqlQuery") or data.get("sql"), description=data.get("description") or "Suggested SQL."
+        )
+
+    # Answers without SQL are retried on the larger model
+    return ROUTER.run("chat_sql", attempt, accept=lambda response: response is not None)
+
+def _heuristic_chat_sql(user_message: str) -> ChatResponse:
     lower = user_message.lower()
     for triggers, (sql, desc) in _HEURISTICS:
         if any(t in lower for t in triggers):
@@ -184,4 +664,62 @@ Format strictly as JSON.
         description='Show the structure of the user_data table.',
     )
 
+@app.post("/api/chat-sql", response_model=ChatResponse, response_model_exclude_none=True)
+async def chat_sql(req: ChatRequest, timings: bool = False):
+    user_message = req.message.strip()
+    response: Optional[ChatResponse] = None
+    fallback_reason = "no_llm_or_context"
+
+    data_context = current_context()
+
+    with collect_timings() as stage_timings:
+        if MODEL_NAME and data_context and CHAT_BATCHER is not None:
+            try:
+                data = await CHAT_BATCHER.submit(context_fingerprint(data_context), list(data_context), user_message)
+                sql = (data or {}).get("sqlQuery") or (data or {}).get("sql") or ""
+                if sql:
+                    response = ChatResponse(sqlQuery=sql, description=(data or {}).get("description") or "Suggested SQL.")
+                else:
+                    fallback_reason = "empty_sql"
+            except PromptTooLarge as e:
+                logger.warning("chat-sql skipped: %s", e)
+                fallback_reason = "prompt_too_large"
+            except Exception:
+                logger.exception("batched chat-sql call failed")
+                fallback_reason = "llm_error"
+        elif MODEL_NAME and data_context:
+            try:
+                response = await run_in_threadpool(_answer_chat_sql_single, data_context, user_message)
+                if response is None:
+                    fallback_reason = "empty_sql"
+            except PromptTooLarge as e:
+                logger.warning("chat-sql skipped: %s", e)
+                fallback_reason = "prompt_too_large"
+            except Exception:
+                logger.exception("chat-sql call failed")
+                fallback_reason = "llm_error"
+
+        if response is None:
+            record_fallback(fallback_reason)
+            response = _heuristic_chat_sql(user_message)
+
+    if timings:
+        response.timings = {stage: round(seconds, 6) for stage, seconds in stage_timings.items()}
+    return response
+
 # Run local dev: uvicorn backend.server:app --reload --port 8000
+# Production: python server.py --workers 8 (shared state, per-worker warm-up and readiness)
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the analyzer API.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    if args.workers > 1:
+        # Workers are separate processes and inherit the environment
+        os.environ["SERVER_MODE"] = "production"
+    uvicorn.run("server:app", host=args.host, port=args.port, workers=args.workers)
@@ -0,0 +1,216 @@
+"""
+Cross-worker state for running the API under several uvicorn worker processes.
+
+With `--workers N` every worker is a separate process, so module globals such as the parsed
+upload context are not shared: an upload handled by one worker is invisible to a chat
+request served by another. `SharedState` keeps that state in one SQLite database in WAL
+mode (concurrent readers, one writer, no server to run):
+
+- the parsed context, as `SheetProfile.to_bytes()` blobs or JSON dicts (errors, cross-validation findings),
+- the upload parse cache, keyed by file hash,
+- one row per worker with its readiness and a heartbeat.
+
+Each worker process opens its own connections (one per thread, created lazily and reopened
+after a fork), and caches the decoded context until another worker appends to it.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS context (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS upload_cache (
+    key TEXT PRIMARY KEY,
+    items BLOB NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    ready INTEGER NOT NULL DEFAULT 0,
+    started_at REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+"""
+
+# upload_cache.items: records of (is_profile, payload length) + payload
+_RECORD = struct.Struct("<?I")
+
+HEARTBEAT_SECONDS = float(os.environ.get("WORKER_HEARTBEAT_SECONDS", "5"))
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _encode_items(items: List[Mapping]) -> List[Tuple[str, bytes]]:
+    encoded = []
+    for item in items:
+        if hasattr(item, "to_bytes"):
+            encoded.append(("profile", item.to_bytes()))
+        else:
+            encoded.append(("error", json.dumps(dict(item), default=str).encode("utf-8")))
+    return encoded
+
+
+def _decode_item(kind: str, payload: bytes) -> Mapping:
+    if kind == "profile":
+        from sheet_profile import SheetProfile
+
+        return SheetProfile.from_bytes(bytes(payload))
+    return json.loads(bytes(payload).decode("utf-8"))
+
+
+def _pack(items: List[Mapping]) -> bytes:
+    return b"".join(
+        _RECORD.pack(kind == "profile", len(payload)) + payload for kind, payload in _encode_items(items)
+    )
+
+
+def _unpack(blob: bytes) -> List[Mapping]:
+    items: List[Mapping] = []
+    offset = 0
+    while offset < len(blob):
+        is_profile, length = _RECORD.unpack_from(blob, offset)
+        offset += _RECORD.size
+        items.append(_decode_item("profile" if is_profile else "error", blob[offset:offset + length]))
+        offset += length
+    return items
+
+
+class SharedState:
+    def __init__(self, db_path: Path, upload_cache_max: int = 32):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.upload_cache_max = upload_cache_max
+        self._local = threading.local()
+        self._cache_lock = threading.Lock()
+        self._context_cache: Tuple[int, List[Mapping]] = (-1, [])
+        self._heartbeat_stop = threading.Event()
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    @property
+    def worker_id(self) -> str:
+        # Computed on use: a worker forked after this object was created has its own pid
+        return worker_id()
+
+    def _connect(self) -> sqlite3.Connection:
+        """This thread's connection; a forked child gets fresh ones instead of its parent's."""
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA busy_timeout=30000")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    # -- parsed context ---------------------------------------------------
+
+    def context_version(self) -> int:
+        return self._connect().execute("SELECT COALESCE(MAX(seq), 0) FROM context").fetchone()[0]
+
+    def load_context(self) -> List[Mapping]:
+        """All context items, decoded once per version and then served from memory."""
+        version = self.context_version()
+        with self._cache_lock:
+            if self._context_cache[0] == version:
+                return self._context_cache[1]
+        rows = self._connect().execute("SELECT kind, payload FROM context ORDER BY seq").fetchall()
+        items = [_decode_item(kind, payload) for kind, payload in rows]
+        with self._cache_lock:
+            self._context_cache = (version, items)
+        return items
+
+    def append_context(self, items: List[Mapping]) -> int:
+        """Append items; returns the new total."""
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany("INSERT INTO context (kind, payload) VALUES (?, ?)", _encode_items(items))
+            total = db.execute("SELECT COUNT(*) FROM context").fetchone()[0]
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return total
+
+    # -- upload parse cache -----------------------------------------------
+
+    def get_upload(self, key: str) -> Optional[List[Mapping]]:
+        db = self._connect()
+        row = db.execute("SELECT items FROM upload_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        db.execute("UPDATE upload_cache SET used_at = ? WHERE key = ?", (time.time(), key))
+        return _unpack(row[0])
+
+    def put_upload(self, key: str, items: List[Mapping]) -> None:
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO upload_cache (key, items, used_at) VALUES (?, ?, ?)",
+                (key, _pack(items), time.time()),
+            )
+            # Least recently used entries beyond the limit are dropped
+            db.execute(
+                "DELETE FROM upload_cache WHERE key NOT IN "
+                "(SELECT key FROM upload_cache ORDER BY used_at DESC LIMIT ?)",
+                (self.upload_cache_max,),
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    # -- worker registry --------------------------------------------------
+
+    def register_worker(self, ready: bool = False) -> None:
+        now = time.time()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO workers (id, ready, started_at, last_seen) VALUES (?, ?, ?, ?)",
+            (self.worker_id, int(ready), now, now),
+        )
+
+    def mark_ready(self) -> None:
+        self._connect().execute(
+            "UPDATE workers SET ready = 1, last_seen = ? WHERE id = ?", (time.time(), self.worker_id)
+        )
+
+    def heartbeat(self) -> None:
+        self._connect().execute("UPDATE workers SET last_seen = ? WHERE id = ?", (time.time(), self.worker_id))
+
+    def start_heartbeat(self) -> None:
+        def beat() -> None:
+            while not self._heartbeat_stop.wait(HEARTBEAT_SECONDS):
+                self.heartbeat()
+
+        threading.Thread(target=beat, name="worker-heartbeat", daemon=True).start()
+
+    def unregister_worker(self) -> None:
+        self._heartbeat_stop.set()
+        self._connect().execute("DELETE FROM workers WHERE id = ?", (self.worker_id,))
+
+    def workers(self) -> List[Dict[str, Any]]:
+        """Workers seen within three heartbeats, with their readiness."""
+        cutoff = time.time() - 3 * HEARTBEAT_SECONDS
+        rows = self._connect().execute(
+            "SELECT id, ready, started_at, last_seen FROM workers WHERE last_seen >= ? ORDER BY started_at",
+            (cutoff,),
+        ).fetchall()
+        return [
+            {"id": wid, "ready": bool(ready), "started_at": started, "last_seen": seen}
+            for wid, ready, started, seen in rows
+        ]
@@ -0,0 +1,187 @@
+"""
+Compact typed representation of a parsed sheet.
+
+`SheetProfile` keeps per-column facts in `__slots__` objects, the 5-row sample column-wise
+as native Python lists, and the numeric `describe()` statistics as one float64 NumPy
+array, instead of the nested pandas `to_dict()` output. It is a read-only Mapping with
+the same keys and values as the legacy context dict, so existing consumers can keep using
+`ctx["columns"]`, `ctx.get("statistics")`, `"error" in ctx`, and `to_dict()` returns the
+legacy dict exactly.
+
+Profiles built from a profile-only read (a row-limited sample carrying the real row count
+in `df.attrs["total_rows"]`) report that count as `num_rows` and add a `sampled_rows` key
+so the prompt says the statistics come from a sample.
+
+`to_bytes()` / `from_bytes()` give a fast binary form for caches: a small JSON header
+followed by the raw statistics buffer.
+"""
+
+import json
+import struct
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+STAT_NAMES = ("count", "mean", "std", "min", "25%", "50%", "75%", "max")
+
+_MAGIC = b"SPF1"
+_HEADER = struct.Struct("<4sI")
+
+
+@dataclass
+class ColumnProfile:
+    __slots__ = ("name", "dtype", "null_count", "unique_count")
+
+    name: Any
+    dtype: str
+    null_count: int
+    unique_count: int
+
+
+@dataclass(eq=False)
+class SheetProfile(Mapping):
+    __slots__ = ("file", "sheet", "num_rows", "columns", "sample_index", "sample_values",
+                 "fingerprint", "numeric_columns", "stats", "sampled_rows")
+
+    file: str
+    sheet: str
+    num_rows: int
+    columns: List[ColumnProfile]
+    sample_index: List[Any]
+    # column-wise sample values, aligned with `columns`
+    sample_values: List[List[Any]]
+    fingerprint: Dict[str, str]
+    numeric_columns: List[Any]
+    # shape (len(numeric_columns), len(STAT_NAMES)), float64
+    stats: np.ndarray
+    # rows the statistics were computed from, when fewer than num_rows were read
+    sampled_rows: Optional[int]
+
+    @classmethod
+    def from_dataframe(cls, file_name: str, sheet_name: str, df: pd.DataFrame,
+                       fingerprint: Dict[str, str]) -> "SheetProfile":
+        null_counts = df.isnull().sum()
+        columns = [
+            ColumnProfile(col, str(dtype), int(null_counts.iloc[i]), int(df.iloc[:, i].nunique()))
+            for i, (col, dtype) in enumerate(zip(df.columns, df.dtypes))
+        ]
+        head = df.head(5)
+        # to_dict() boxes NumPy scalars into Python ones; reuse it so values match the legacy shape
+        sample = head.to_dict(orient="list")
+        sample_values = [sample[col] for col in df.columns]
+
+        numeric = df.select_dtypes(include=["number"])
+        if numeric.shape[1] > 0:
+            stats = numeric.describe().reindex(list(STAT_NAMES)).to_numpy(dtype=np.float64).T.copy()
+        else:
+            stats = np.empty((0, len(STAT_NAMES)), dtype=np.float64)
+
+        total_rows = df.attrs.get("total_rows")
+        return cls(
+            file=file_name,
+            sheet=sheet_name,
+            num_rows=int(len(df) if total_rows is None else total_rows),
+            columns=columns,
+            sample_index=head.index.tolist(),
+            sample_values=sample_values,
+            fingerprint=fingerprint,
+            numeric_columns=numeric.columns.tolist(),
+            stats=stats,
+            sampled_rows=int(len(df)) if total_rows is not None and total_rows > len(df) else None,
+        )
+
+    # -- legacy dict view -------------------------------------------------
+
+    def _keys(self) -> List[str]:
+        keys = ["file", "sheet", "columns", "num_rows", "sample_data", "data_types",
+                "null_counts", "unique_counts", "fingerprint"]
+        if self.numeric_columns:
+            keys.append("statistics")
+        if self.sampled_rows is not None:
+            keys.append("sampled_rows")
+        return keys
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "file":
+            return self.file
+        if key == "sheet":
+            return self.sheet
+        if key == "columns":
+            return [c.name for c in self.columns]
+        if key == "num_rows":
+            return self.num_rows
+        if key == "sample_data":
+            return {c.name: dict(zip(self.sample_index, values)) for c, values in zip(self.columns, self.sample_values)}
+        if key == "data_types":
+            return {c.name: c.dtype for c in self.columns}
+        if key == "null_counts":
+            return {c.name: c.null_count for c in self.columns}
+        if key == "unique_counts":
+            return {c.name: c.unique_count for c in self.columns}
+        if key == "fingerprint":
+            return self.fingerprint
+        if key == "statistics" and self.numeric_columns:
+            return {
+                col: {name: float(value) for name, value in zip(STAT_NAMES, row)}
+                for col, row in zip(self.numeric_columns, self.stats)
+            }
+        if key == "sampled_rows" and self.sampled_rows is not None:
+            return self.sampled_rows
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self._keys()}
+
+    # -- binary serialisation ---------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        header = json.dumps(
+            {
+                "file": self.file,
+                "sheet": self.sheet,
+                "num_rows": self.num_rows,
+                "columns": [[c.name, c.dtype, c.null_count, c.unique_count] for c in self.columns],
+                "sample_index": self.sample_index,
+                "sample_values": self.sample_values,
+                "fingerprint": self.fingerprint,
+                "numeric_columns": self.numeric_columns,
+                "sampled_rows": self.sampled_rows,
+            },
+            default=str,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        stats = np.ascontiguousarray(self.stats, dtype="<f8")
+        return _HEADER.pack(_MAGIC, len(header)) + header + stats.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SheetProfile":
+        magic, header_len = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("not a serialised SheetProfile")
+        start = _HEADER.size
+        header = json.loads(data[start:start + header_len].decode("utf-8"))
+        numeric_columns = header["numeric_columns"]
+        stats = np.frombuffer(data, dtype="<f8", offset=start + header_len).reshape(
+            len(numeric_columns), len(STAT_NAMES)
+        )
+        return cls(
+            file=header["file"],
+            sheet=header["sheet"],
+            num_rows=header["num_rows"],
+            columns=[ColumnProfile(*c) for c in header["columns"]],
+            sample_index=header["sample_index"],
+            sample_values=header["sample_values"],
+            fingerprint=header["fingerprint"],
+            numeric_columns=numeric_columns,
+            stats=stats,
+            sampled_rows=header.get("sampled_rows"),
+        )
@@ -4,49 +4,49 @@ Works with minimal dependencies and the working HuggingFace API
 """
 
 import os
-import pandas as pd
-from openai import OpenAI, AzureOpenAI
-import json
+import argparse
+import logging
 from dotenv import load_dotenv, find_dotenv
 from pathlib import Path
 
+from context_builder import build_sheet_context, read_sheets
+from cross_validation import cross_validate_files
+from llm_client import create_client, resolve_model
+from incremental_analysis import FragmentStore, run_incremental_analysis
+from model_tiers import ModelRouter, resolve_tier_models
+from metrics import collect_timings, observe_stage
+from prompt_builder import ANALYSIS_SECTIONS, log_prompt_cache_usage, prepare_messages, prepare_test_analysis_prompt
+from sectioned_analysis import run_sectioned_analysis
+from testcase_export import export_report
+from testcase_store import index_report
+
 # Load environment variables from .env (search upwards and fallback to repo paths)
 load_dotenv(find_dotenv(usecwd=True), override=False)
 script_dir = Path(__file__).resolve().parent
 load_dotenv(script_dir / ".env", override=False)
 load_dotenv(script_dir.parent / ".env", override=False)
 
-# Prefer Azure OpenAI if configured, otherwise use HuggingFace router
-AZURE_ENDPOINT = os.environ.get("AZURE_OPENAI_ENDPOINT")
-AZURE_API_KEY = os.environ.get("AZURE_OPENAI_API_KEY")
-AZURE_API_VERSION = os.environ.get("AZURE_OPENAI_API_VERSION", "2025-01-01-preview")
-AZURE_DEPLOYMENT = os.environ.get("AZURE_OPENAI_DEPLOYMENT")
-
-client = None
-MODEL_NAME = None
-
-if AZURE_ENDPOINT and AZURE_API_KEY and AZURE_DEPLOYMENT:
-    client = AzureOpenAI(
-        azure_endpoint=AZURE_ENDPOINT,
-        api_key=AZURE_API_KEY,
-        api_version=AZURE_API_VERSION,
-    )
-    MODEL_NAME = AZURE_DEPLOYMENT
-    print(f"Using Azure OpenAI | endpoint={AZURE_ENDPOINT} | deployment={AZURE_DEPLOYMENT} | api_version={AZURE_API_VERSION}")
-else:
-    HF_TOKEN = os.environ.get("HF_TOKEN")
-    if not HF_TOKEN:
-        raise RuntimeError(
-            "Missing configuration. Set Azure OpenAI envs (AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_API_KEY, AZURE_OPENAI_DEPLOYMENT) or set HF_TOKEN."
-        )
-    client = OpenAI(
-        base_url="https://router.huggingface.co/v1",
-        api_key=HF_TOKEN,
-    )
-    MODEL_NAME = "openai/gpt-oss-20b:fireworks-ai"
-    print(f"Using HuggingFace Inference API | router=https://router.huggingface.co/v1 | model={MODEL_NAME}")
-
-def parse_excel_to_context(file_paths):
+# Prefer Azure OpenAI if configured, otherwise use HuggingFace router. The client (and the
+# OpenAI SDK) is only built once main() has parsed its arguments, so --help stays fast.
+HF_MODEL = "openai/gpt-oss-20b:fireworks-ai"
+MODEL_NAME, PROVIDER = resolve_model(hf_model=HF_MODEL)
+# Follow-up questions use the small tier and escalate to MODEL_NAME on an empty answer
+ROUTER = ModelRouter(resolve_tier_models(MODEL_NAME, PROVIDER))
+_client = None
+
+def get_client():
+    """Build the LLM client on first use"""
+    global _client
+    if _client is None:
+        if MODEL_NAME is None:
+            raise RuntimeError(
+                "Missing configuration. Set Azure OpenAI envs (AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_API_KEY, AZURE_OPENAI_DEPLOYMENT) or set HF_TOKEN."
+            )
+        _client = create_client(hf_model=HF_MODEL)[0]
+        print(f"Using {PROVIDER} | model={MODEL_NAME}" + (f" | follow-ups={ROUTER.models['small']}" if ROUTER.tiered else ""))
+    return _client
+
+def parse_excel_to_context(file_paths, profile_only=False):
     """Parse Excel files and create a structured context"""
     all_content = []
 
@@ -59,124 +59,75 @@ def parse_excel_to_context(file_paths):
         file_name = os.path.basename(file_path)
 
         try:
-            # Read Excel file
-            excel_file = pd.ExcelFile(file_path)
-
-            for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
-
-                # Build context
-                context = {
-                    "file": file_name,
-                    "sheet": sheet_name,
-                    "columns": df.columns.tolist(),
-                    "num_rows": len(df),
-                    "sample_data": df.head(5).to_dict(),
-                    "data_types": df.dtypes.astype(str).to_dict(),
-                    "null_counts": df.isnull().sum().to_dict(),
-                    "unique_counts": {col: df[col].nunique() for col in df.columns}
-                }
-
-                # Add statistics for numeric columns
-                numeric_cols = df.select_dtypes(include=['number']).columns
-                if len(numeric_cols) > 0:
-                    context["statistics"] = df[numeric_cols].describe().to_dict()
-
+            # Excel workbooks, CSV and Parquet files
+            for sheet_name, df in read_sheets(file_path, file_name, profile_only=profile_only):
+                context = build_sheet_context(file_name, sheet_name, df)
                 all_content.append(context)
 
         except Exception as e:
             print(f"Error parsing {file_path}: {str(e)}")
 
-    return all_content
+    # Findings of comparing every row of an FRS mapping with a database spec, as one more context item
+    try:
+        validation = cross_validate_files(file_paths)
+        if validation is not None:
+            print(f"Cross-validated FRS mapping vs database spec: {sum(validation['cross_validation']['counts'].values())} findings")
+            all_content.append(validation)
+    except Exception as e:
+        print(f"Error cross-validating the workbooks: {str(e)}")
 
-def create_test_analysis_prompt(data_context):
-    """Create a comprehensive prompt for test analysis"""
-
-    # Convert context to readable format
-    context_str = json.dumps(data_context, indent=2, default=str)
-
-    prompt = f"""
-You are a Senior QA Engineer analyzing Excel data specifications for comprehensive testing.
-
-Data Context:
-{context_str}
-
-Based on this data, provide a detailed test analysis including:
-
-## 1. TEST SCENARIOS (5+ scenarios)
-For each scenario provide:
-- Scenario Name
-- Description
-- Business Value
-- Risk Level (High/Medium/Low)
-
-## 2. TEST CASES (10+ detailed test cases)
-For each test case provide:
-- Test ID
-- Test Name
-- Objective
-- Prerequisites
-- Test Steps (numbered)
-- Expected Results
-- Test Data Required
-- Priority (P1/P2/P3)
-
-## 3. SQL VALIDATION QUERIES (5+ queries)
-Provide SQL queries for:
-- Data integrity checks
-- Referential integrity validation
-- Data quality verification
-- Performance testing
-- Edge case validation
-
-## 4. DATA QUALITY CHECKS
-Identify:
-- Potential data quality issues
-- Missing data patterns
-- Data validation rules needed
-- Data cleansing requirements
-
-## 5. TEST AUTOMATION STRATEGY
-Recommend:
-- Which tests to automate
-- Testing framework suggestions
-- CI/CD integration approach
-- Test data management strategy
-
-## 6. RISK ASSESSMENT
-Identify:
-- Critical data risks
-- Potential failure points
-- Mitigation strategies
-
-Please provide detailed, actionable recommendations specific to the data structure provided.
-"""
+    return all_content
 
-    return prompt
+def complete(task, model, messages, plan):
+    """One chat completion on `model` with the planned max_tokens"""
+    with observe_stage("llm_call"):
+        completion = get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=plan.max_tokens,
+            temperature=0.7
+        )
+    log_prompt_cache_usage(task, completion, plan)
+    return completion.choices[0].message.content or ""
 
-def analyze_with_llm(prompt):
-    """Send prompt to LLM for analysis"""
+def analyze_with_llm(data_context):
+    """Send the analysis prompt for the parsed sheets to the LLM"""
     try:
+        messages, plan = prepare_test_analysis_prompt(data_context)
         print("\nGenerating comprehensive test analysis...")
+        print(f"Prompt: ~{plan.prompt_tokens} tokens | max_tokens: {plan.max_tokens}")
         print("This may take a moment...\n")
 
-        completion = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a Senior QA Engineer expert in test design, data validation, and quality assurance. Provide detailed, practical testing strategies."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            max_tokens=3000,
-            temperature=0.7
-        )
+        return ROUTER.run("analysis", lambda model: complete("analysis", model, messages, plan))
+
+    except Exception as e:
+        print(f"Error calling LLM: {str(e)}")
+        return None
 
-        return completion.choices[0].message.content
+def analyze_by_section(data_context, partial=True):
+    """Generate the analysis with one concurrent completion per report section
+
+    With partial=False a report with failed sections is discarded (None), so the
+    incremental cache never stores its placeholder sections.
+    """
+    try:
+        print(f"\nGenerating {len(ANALYSIS_SECTIONS)} analysis sections in parallel...")
+
+        def section_done(index, text):
+            number, title = ANALYSIS_SECTIONS[index]
+            print(f"  ✓ {number}. {title}")
+
+        analysis, stats = run_sectioned_analysis(
+            data_context,
+            lambda messages, plan: ROUTER.run(
+                "analysis_section", lambda model: complete("analysis_section", model, messages, plan)
+            ),
+            on_section=section_done,
+        )
+        print(f"Sections: {stats['sections']} | failed: {stats['failed']} | retries: {stats['retries']}")
+        if stats["failed"] and not partial:
+            return None
+        return analysis
 
     except Exception as e:
         print(f"Error calling LLM: {str(e)}")
@@ -184,8 +135,6 @@ def analyze_with_llm(prompt):
 
 def interactive_query(data_context):
     """Allow interactive queries about the data"""
-    context_str = json.dumps(data_context, indent=2, default=str)
-
     print("\n" + "=" * 60)
     print("INTERACTIVE QUERY MODE")
     print("=" * 60)
@@ -199,38 +148,20 @@ def interactive_query(data_context):
 
         if question:
             try:
-                prompt = f"""
-                Data Context:
-                {context_str}
-
-                Question: {question}
-
-                Please provide a detailed answer based on the data context.
-                """
-
-                completion = client.chat.completions.create(
-                    model=MODEL_NAME,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are a QA expert. Answer questions about testing and data quality based on the provided context."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    max_tokens=1000,
-                    temperature=0.7
+                messages, plan = prepare_messages(
+                    "followup",
+                    data_context,
+                    f"Question: {question}\n\nPlease provide a detailed answer based on the data context."
                 )
+                answer = ROUTER.run("followup", lambda model: complete("followup", model, messages, plan))
 
-                print(f"\nAnswer: {completion.choices[0].message.content}\n")
+                print(f"\nAnswer: {answer}\n")
 
             except Exception as e:
                 print(f"Error: {str(e)}\n")
 
-def save_results(analysis, output_file="simple_test_analysis.md"):
-    """Save analysis to markdown file"""
+def save_results(analysis, output_file="simple_test_analysis.md", data_context=None):
+    """Save analysis to markdown file and index its test cases"""
     try:
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write("# Excel Data Test Analysis Report\n")
@@ -240,10 +171,46 @@ def save_results(analysis, output_file="simple_test_analysis.md"):
         print(f"\n✅ Results saved to: {output_file}")
     except Exception as e:
         print(f"Error saving results: {str(e)}")
+    try:
+        # The markdown file is overwritten by the next run; the store keeps every run
+        indexed, duplicates = index_report(analysis, data_context, model=MODEL_NAME, origin="simple-llamaindex-analyzer")
+        print(f"✅ Indexed {indexed} test scenarios, cases and queries for search ({duplicates} near-duplicates of earlier ones)")
+    except Exception as e:
+        print(f"Error indexing test cases: {str(e)}")
 
 def main():
     """Main execution function"""
 
+    parser = argparse.ArgumentParser(description="Generate a QA test analysis from Excel specs.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse stored per-sheet analysis and only regenerate sheets that changed",
+    )
+    parser.add_argument(
+        "--sections",
+        action="store_true",
+        help="Generate the report sections as concurrent completions, each retried on its own",
+    )
+    parser.add_argument(
+        "--profile-only",
+        action="store_true",
+        help="Read headers and a row sample only (statistics from the sample); skip formula-heavy/image-only sheets",
+    )
+    parser.add_argument(
+        "--export",
+        metavar="PATH",
+        help="Also export the test scenarios, cases and SQL to a spreadsheet (.xlsx, one sheet per section, or .csv)",
+    )
+    args = parser.parse_args()
+
+    # Fail fast on missing LLM configuration, before any parsing
+    get_client()
+
+    # Surface prompt-cache usage (cached prompt tokens per call)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    logging.getLogger("prompt_builder").setLevel(logging.INFO)
+
     print("=" * 60)
     print("SIMPLIFIED EXCEL ANALYZER")
     print("Using LlamaIndex approach with minimal dependencies")
@@ -255,20 +222,14 @@ def main():
         "sample-document/FRS_Column_Mapping_Sheet.xlsx"
     ]
 
-    # Parse Excel files
-    data_context = parse_excel_to_context(excel_files)
-
-    if not data_context:
-        print("No data could be parsed. Please check your Excel files.")
-        return
-
-    print(f"\n✅ Successfully parsed {len(data_context)} sheets")
+    with collect_timings() as stage_timings:
+        analysis, data_context = run_analysis(excel_files, args)
 
-    # Create analysis prompt
-    prompt = create_test_analysis_prompt(data_context)
+    if stage_timings:
+        print("\nStage timings: " + ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in stage_timings.items()))
 
-    # Generate analysis
-    analysis = analyze_with_llm(prompt)
+    if data_context is None:
+        return
 
     if analysis:
         print("\n" + "=" * 60)
@@ -277,7 +238,13 @@ def main():
         print(analysis)
 
         # Save results
-        save_results(analysis)
+        save_results(analysis, data_context=data_context)
+        if args.export:
+            try:
+                counts = export_report(analysis, args.export, data_context)
+                print(f"Exported {sum(counts.values())} test artifacts to: {args.export}")
+            except Exception as e:
+                print(f"Error exporting test cases: {str(e)}")
 
         # Interactive mode
         interactive_query(data_context)
@@ -286,5 +253,31 @@ def main():
 
     print("\n✨ Analysis complete!")
 
+def run_analysis(excel_files, args):
+    """Parse the workbooks and generate the analysis; returns (analysis, data_context)"""
+    # Parse Excel files
+    data_context = parse_excel_to_context(excel_files, profile_only=args.profile_only)
+
+    if not data_context:
+        print("No data could be parsed. Please check your Excel files.")
+        return None, None
+
+    print(f"\n✅ Successfully parsed {len(data_context)} sheets")
+    analyze = analyze_by_section if args.sections else analyze_with_llm
+
+    if args.incremental:
+        # Only sheets whose fingerprint changed since the last run go to the LLM
+        analysis, stats = run_incremental_analysis(
+            data_context,
+            lambda ctx: analyze_by_section([ctx], partial=False) if args.sections else analyze_with_llm([ctx]),
+            FragmentStore(namespace=MODEL_NAME),
+        )
+        print(f"Sheets reused: {stats['reused']} | regenerated: {stats['regenerated']} | failed: {stats['failed']}")
+    else:
+        # Generate analysis
+        analysis = analyze(data_context)
+
+    return analysis, data_context
+
 if __name__ == "__main__":
     main()
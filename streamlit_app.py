@@ -1,13 +1,25 @@
 import os
 import io
-import json
+import time
+import hashlib
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
-import pandas as pd
 import streamlit as st
 from dotenv import load_dotenv, find_dotenv
-from openai import OpenAI, AzureOpenAI
+
+from llm_client import create_client, resolve_model
+from context_builder import build_file_profiles, context_fingerprint
+from cross_validation import catalog_role, read_catalog_sheets, validation_context
+from incremental_analysis import FragmentStore, run_incremental_analysis
+from model_tiers import ModelRouter, resolve_tier_models
+from metrics import observe_stage
+from prompt_builder import log_prompt_cache_usage, prepare_messages, prepare_test_analysis_prompt
+from sectioned_analysis import run_sectioned_analysis
+from token_budget import TokenPlan
+
+# Rerun timer: Streamlit executes the whole script on every widget interaction
+_RERUN_STARTED = time.perf_counter()
 
 # Load environment variables from .env (search upwards and fallback to repo paths)
 load_dotenv(find_dotenv(usecwd=True), override=False)
@@ -15,175 +27,146 @@ script_dir = Path(__file__).resolve().parent
 load_dotenv(script_dir / ".env", override=False)
 load_dotenv(script_dir.parent / ".env", override=False)
 
-# Prefer Azure OpenAI if configured, otherwise use HuggingFace router
 AZURE_ENDPOINT = os.environ.get("AZURE_OPENAI_ENDPOINT")
-AZURE_API_KEY = os.environ.get("AZURE_OPENAI_API_KEY")
-AZURE_API_VERSION = os.environ.get("AZURE_OPENAI_API_VERSION", "2025-01-01-preview")
-AZURE_DEPLOYMENT = os.environ.get("AZURE_OPENAI_DEPLOYMENT")
-
-client = None
-MODEL_NAME = None
-PROVIDER = None
-
-if AZURE_ENDPOINT and AZURE_API_KEY and AZURE_DEPLOYMENT:
-    client = AzureOpenAI(
-        azure_endpoint=AZURE_ENDPOINT,
-        api_key=AZURE_API_KEY,
-        api_version=AZURE_API_VERSION,
-    )
-    MODEL_NAME = AZURE_DEPLOYMENT
-    PROVIDER = "Azure OpenAI"
-else:
-    HF_TOKEN = os.environ.get("HF_TOKEN")
-    if HF_TOKEN:
-        client = OpenAI(
-            base_url="https://router.huggingface.co/v1",
-            api_key=HF_TOKEN,
-        )
-        MODEL_NAME = "moonshotai/Kimi-K2-Instruct"
-        PROVIDER = "Hugging Face Inference API"
+
+
+@st.cache_resource(show_spinner=False)
+def get_llm_client():
+    """Build the LLM client once per server process, on the first LLM call rather than at page load."""
+    return create_client()[0]
+
+
+MODEL_NAME, PROVIDER = resolve_model()
+# Follow-up questions use the small tier and escalate to MODEL_NAME on an empty answer
+ROUTER = ModelRouter(resolve_tier_models(MODEL_NAME, PROVIDER))
 
 # --------------------------- Core logic (reused) ---------------------------
 
-def parse_excel_to_context_from_uploads(files: List["UploadedFile"]) -> List[Dict[str, Any]]:
+@st.cache_data(show_spinner=False, max_entries=32)
+def parse_excel_bytes(file_name: str, file_hash: str, profile_only: bool, _content: bytes) -> List[Dict[str, Any]]:
+    """Parse one uploaded workbook, CSV or Parquet file. Cached by file hash; the raw bytes are not hashed again."""
+    try:
+        return [profile.to_dict() for profile in build_file_profiles(io.BytesIO(_content), file_name, profile_only)]
+    except Exception as e:
+        return [{"file": file_name, "error": str(e)}]
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cross_validate_bytes(files: Tuple[Tuple[str, str], ...], _contents: List[bytes]) -> List[Dict[str, Any]]:
+    """FRS mapping vs database spec findings over every row of the (name, hash) files; cached by hashes."""
+    try:
+        sheets = [
+            sheet for (file_name, _), content in zip(files, _contents)
+            for sheet in read_catalog_sheets(io.BytesIO(content), file_name)
+        ]
+        validation = validation_context(sheets)
+    except Exception as e:
+        st.warning(f"Cross-validation of the workbooks failed: {e}")
+        return []
+    return [validation] if validation is not None else []
+
+
+def parse_excel_to_context_from_uploads(files: List["UploadedFile"], profile_only: bool = False) -> List[Dict[str, Any]]:
     """Parse Excel files and create a structured context (similar to simple-llamaindex-analyzer)."""
     all_content: List[Dict[str, Any]] = []
+    # Files with FRS mapping or database spec sheets, cross-validated below
+    catalog_files: List[Tuple[str, str]] = []
+    catalog_contents: List[bytes] = []
 
     for uf in files:
-        try:
-            content = io.BytesIO(uf.read())
-            excel_file = pd.ExcelFile(content)
-            file_name = uf.name
-
-            for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(content, sheet_name=sheet_name)
-
-                context: Dict[str, Any] = {
-                    "file": file_name,
-                    "sheet": sheet_name,
-                    "columns": df.columns.tolist(),
-                    "num_rows": int(len(df)),
-                    "sample_data": df.head(5).to_dict(),
-                    "data_types": df.dtypes.astype(str).to_dict(),
-                    "null_counts": df.isnull().sum().to_dict(),
-                    "unique_counts": {col: int(df[col].nunique()) for col in df.columns},
-                }
-
-                numeric_cols = df.select_dtypes(include=["number"]).columns
-                if len(numeric_cols) > 0:
-                    context["statistics"] = df[numeric_cols].describe().to_dict()
-
-                all_content.append(context)
-        except Exception as e:
-            all_content.append({"file": getattr(uf, "name", "<unknown>"), "error": str(e)})
-
+        content = uf.getvalue()
+        file_hash = hashlib.sha256(content).hexdigest()
+        parsed = parse_excel_bytes(getattr(uf, "name", "<unknown>"), file_hash, profile_only, content)
+        all_content.extend(parsed)
+        if any(catalog_role(item) for item in parsed):
+            catalog_files.append((getattr(uf, "name", "<unknown>"), file_hash))
+            catalog_contents.append(content)
+
+    if {"mapping", "spec"} <= {catalog_role(item) for item in all_content}:
+        all_content.extend(cross_validate_bytes(tuple(catalog_files), catalog_contents))
     return all_content
 
 
-def create_test_analysis_prompt(data_context: List[Dict[str, Any]]) -> str:
-    context_str = json.dumps(data_context, indent=2, default=str)
-    prompt = f"""
-You are a Senior QA Engineer analyzing Excel data specifications for comprehensive testing.
-
-Data Context:
-{context_str}
-
-Based on this data, provide a detailed test analysis including:
-
-## 1. TEST SCENARIOS (5+ scenarios)
-For each scenario provide:
-- Scenario Name
-- Description
-- Business Value
-- Risk Level (High/Medium/Low)
-
-## 2. TEST CASES (10+ detailed test cases)
-For each test case provide:
-- Test ID
-- Test Name
-- Objective
-- Prerequisites
-- Test Steps (numbered)
-- Expected Results
-- Test Data Required
-- Priority (P1/P2/P3)
-
-## 3. SQL VALIDATION QUERIES (5+ queries)
-Provide SQL queries for:
-- Data integrity checks
-- Referential integrity validation
-- Data quality verification
-- Performance testing
-- Edge case validation
-
-## 4. DATA QUALITY CHECKS
-Identify:
-- Potential data quality issues
-- Missing data patterns
-- Data validation rules needed
-- Data cleansing requirements
-
-## 5. TEST AUTOMATION STRATEGY
-Recommend:
-- Which tests to automate
-- Testing framework suggestions
-- CI/CD integration approach
-- Test data management strategy
-
-## 6. RISK ASSESSMENT
-Identify:
-- Critical data risks
-- Potential failure points
-- Mitigation strategies
-
-Please provide detailed, actionable recommendations specific to the data structure provided.
-"""
-    return prompt
-
-
-def analyze_with_llm(prompt: str) -> str:
-    if client is None or MODEL_NAME is None:
+def _complete(task: str, model: str, messages: List[Dict[str, str]], plan: TokenPlan) -> str:
+    with observe_stage("llm_call"):
+        completion = get_llm_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=plan.max_tokens,
+            temperature=0.7,
+        )
+    log_prompt_cache_usage(task, completion, plan)
+    return completion.choices[0].message.content or ""
+
+
+def analyze_with_llm(data_context: List[Dict[str, Any]]) -> str:
+    if MODEL_NAME is None:
         raise RuntimeError("No LLM configured. Set Azure OpenAI env vars or HF_TOKEN.")
-    completion = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a Senior QA Engineer expert in test design, data validation, and quality assurance. Provide detailed, practical testing strategies.",
-            },
-            {"role": "user", "content": prompt},
-        ],
-        max_tokens=3000,
-        temperature=0.7,
-    )
-    return completion.choices[0].message.content
+    messages, plan = prepare_test_analysis_prompt(data_context)
+    return ROUTER.run("analysis", lambda model: _complete("analysis", model, messages, plan))
 
 
 def ask_followup(data_context: List[Dict[str, Any]], question: str) -> str:
-    if client is None or MODEL_NAME is None:
+    if MODEL_NAME is None:
         return "LLM not configured."
-    context_str = json.dumps(data_context, indent=2, default=str)
-    follow_prompt = f"""
-Data Context:
-{context_str}
-
-Question: {question}
-
-Please provide a detailed answer based on the data context.
-"""
-    completion = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a QA expert. Answer questions about testing and data quality based on the provided context.",
-            },
-            {"role": "user", "content": follow_prompt},
-        ],
-        max_tokens=1000,
-        temperature=0.7,
+    messages, plan = prepare_messages(
+        "followup",
+        data_context,
+        f"Question: {question}\n\nPlease provide a detailed answer based on the data context.",
     )
-    return completion.choices[0].message.content
+    return ROUTER.run("followup", lambda model: _complete("followup", model, messages, plan))
+
+
+def analyze_by_section(data_context: List[Dict[str, Any]]) -> Tuple[str, Dict[str, int]]:
+    """The same report, with its sections generated concurrently; returns (report, section stats)."""
+    if MODEL_NAME is None:
+        raise RuntimeError("No LLM configured. Set Azure OpenAI env vars or HF_TOKEN.")
+    return run_sectioned_analysis(
+        data_context,
+        lambda messages, plan: ROUTER.run(
+            "analysis_section", lambda model: _complete("analysis_section", model, messages, plan)
+        ),
+    )
+
+
+class DegradedAnalysis(Exception):
+    """A report with failed sections or sheets: shown once, but kept out of the result cache."""
+
+    def __init__(self, analysis: str, stats: Dict[str, int], what: str):
+        super().__init__(f"{stats['failed']} {what}(s) could not be generated")
+        self.analysis = analysis
+        self.stats = stats
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def cached_analysis(key: str, model_name: str, incremental: bool, sectioned: bool,
+                    _data_context: List[Dict[str, Any]]):
+    """Analysis result for a given context and model; re-clicking Analyze on the same files is free.
+
+    Reports with failed sections or sheets raise DegradedAnalysis instead of returning:
+    st.cache_data does not keep results of calls that raise, so the next click retries
+    rather than showing the broken report again.
+    """
+    if incremental:
+        def generate(ctx: Dict[str, Any]) -> Optional[str]:
+            if not sectioned:
+                return analyze_with_llm([ctx])
+            text, section_stats = analyze_by_section([ctx])
+            # Not stored as a fragment, so the sheet is generated again next time
+            return None if section_stats["failed"] else text
+
+        analysis, stats = run_incremental_analysis(
+            _data_context, generate, FragmentStore(namespace=model_name or "default")
+        )
+        what = "sheet"
+    elif sectioned:
+        analysis, stats = analyze_by_section(_data_context)
+        what = "section"
+    else:
+        return analyze_with_llm(_data_context), None
+    if stats["failed"]:
+        raise DegradedAnalysis(analysis, stats, what)
+    return analysis, stats
 
 # --------------------------- Streamlit UI ---------------------------
 
@@ -196,9 +179,28 @@ with st.sidebar:
     st.subheader("Model Configuration")
     st.write("Provider:", PROVIDER or "Not configured")
     st.write("Model/Deployment:", MODEL_NAME or "—")
+    if ROUTER.tiered:
+        st.write("Follow-up model:", ROUTER.models["small"])
     st.write("Endpoint:", AZURE_ENDPOINT or "https://router.huggingface.co/v1")
-    if client is None:
+    if MODEL_NAME is None:
         st.error("No LLM configured. Set Azure OpenAI env vars or HF_TOKEN in .env")
+    incremental = st.checkbox(
+        "Incremental re-analysis",
+        value=True,
+        help="Reuse the stored analysis of unchanged sheets and only call the LLM for added or edited ones.",
+    )
+    sectioned = st.checkbox(
+        "Parallel section generation",
+        value=False,
+        help="Generate each report section (scenarios, test cases, SQL, ...) as its own concurrent "
+        "completion; failed sections are retried on their own.",
+    )
+    profile_only = st.checkbox(
+        "Profile-only parsing",
+        value=False,
+        help="Read headers and a row sample only; statistics are computed from the sample. "
+        "Formula-heavy and image-only sheets are skipped.",
+    )
 
 if "data_context" not in st.session_state:
     st.session_state.data_context = []
@@ -212,19 +214,25 @@ col_left, col_right = st.columns([1, 1])
 with col_left:
     st.subheader("Upload Data")
     uploaded_files = st.file_uploader(
-        "Drop your Excel files here (.xlsx, .xls, .csv)",
-        type=["xlsx", "xls", "csv"],
+        "Drop your Excel files here (.xlsx, .xls, .csv, .parquet)",
+        type=["xlsx", "xls", "csv", "parquet"],
         accept_multiple_files=True,
     )
     if st.button("Analyze Files", type="primary", use_container_width=True, disabled=not uploaded_files):
         with st.spinner("Parsing files and generating analysis..."):
-            parsed = parse_excel_to_context_from_uploads(uploaded_files)
+            parsed = parse_excel_to_context_from_uploads(uploaded_files, profile_only)
             st.session_state.data_context = parsed
             try:
-                prompt = create_test_analysis_prompt(parsed)
-                analysis = analyze_with_llm(prompt)
+                analysis, stats = cached_analysis(
+                    context_fingerprint(parsed), MODEL_NAME or "", incremental, sectioned, parsed
+                )
+                if stats is not None and "reused" in stats:
+                    st.info(f"Sheets reused: {stats['reused']} | regenerated: {stats['regenerated']}")
                 st.session_state.analysis = analysis
                 st.success(f"Parsed {len(parsed)} sheet(s) across {len(uploaded_files)} file(s).")
+            except DegradedAnalysis as e:
+                st.session_state.analysis = e.analysis
+                st.warning(f"{e}; the report is incomplete and was not cached. Click Analyze again to retry.")
             except Exception as e:
                 st.session_state.analysis = None
                 st.error(f"Error generating analysis: {e}")
@@ -267,4 +275,5 @@ if user_input:
                 st.markdown(answer)
                 st.session_state.messages.append({"role": "assistant", "content": answer})
 
+st.sidebar.caption(f"Rerun rendered in {(time.perf_counter() - _RERUN_STARTED) * 1000:.0f} ms")
 st.caption("Tip: Set Azure OpenAI or HF_TOKEN in .env. To run locally: streamlit run backend/streamlit_app.py")
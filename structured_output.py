@@ -0,0 +1,128 @@
+"""
+Structured-output helpers so a paid completion is not thrown away over formatting.
+
+`create_structured_completion` asks the provider for schema-constrained JSON
+(`response_format` json_schema, then json_object) and remembers per model which mode
+the provider accepts. `extract_json` / `extract_fields` recover JSON from markdown
+fences, leading prose or truncated output. Every parse is counted by outcome in
+`metrics.STRUCTURED_OUTPUT`.
+"""
+
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from metrics import STRUCTURED_OUTPUT
+
+logger = logging.getLogger(__name__)
+
+CHAT_SQL_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "sqlQuery": {"type": "string"},
+        "description": {"type": "string"},
+    },
+    "required": ["sqlQuery", "description"],
+    "additionalProperties": False,
+}
+
+_MODES = ("json_schema", "json_object", None)
+# model -> index into _MODES of the best mode the provider accepted
+_MODE_BY_MODEL: Dict[str, int] = {}
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+
+
+def _response_format(mode: Optional[str], name: str, schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if mode == "json_schema":
+        return {"type": "json_schema", "json_schema": {"name": name, "schema": schema, "strict": True}}
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
+
+
+def _is_response_format_rejection(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    message = str(error).lower()
+    return status in (400, 422) and ("response_format" in message or "json_schema" in message)
+
+
+def create_structured_completion(client: Any, model: str, messages: List[Dict[str, str]], name: str,
+                                 schema: Dict[str, Any], **kwargs: Any) -> Any:
+    """chat.completions.create with the strongest response_format the provider accepts.
+
+    A rejected response_format fails before any tokens are generated, so downgrading and
+    retrying does not waste a completion. The accepted mode is cached per model.
+    """
+    start = _MODE_BY_MODEL.get(model, 0)
+    for index in range(start, len(_MODES)):
+        response_format = _response_format(_MODES[index], name, schema)
+        try:
+            if response_format is None:
+                completion = client.chat.completions.create(model=model, messages=messages, **kwargs)
+            else:
+                completion = client.chat.completions.create(
+                    model=model, messages=messages, response_format=response_format, **kwargs
+                )
+        except Exception as e:
+            if response_format is not None and _is_response_format_rejection(e):
+                logger.info("model %s rejected response_format=%s; downgrading", model, _MODES[index])
+                continue
+            raise
+        _MODE_BY_MODEL[model] = index
+        return completion
+    raise RuntimeError("unreachable: the plain mode never downgrades")
+
+
+def extract_json(text: str) -> Optional[Any]:
+    """Best-effort JSON value from model output: raw, fenced, or embedded after prose."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    candidates = [m.group(1).strip() for m in _FENCE_RE.finditer(text)] + [text]
+    decoder = json.JSONDecoder()
+    for candidate in candidates:
+        for i, ch in enumerate(candidate):
+            if ch not in "{[":
+                continue
+            try:
+                value, _ = decoder.raw_decode(candidate, i)
+                return value
+            except ValueError:
+                continue
+    return None
+
+
+def _partial_string_field(text: str, field: str) -> Optional[str]:
+    """Value of `"field": "..."` even when the closing quote/brace was cut off."""
+    match = re.search(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)' % re.escape(field), text, re.DOTALL)
+    if not match:
+        return None
+    raw = match.group(1)
+    try:
+        return json.loads(f'"{raw}"')
+    except ValueError:
+        return raw.replace('\\"', '"').replace("\\n", "\n")
+
+
+def extract_fields(text: str, fields: Sequence[str], task: str = "default") -> Dict[str, Any]:
+    """Pull `fields` from model output, counting the outcome (json / extracted / failed)."""
+    value = extract_json(text)
+    if isinstance(value, dict) and any(value.get(f) for f in fields):
+        STRUCTURED_OUTPUT.inc(task=task, outcome="json")
+        return value
+
+    partial = {f: v for f in fields if (v := _partial_string_field(text or "", f))}
+    if partial:
+        STRUCTURED_OUTPUT.inc(task=task, outcome="extracted")
+        return partial
+
+    STRUCTURED_OUTPUT.inc(task=task, outcome="failed")
+    logger.warning("could not extract %s from %s output: %.200r", list(fields), task, text)
+    return {}
@@ -0,0 +1,438 @@
+"""
+Synthetic test data for the tables of a database design or of the uploaded spec sheets.
+
+Tables come from `schema_catalog` (database/*.sql designs, or the FRS mapping and database
+spec workbooks). Every column is generated a chunk of rows at a time with vectorised NumPy:
+
+- primary key, unique and referenced columns are derived from the row position (1, 2, ...
+  for integer keys, "<column>_<n>" for text keys), so a key is a pure function of the row,
+- foreign keys draw random parent row positions and turn them into the parent's key with
+  the same function, so every reference points at a generated row without any parent
+  keys being kept in memory; a unique foreign key (1:1) takes parent rows in order,
+  composite primary keys enumerate the combinations of their parents (junction tables),
+  and self-references point at an earlier row of the same table,
+- enum values come from the design (ENUM(...), CHECK IN, `-- 'pending', 'paid'` or
+  COMMENT 'a, b, c' lists), other values from the column's type family and name
+  (email, phone, price, quantity, ...), with NULLs in a few percent of optional columns.
+
+Each table is written as it is generated, CHUNK_ROWS rows at a time, to CSV or (with
+pyarrow) Parquet, so memory stays flat however many rows are asked for. Tables are
+generated level by level in foreign key order; the tables of one level run in parallel
+worker processes, so a parent's file is complete before its children are written.
+Generation is deterministic for a given seed.
+
+    python synthetic_data.py database/database-design-pharma.sql --rows 100000 --out ./cache/synthetic
+    python synthetic_data.py Database_Specs_Sheet.xlsx FRS_Column_Mapping_Sheet.xlsx --table-rows orders=10000000
+"""
+
+import argparse
+import logging
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from context_builder import HAVE_PYARROW
+from schema_catalog import ColumnDef, Schema, TableDef, load_schema
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+FORMATS = ("csv", "parquet")
+
+# Rows generated and written at a time, per table
+CHUNK_ROWS = int(os.environ.get("SYNTHETIC_CHUNK_ROWS", "100000"))
+# Share of NULLs in optional (not required, not key, not reference) columns
+NULL_RATE = float(os.environ.get("SYNTHETIC_NULL_RATE", "0.05"))
+
+# Date and time values fall in [start, start + span)
+_DATE_START = "2020-01-01"
+_DATE_SPAN_DAYS = 5 * 365
+
+# (name pattern, low, high) for integer and decimal columns; the first match wins
+_NUMBER_RANGES = [
+    (re.compile(r"rating|stars|score"), 1, 5),
+    (re.compile(r"quantity|qty|stock|count"), 1, 100),
+    (re.compile(r"\bage\b|_age$"), 18, 90),
+    (re.compile(r"year"), 2000, 2030),
+    (re.compile(r"percent|discount|rate"), 0, 100),
+    (re.compile(r"price|amount|total|cost|fee|salary|balance"), 1, 1000),
+]
+_DEFAULT_RANGE = (0, 1000)
+
+logger = logging.getLogger(__name__)
+
+
+def generation_order(schema: Schema) -> List[List[str]]:
+    """Tables grouped in levels: every table comes after the tables it references.
+
+    Self-references and references to tables outside the schema do not count; a reference
+    cycle is broken at the table with the fewest parents not generated yet (its keys are
+    still valid, as foreign keys only depend on the parents' row counts).
+    """
+    parents = {
+        name: {column.ref.partition(".")[0] for column in table.columns.values() if column.ref} & set(schema) - {name}
+        for name, table in schema.items()
+    }
+    levels: List[List[str]] = []
+    done: set = set()
+    while len(done) < len(schema):
+        level = [name for name in schema if name not in done and parents[name] <= done]
+        if not level:
+            # A reference cycle: start it at the table with the fewest parents still missing
+            name = min((name for name in schema if name not in done), key=lambda name: len(parents[name] - done))
+            logger.warning("reference cycle: %s generated before %s", name, ", ".join(sorted(parents[name] - done)))
+            level = [name]
+        levels.append(level)
+        done.update(level)
+    return levels
+
+
+def _length(declared: str) -> Optional[int]:
+    match = re.search(r"(?:char|text|string)\w*\s*\(\s*(\d+)", declared)
+    return int(match.group(1)) if match else None
+
+
+def _scale(declared: str) -> int:
+    match = re.search(r"\(\s*\d+\s*,\s*(\d+)\s*\)", declared)
+    return int(match.group(1)) if match else 2
+
+
+def _number_range(name: str) -> Tuple[int, int]:
+    for pattern, low, high in _NUMBER_RANGES:
+        if pattern.search(name):
+            return low, high
+    return _DEFAULT_RANGE
+
+
+_FAMILIES = ("integer", "decimal", "text", "boolean", "datetime", "date", "time", "year", "uuid", "json")
+
+
+def _family(column: ColumnDef) -> str:
+    """Type family, with anything unknown (binary, enum, set, ...) generated as text."""
+    return column.family if column.family in _FAMILIES else "text"
+
+
+def _numbered(prefix: str, numbers: "np.ndarray", suffix: str = "") -> "np.ndarray":
+    import numpy as np
+
+    values = np.char.add(prefix, numbers.astype(np.int64).astype("U20"))
+    return np.char.add(values, suffix) if suffix else values
+
+
+def _text(table: str, column: ColumnDef, numbers: "np.ndarray") -> "np.ndarray":
+    """Text shaped by the column name, numbered by `numbers`."""
+    import numpy as np
+
+    name = column.name
+    if "email" in name:
+        return _numbered(f"{table}.", numbers, "@example.com")
+    if "phone" in name or "mobile" in name:
+        return _numbered("+1555", 1_000_000 + numbers % 9_000_000)
+    if "url" in name or "website" in name:
+        return _numbered(f"https://example.com/{table}/", numbers)
+    if "zip" in name or "postal" in name:
+        return np.char.zfill((numbers % 100_000).astype("U5"), 5)
+    return _numbered(f"{name}_", numbers)
+
+
+def key_values(table: str, column: ColumnDef, positions: "np.ndarray") -> "np.ndarray":
+    """Values of a primary key or unique column for 0-based row positions.
+
+    Foreign keys address parent rows through this function, so it must stay a pure
+    function of (table, column, position).
+    """
+    import numpy as np
+
+    numbers = positions.astype(np.int64) + 1
+    family = _family(column)
+    if family in ("integer", "decimal", "year"):
+        return numbers
+    if family == "uuid":
+        return np.char.mod(f"{zlib.crc32(table.encode()) & 0xFFFFFFFF:08x}-0000-4000-8000-%012x", numbers)
+    if family == "date":
+        return np.datetime64(_DATE_START, "D") + numbers
+    if family == "datetime":
+        return np.datetime64(_DATE_START, "s") + numbers
+    return _text(table, column, numbers)
+
+
+def _random_values(table: str, column: ColumnDef, size: int, rng: "np.random.Generator") -> "np.ndarray":
+    import numpy as np
+
+    if column.enum:
+        return np.asarray(column.enum, dtype=object)[rng.integers(0, len(column.enum), size)]
+    family = _family(column)
+    if family == "integer":
+        low, high = _number_range(column.name)
+        return rng.integers(low, high + 1, size)
+    if family == "decimal":
+        low, high = _number_range(column.name)
+        return np.round(rng.uniform(low, high, size), _scale(column.type))
+    if family == "boolean":
+        return rng.random(size) < 0.5
+    if family == "year":
+        return rng.integers(2000, 2031, size)
+    if family == "date":
+        return np.datetime64(_DATE_START, "D") + rng.integers(0, _DATE_SPAN_DAYS, size)
+    if family == "datetime":
+        return np.datetime64(_DATE_START, "s") + rng.integers(0, _DATE_SPAN_DAYS * 86400, size)
+    if family == "time":
+        seconds = rng.integers(0, 86400, size)
+        return np.char.add(
+            np.char.add(np.char.zfill((seconds // 3600).astype("U2"), 2), ":"),
+            np.char.add(np.char.add(np.char.zfill((seconds // 60 % 60).astype("U2"), 2), ":"),
+                        np.char.zfill((seconds % 60).astype("U2"), 2)),
+        )
+    if family == "uuid":
+        return np.char.add(np.char.add(np.char.mod("%08x", rng.integers(0, 2**32, size)), "-0000-4000-8000-"),
+                           np.char.mod("%012x", rng.integers(0, 2**48, size)))
+    if family == "json":
+        return _numbered('{"id": ', rng.integers(1, 1_000_000, size), "}")
+    values = _text(table, column, rng.integers(1, 1_000_000, size))
+    length = _length(column.type)
+    return values.astype(f"<U{length}") if length else values
+
+
+def _with_nulls(values: "np.ndarray", mask: "np.ndarray") -> "Union[np.ndarray, pd.api.extensions.ExtensionArray]":
+    """`values` with NULLs where `mask` is set, in a dtype that can hold them."""
+    import numpy as np
+    import pandas as pd
+
+    if not mask.any():
+        return values
+    if values.dtype.kind in "iub":
+        # Nullable integer/boolean arrays keep "1" from turning into "1.0" in the CSV
+        array = pd.array(values, dtype="boolean" if values.dtype.kind == "b" else "Int64")
+        array[mask] = pd.NA
+        return array
+    if values.dtype.kind == "f":
+        return np.where(mask, np.nan, values)
+    if values.dtype.kind == "M":
+        values = values.copy()
+        values[mask] = np.datetime64("NaT")
+        return values
+    values = values.astype(object)
+    values[mask] = None
+    return values
+
+
+class _TablePlan:
+    """How each column of one table is generated, resolved once before the chunks."""
+
+    def __init__(self, schema: Schema, table: TableDef, row_counts: Mapping[str, int]):
+        self.table = table
+        self.rows = row_counts[table.name]
+        self.row_counts = row_counts
+        self.schema = schema
+        # Columns other tables point at are generated like keys, so the references resolve
+        self.referenced = {column.ref for other in schema.values() for column in other.columns.values() if column.ref}
+        pks = [column for column in table.columns.values() if column.pk]
+        # Composite primary key: mixed-radix digits of the row position, one per key column
+        self.composite: Dict[str, Tuple[int, int]] = {}
+        if len(pks) > 1:
+            radices = [self._parent_rows(column) or self.rows for column in pks]
+            stride = 1
+            for column, radix in reversed(list(zip(pks, radices))):
+                self.composite[column.name] = (stride, max(radix, 1))
+                stride *= max(radix, 1)
+            if stride < self.rows:
+                logger.warning("%s: %d rows exceed the %d combinations of its primary key", table.name, self.rows, stride)
+
+    def _parent(self, column: ColumnDef) -> Optional[Tuple[str, ColumnDef]]:
+        if not column.ref:
+            return None
+        table_name, _, column_name = column.ref.partition(".")
+        parent = self.schema.get(table_name)
+        if parent is None:
+            return None
+        target = parent.columns.get(column_name)
+        if target is None:
+            target = next((other for other in parent.columns.values() if other.pk), None)
+        return (table_name, target) if target is not None else None
+
+    def _parent_rows(self, column: ColumnDef) -> Optional[int]:
+        parent = self._parent(column)
+        return self.row_counts.get(parent[0]) if parent else None
+
+    def column(self, column: ColumnDef, positions: "np.ndarray", rng: "np.random.Generator") -> "np.ndarray":
+        import numpy as np
+
+        size = len(positions)
+        parent = self._parent(column)
+        if column.name in self.composite:
+            stride, radix = self.composite[column.name]
+            parent_positions = positions // stride % radix
+            return key_values(*parent, parent_positions) if parent else parent_positions + 1
+        if parent is not None:
+            parent_name, target = parent
+            parent_rows = self.row_counts[parent_name]
+            if parent_name == self.table.name:
+                # An earlier row of this table; the first row refers to itself or to nothing
+                parent_positions = (rng.random(size) * positions).astype(np.int64)
+                values = key_values(parent_name, target, parent_positions)
+                return values if column.required else _with_nulls(values, positions == 0)
+            if parent_rows == 0:
+                return np.full(size, None, dtype=object)
+            if column.unique or column.pk:
+                parent_positions = positions % parent_rows
+            else:
+                parent_positions = rng.integers(0, parent_rows, size)
+            return key_values(parent_name, target, parent_positions)
+        if column.ref:
+            # References a table outside the schema
+            return np.full(size, None, dtype=object)
+        if column.pk or column.unique or f"{self.table.name}.{column.name}" in self.referenced:
+            return key_values(self.table.name, column, positions)
+        values = _random_values(self.table.name, column, size, rng)
+        if column.required or NULL_RATE <= 0:
+            return values
+        return _with_nulls(values, rng.random(size) < NULL_RATE)
+
+
+def _rng(seed: int, table: str, chunk: int) -> "np.random.Generator":
+    import numpy as np
+
+    return np.random.default_rng([seed, zlib.crc32(table.encode("utf-8")), chunk])
+
+
+def generate_chunks(
+    schema: Schema,
+    table: str,
+    row_counts: Mapping[str, int],
+    seed: int = 0,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Iterator["pd.DataFrame"]:
+    """DataFrames of `chunk_rows` rows for one table; `row_counts` must cover every referenced table."""
+    import numpy as np
+    import pandas as pd
+
+    plan = _TablePlan(schema, schema[table], row_counts)
+    for chunk, start in enumerate(range(0, plan.rows, max(chunk_rows, 1))):
+        positions = np.arange(start, min(start + chunk_rows, plan.rows), dtype=np.int64)
+        rng = _rng(seed, table, chunk)
+        yield pd.DataFrame({name: plan.column(column, positions, rng) for name, column in schema[table].columns.items()}, copy=False)
+
+
+def write_table(
+    schema: Schema,
+    table: str,
+    row_counts: Mapping[str, int],
+    path: Union[str, Path],
+    fmt: str = "csv",
+    seed: int = 0,
+    chunk_rows: int = CHUNK_ROWS,
+) -> int:
+    """Generate one table into a CSV or Parquet file chunk by chunk; returns the rows written."""
+    written = 0
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for df in generate_chunks(schema, table, row_counts, seed, chunk_rows):
+                arrow = pa.Table.from_pandas(df, schema=writer.schema if writer else None, preserve_index=False)
+                writer = writer or pq.ParquetWriter(str(path), arrow.schema)
+                writer.write_table(arrow)
+                written += len(df)
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for df in generate_chunks(schema, table, row_counts, seed, chunk_rows):
+            df.to_csv(f, header=written == 0, index=False)
+            written += len(df)
+        if written == 0:
+            f.write(",".join(schema[table].columns) + "\n")
+    return written
+
+
+def _write_table(args: tuple) -> Tuple[str, int, float]:
+    started = time.perf_counter()
+    table = args[1]
+    return table, write_table(*args), time.perf_counter() - started
+
+
+def generate_dataset(
+    schema: Schema,
+    out_dir: Union[str, Path],
+    rows: Union[int, Mapping[str, int]] = 1000,
+    fmt: str = "csv",
+    seed: int = 0,
+    workers: Optional[int] = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Dict[str, Dict[str, object]]:
+    """Write every table of `schema` into `out_dir`; returns {table: {"path", "rows", "seconds"}}.
+
+    `rows` is a row count for every table, or per-table counts ("*" for the others).
+    With `workers` > 1 the tables of each dependency level are written in parallel processes.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    if fmt == "parquet" and not HAVE_PYARROW:
+        raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow); use csv instead")
+    if isinstance(rows, Mapping):
+        default = int(rows.get("*", 1000))
+        row_counts = {name: int(rows.get(name, default)) for name in schema}
+    else:
+        row_counts = dict.fromkeys(schema, int(rows))
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    results: Dict[str, Dict[str, object]] = {}
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(schema) > 1 else None
+    try:
+        for level in generation_order(schema):
+            tasks = [(schema, name, row_counts, out_dir / f"{name}.{fmt}", fmt, seed, chunk_rows) for name in level]
+            done = pool.map(_write_table, tasks) if pool else map(_write_table, tasks)
+            for (name, written, seconds), task in zip(done, tasks):
+                results[name] = {"path": str(task[3]), "rows": written, "seconds": round(seconds, 3)}
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results
+
+
+def _table_rows(values: Sequence[str]) -> Dict[str, int]:
+    counts = {}
+    for value in values:
+        table, _, count = value.partition("=")
+        counts[table.strip().lower()] = int(count.replace("_", ""))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate referentially consistent synthetic rows for a database design.")
+    parser.add_argument("sources", nargs="+", help="design files (.sql/.dbml/.md) or spec/mapping workbooks")
+    parser.add_argument("--out", default="./cache/synthetic", help="output directory, one file per table")
+    parser.add_argument("--rows", type=int, default=1000, help="rows per table")
+    parser.add_argument("--table-rows", nargs="*", default=[], metavar="TABLE=N", help="row counts of single tables")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="parallel processes (default: CPU count)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+    logging.basicConfig(format="%(levelname)s %(name)s: %(message)s")
+
+    schema = load_schema(args.sources)
+    if not schema:
+        parser.error("no table definitions found in " + ", ".join(args.sources))
+    rows = {"*": args.rows, **_table_rows(args.table_rows)}
+    started = time.perf_counter()
+    results = generate_dataset(schema, args.out, rows, args.format, args.seed, args.workers, args.chunk_rows)
+    for name, result in results.items():
+        print(f"{name:<32} {result['rows']:>12,} rows {result['seconds']:8.2f}s  {result['path']}")
+    total = sum(result["rows"] for result in results.values())
+    print(f"{len(results)} tables, {total:,} rows in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Near-duplicate detection for generated test cases and SQL queries (MinHash + LSH).
+
+Re-running an analysis on a similar workbook produces many test cases that differ only in
+wording, ids or literals. Each record is reduced to a set of shingles (character 5-grams of
+its normalised text: lower case, ids like TC-001 dropped, numbers and SQL string literals
+replaced), and the set to a MinHash signature whose matching positions estimate the Jaccard
+similarity of two sets. Character rather than word shingles keep one changed word in a
+short test case from halving its similarity.
+
+Signatures are split into `bands` bands of `rows` values; records that agree on every value
+of at least one band land in the same LSH bucket. Only bucket-mates are compared, so finding
+the duplicates of a new record costs a few index lookups instead of a scan over every
+stored case. `lsh_params` picks the band layout for a similarity threshold.
+
+Shingles are hashed with CRC32 and the permutations are seeded, so signatures and bucket
+keys are stable across processes and can be persisted (see `testcase_store`).
+"""
+
+import hashlib
+import re
+import zlib
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_THRESHOLD = 0.7
+SHINGLE_SIZE = 5
+
+_MAX_HASH = np.uint32((1 << 32) - 1)
+_SHIFT = np.uint64(32)
+# Signatures of this many shingles (over all records) are computed per vectorised step
+_CHUNK_SHINGLES = 20_000
+
+_REF_RE = re.compile(r"\b[A-Z]{2,5}[-‐‑‒–_ ]?\d{1,4}\b")
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalise(text: str, kind: str = "") -> List[str]:
+    """Tokens that identify the content: ids removed, numbers and SQL literals generalised."""
+    text = _REF_RE.sub(" ", text)
+    if kind == "sql":
+        text = _STRING_LITERAL_RE.sub(" str ", text)
+    text = _NUMBER_RE.sub(" 0 ", text)
+    return _TOKEN_RE.findall(text.lower())
+
+
+def shingles(text: str, kind: str = "", size: int = SHINGLE_SIZE) -> List[int]:
+    """CRC32 hashes of the character `size`-grams of the normalised text (one gram for short texts)."""
+    normalised = " ".join(normalise(text, kind))
+    if not normalised:
+        return []
+    grams = {normalised[i:i + size] for i in range(max(1, len(normalised) - size + 1))}
+    return sorted({zlib.crc32(gram.encode("utf-8")) for gram in grams})
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 1):
+        self.num_perm = num_perm
+        rng = np.random.RandomState(seed)
+        # Multiply-shift hashing: h(x) = ((a * x + b) mod 2**64) >> 32 with odd a, so the
+        # wrap-around of uint64 arithmetic is the modulus and no division is needed
+        self._a = (rng.randint(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+        self._b = rng.randint(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+
+    def signatures(self, shingle_sets: Sequence[Sequence[int]]) -> "np.ndarray":
+        """(len(shingle_sets), num_perm) uint32 signatures; empty sets get all-max rows."""
+        result = np.full((len(shingle_sets), self.num_perm), _MAX_HASH, dtype=np.uint32)
+        start = 0
+        while start < len(shingle_sets):
+            # Grow the chunk until it holds _CHUNK_SHINGLES shingles
+            stop, total = start, 0
+            while stop < len(shingle_sets) and (total == 0 or total + len(shingle_sets[stop]) <= _CHUNK_SHINGLES):
+                total += len(shingle_sets[stop])
+                stop += 1
+            chunk = shingle_sets[start:stop]
+            lengths = np.fromiter((len(s) for s in chunk), dtype=np.int64, count=len(chunk))
+            if total:
+                values = np.fromiter((h for s in chunk for h in s), dtype=np.uint64, count=total)
+                # (num_perm, total): each permutation's hashes are contiguous for the reduction
+                hashed = ((self._a * values + self._b) >> _SHIFT).astype(np.uint32)
+                present = np.flatnonzero(lengths)
+                offsets = np.concatenate(([0], np.cumsum(lengths[present])[:-1]))
+                result[start + present] = np.minimum.reduceat(hashed, offsets, axis=1).T
+            start = stop
+        return result
+
+    def signature(self, shingle_set: Sequence[int]) -> "np.ndarray":
+        return self.signatures([shingle_set])[0]
+
+
+def similarity(signature: "np.ndarray", others: "np.ndarray") -> "np.ndarray":
+    """Estimated Jaccard similarity of one signature to each row of `others`."""
+    return (others == signature).mean(axis=-1)
+
+
+def _false_rates(threshold: float, bands: int, rows: int) -> float:
+    """Probability mass of bucket collisions below the threshold plus misses above it."""
+    grid = np.linspace(0.0, 1.0, 201)
+    collide = 1.0 - (1.0 - grid ** rows) ** bands
+    false_positive = np.where(grid < threshold, collide, 0.0).mean()
+    false_negative = np.where(grid >= threshold, 1.0 - collide, 0.0).mean()
+    return float(false_positive + false_negative)
+
+
+def lsh_params(threshold: float, num_perm: int = DEFAULT_NUM_PERM) -> Tuple[int, int]:
+    """(bands, rows) with bands * rows <= num_perm minimising false positives + negatives."""
+    best = (float("inf"), 1, num_perm)
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        error = _false_rates(threshold, bands, rows)
+        if error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+def band_keys(signature: "np.ndarray", bands: int, rows: int) -> List[int]:
+    """One signed 64-bit bucket key per band (band number included, so bands never collide)."""
+    data = np.ascontiguousarray(signature[: bands * rows], dtype=np.uint32).reshape(bands, rows)
+    return [
+        int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8, person=b"band%04d" % i).digest(), "big", signed=True)
+        for i, band in enumerate(data)
+    ]
+
+
+def signature_bytes(signature: "np.ndarray") -> bytes:
+    return np.ascontiguousarray(signature, dtype="<u4").tobytes()
+
+
+def signature_from_bytes(blobs: Iterable[bytes], num_perm: int = DEFAULT_NUM_PERM) -> "np.ndarray":
+    blobs = list(blobs)
+    return np.frombuffer(b"".join(blobs), dtype="<u4").reshape(len(blobs), num_perm)
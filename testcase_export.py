@@ -0,0 +1,206 @@
+"""
+Spreadsheet export of generated test scenarios, test cases and SQL queries.
+
+`write_xlsx` writes one sheet per report section (Test Scenarios, Test Cases, SQL Queries)
+with the columns the analysis prompt asks for, so the file can be imported into test
+management tools. It uses openpyxl's write-only mode: rows go straight to temporary XML
+parts instead of a cell tree, so memory stays flat however many records are exported.
+`write_csv` streams one CSV file with the same columns (for one section) or a generic
+layout with a Section column (for all of them).
+
+Both take any iterable of records, either `testcase_store.ArtifactRecord`s from
+`parse_analysis` or the row dicts of `TestCaseStore.iter_records`, and consume it once
+without building a list or a DataFrame.
+"""
+
+import csv
+import io
+import re
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from testcase_store import KINDS, body_fields, parse_analysis
+
+FORMATS = ("xlsx", "csv")
+
+SHEET_TITLES = {"scenario": "Test Scenarios", "test_case": "Test Cases", "sql": "SQL Queries"}
+
+# Excel's cell limit
+_MAX_CELL_CHARS = 32767
+# Control characters Excel rejects in cell text
+_ILLEGAL_CHARS_RE = re.compile(r"[\000-\010\013\014\016-\037]")
+# Leading characters that make a spreadsheet evaluate a CSV cell as a formula
+_FORMULA_PREFIXES = ("=", "+", "@", "\t", "\r")
+
+Record = Union[Mapping[str, Any], Any]
+Column = Tuple[str, Callable[[Record, Dict[str, str]], Optional[str]]]
+
+
+def _get(record: Record, name: str) -> Any:
+    return record.get(name) if isinstance(record, Mapping) else getattr(record, name, None)
+
+
+def _attr(name: str) -> Callable[[Record, Dict[str, str]], Optional[str]]:
+    return lambda record, fields: _get(record, name)
+
+
+def _field(*names: str) -> Callable[[Record, Dict[str, str]], Optional[str]]:
+    def value(record: Record, fields: Dict[str, str]) -> Optional[str]:
+        for name in names:
+            if fields.get(name):
+                return fields[name]
+        return None
+
+    return value
+
+
+_SOURCE_COLUMNS: List[Column] = [("Source File", _attr("file")), ("Sheet", _attr("sheet"))]
+
+# Section -> (header, value) columns; the field names follow the analysis system prompt
+COLUMNS: Dict[str, List[Column]] = {
+    "scenario": [
+        ("ID", _attr("ref")),
+        ("Scenario Name", _attr("title")),
+        ("Description", _field("description")),
+        ("Business Value", _field("business value")),
+        ("Risk Level", _attr("priority")),
+        *_SOURCE_COLUMNS,
+        ("Details", _attr("body")),
+    ],
+    "test_case": [
+        ("Test ID", _attr("ref")),
+        ("Test Name", _attr("title")),
+        ("Objective", _field("objective")),
+        ("Prerequisites", _field("prerequisites", "preconditions")),
+        ("Test Steps", _field("test steps", "steps")),
+        ("Expected Results", _field("expected results", "expected result")),
+        ("Test Data Required", _field("test data required", "test data")),
+        ("Priority", _attr("priority")),
+        *_SOURCE_COLUMNS,
+        ("Details", _attr("body")),
+    ],
+    "sql": [
+        ("ID", _attr("ref")),
+        ("Title", _attr("title")),
+        ("Query", _attr("body")),
+        *_SOURCE_COLUMNS,
+    ],
+}
+
+GENERIC_COLUMNS: List[Column] = [
+    ("Section", lambda record, fields: SHEET_TITLES.get(_get(record, "kind"), _get(record, "kind"))),
+    ("ID", _attr("ref")),
+    ("Title", _attr("title")),
+    ("Priority", _attr("priority")),
+    *_SOURCE_COLUMNS,
+    ("Details", _attr("body")),
+]
+
+# Column widths (characters) of the XLSX sheets; others get the default
+_WIDTHS = {"Details": 80, "Query": 80, "Test Steps": 60, "Description": 50, "Objective": 40,
+           "Expected Results": 40, "Scenario Name": 36, "Test Name": 36, "Title": 40}
+
+
+def _row(columns: Sequence[Column], record: Record) -> List[Optional[str]]:
+    fields = body_fields(_get(record, "body") or "")
+    return [getter(record, fields) for _, getter in columns]
+
+
+def _column_letter(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def write_xlsx(records: Iterable[Record], target: Union[str, Path, IO[bytes]]) -> Dict[str, int]:
+    """Write records to an XLSX workbook, one sheet per section; returns rows written per section."""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    workbook = Workbook(write_only=True)
+    sheets = {}
+    for kind in KINDS:
+        sheet = workbook.create_sheet(SHEET_TITLES[kind])
+        headers = [header for header, _ in COLUMNS[kind]]
+        for index, header in enumerate(headers):
+            sheet.column_dimensions[_column_letter(index)].width = _WIDTHS.get(header, 16)
+        sheet.freeze_panes = "A2"
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(sheet, value=header)
+            cell.font = Font(bold=True)
+            header_cells.append(cell)
+        sheet.append(header_cells)
+        sheets[kind] = sheet
+
+    counts = {kind: 0 for kind in KINDS}
+    for record in records:
+        kind = _get(record, "kind")
+        if kind not in sheets:
+            continue
+        sheet = sheets[kind]
+        values = []
+        for value in _row(COLUMNS[kind], record):
+            if isinstance(value, str):
+                value = _ILLEGAL_CHARS_RE.sub("", value)[:_MAX_CELL_CHARS]
+                if value.startswith("="):
+                    # Text, not a formula
+                    cell = WriteOnlyCell(sheet, value=value)
+                    cell.data_type = "s"
+                    value = cell
+            values.append(value)
+        sheet.append(values)
+        counts[kind] += 1
+
+    workbook.save(target)
+    return counts
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(records: Iterable[Record], kind: Optional[str] = None) -> Iterator[str]:
+    """CSV text in chunks of lines: the section's columns for one `kind`, else the generic layout."""
+    columns = COLUMNS[kind] if kind else GENERIC_COLUMNS
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in columns])
+    for n, record in enumerate(records, 1):
+        if kind and _get(record, "kind") != kind:
+            continue
+        writer.writerow([_csv_value(value) for value in _row(columns, record)])
+        if n % 500 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_csv(records: Iterable[Record], target: Union[str, Path, IO[str]], kind: Optional[str] = None) -> int:
+    """Write records as CSV; returns the number of characters written."""
+    written = 0
+    if isinstance(target, (str, Path)):
+        with open(target, "w", encoding="utf-8", newline="") as f:
+            return write_csv(records, f, kind)
+    for chunk in iter_csv(records, kind):
+        target.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def export_report(markdown: str, path: Union[str, Path], data_context: Optional[Sequence[Mapping[str, Any]]] = None) -> Dict[str, int]:
+    """Parse a generated report and export its records; the format follows the file suffix."""
+    records = parse_analysis(markdown, data_context)
+    counts = {kind: sum(1 for record in records if record.kind == kind) for kind in KINDS}
+    if Path(path).suffix.lower() == ".csv":
+        write_csv(records, path)
+    else:
+        write_xlsx(records, path)
+    return counts
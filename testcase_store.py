@@ -0,0 +1,601 @@
+"""
+Structured store of the test scenarios, test cases and SQL queries of generated analyses.
+
+The CLIs write each analysis as one markdown file that the next run overwrites, so past test
+cases can only be found by grepping whatever is left. `parse_analysis` splits a report into
+records instead, one per scenario, test case or SQL query, whichever way the model laid
+them out (table rows, "### TC-001" sub-headings, numbered lists, fenced SQL blocks).
+`TestCaseStore` keeps every run's records in SQLite with an FTS5 index over their id, title
+and text, plus the metadata to filter on: kind, priority, source file/sheet and the hash of
+the workbook they were generated from.
+
+Records are attributed to a sheet by the "# file — sheet" headings of per-sheet reports, or
+else by the first sheet name the record mentions. Storing the same report for the same
+source twice is a no-op.
+
+New records are also checked for near-duplicates of stored ones of the same kind (MinHash
+signatures in an LSH index, see `testcase_dedup`). A record whose estimated similarity to
+an earlier one reaches TESTCASE_DEDUP_THRESHOLD (0 disables the check) is kept but marked
+`duplicate_of` it, and search collapses it into that record.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from context_builder import context_fingerprint
+
+DEFAULT_DB_PATH = Path("./cache/testcases.sqlite3")
+# Same default as testcase_dedup.DEFAULT_THRESHOLD, which is only imported (with NumPy) on first use
+DEDUP_THRESHOLD = float(os.environ.get("TESTCASE_DEDUP_THRESHOLD", "0.7"))
+
+KINDS = ("scenario", "test_case", "sql")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_hash TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    model TEXT,
+    origin TEXT,
+    created_at REAL NOT NULL,
+    UNIQUE (source_hash, content_hash)
+);
+CREATE TABLE IF NOT EXISTS testcases (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES analysis_runs(id),
+    kind TEXT NOT NULL,
+    ref TEXT,
+    title TEXT NOT NULL,
+    body TEXT NOT NULL,
+    priority TEXT,
+    file TEXT,
+    sheet TEXT,
+    workbook_hash TEXT,
+    created_at REAL NOT NULL,
+    duplicate_of INTEGER
+);
+CREATE INDEX IF NOT EXISTS testcases_kind ON testcases (kind, priority);
+CREATE INDEX IF NOT EXISTS testcases_source ON testcases (workbook_hash, sheet);
+CREATE TABLE IF NOT EXISTS testcase_minhash (
+    id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS testcase_lsh (
+    key INTEGER NOT NULL,
+    id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS testcase_lsh_key ON testcase_lsh (key);
+CREATE TABLE IF NOT EXISTS dedup_config (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    num_perm INTEGER NOT NULL,
+    bands INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    threshold REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS testcases_fts USING fts5(
+    ref, title, body, content='testcases', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+# Report section title keyword -> record kind; other sections are not indexed
+_SECTION_KINDS = (("SCENARIO", "scenario"), ("TEST CASE", "test_case"), ("SQL", "sql"))
+_REF_PREFIX = {"scenario": "SC", "test_case": "TC", "sql": "SQL"}
+
+_HEADING_RE = re.compile(r"^(#{1,4})\s+(.*?)\s*#*\s*$")
+_SHEET_HEADING_RE = re.compile(r"^(.+?)\s+—\s+(.+)$")
+_ITEM_RE = re.compile(r"^(?:\d+[.)]|[-*+])\s+(.*)$")
+_FIELD_RE = re.compile(r"^(?:[-*+]\s+)?\**([A-Za-z][\w /()-]{0,40}?)\**\s*:\**\s*(.*)$")
+_TABLE_SEP_RE = re.compile(r"^\|?\s*:?-{2,}")
+_REF_RE = re.compile(r"\b([A-Z]{2,5})[-‐‑‒–_ ]?(\d{1,4})\b")
+_PRIORITY_RE = re.compile(r"\b(P[0-4])\b|\b(Critical|High|Medium|Low)\b", re.IGNORECASE)
+_FENCE_RE = re.compile(r"^\s*```")
+_STATEMENT_END_RE = re.compile(r";[ \t]*(?:\n|$)")
+
+_ID_FIELDS = ("test id", "id", "tc id", "case id", "scenario id", "#", "no", "no.")
+_NAME_FIELDS = ("test name", "scenario name", "name", "title", "scenario", "test case")
+_SUMMARY_FIELDS = ("objective", "description")
+_PRIORITY_FIELDS = ("priority", "risk level", "risk", "severity")
+# "; " before the next "name: " of a table-row body
+_FIELD_SEPARATOR_RE = re.compile(r"; (?=[A-Za-z#][\w /()#.-]{0,40}?: )")
+# "objective: ", "- Priority: " field labels, shared by every record, are left out of dedup shingles
+_LABEL_RE = re.compile(r"(?:^|(?<=; ))(?:[-*+] )?[A-Za-z#][\w /()#.-]{0,40}?: ", re.MULTILINE)
+
+
+@dataclass
+class ArtifactRecord:
+    __slots__ = ("kind", "ref", "title", "body", "priority", "file", "sheet")
+
+    kind: str
+    ref: str
+    title: str
+    body: str
+    priority: Optional[str]
+    file: Optional[str]
+    sheet: Optional[str]
+
+
+def _clean(text: str) -> str:
+    """Markdown emphasis and link syntax stripped, whitespace collapsed."""
+    text = re.sub(r"\[([^\]]*)\]\([^)]*\)", r"\1", text)
+    text = text.replace("**", "").replace("__", "").replace("<br>", " ").replace("<br/>", " ")
+    return " ".join(text.split())
+
+
+def _normalise_ref(ref: str) -> str:
+    match = _REF_RE.search(ref)
+    return f"{match.group(1)}-{match.group(2)}" if match else ref.strip()
+
+
+def _normalise_priority(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    match = _PRIORITY_RE.search(value)
+    if match is None:
+        return None
+    return match.group(1).upper() if match.group(1) else match.group(2).capitalize()
+
+
+def _section_kind(title: str) -> Optional[str]:
+    upper = title.upper()
+    for keyword, kind in _SECTION_KINDS:
+        if keyword in upper:
+            return kind
+    return None
+
+
+def _split_row(line: str) -> List[str]:
+    return [_clean(cell) for cell in line.strip().strip("|").split("|")]
+
+
+def _field(fields: Mapping[str, str], names: Sequence[str]) -> Optional[str]:
+    for name in names:
+        value = fields.get(name)
+        if value:
+            return value
+    return None
+
+
+def _table_items(lines: List[str]) -> Iterable[Tuple[str, Dict[str, str], str]]:
+    """(heading, fields, text) per data row of every markdown table in `lines`."""
+    header: Optional[List[str]] = None
+    for i, line in enumerate(lines):
+        if not line.lstrip().startswith("|"):
+            header = None
+            continue
+        if header is None:
+            if i + 1 < len(lines) and _TABLE_SEP_RE.match(lines[i + 1].strip()):
+                header = [cell.lower() for cell in _split_row(line)]
+            continue
+        if _TABLE_SEP_RE.match(line.strip()):
+            continue
+        cells = _split_row(line)
+        fields = {name: value for name, value in zip(header, cells) if value}
+        # row numbers ("#" column) are not worth indexing
+        text = "; ".join(
+            f"{name}: {value}" for name, value in fields.items() if not (name in _ID_FIELDS and value.isdigit())
+        )
+        yield "", fields, text
+
+
+def _block_items(lines: List[str], heading_level: int) -> Iterable[Tuple[str, Dict[str, str], str]]:
+    """(heading, fields, text) per sub-heading, or else per top-level list item."""
+    subheading = re.compile(r"^#{%d,}\s+" % heading_level)
+    has_subheadings = any(subheading.match(line) for line in lines)
+    blocks: List[List[str]] = []
+    for line in lines:
+        if has_subheadings:
+            starts = bool(subheading.match(line))
+        else:
+            starts = bool(_ITEM_RE.match(line)) and not line[:1].isspace()
+        if starts:
+            blocks.append([line])
+        elif blocks:
+            blocks[-1].append(line)
+
+    for block in blocks:
+        first = block[0]
+        heading = _HEADING_RE.match(first).group(2) if has_subheadings else _ITEM_RE.match(first).group(1)
+        fields: Dict[str, str] = {}
+        for line in block[1:]:
+            match = _FIELD_RE.match(line.strip())
+            if match and match.group(2):
+                fields.setdefault(match.group(1).strip().lower(), _clean(match.group(2)))
+        # "1. **Scenario Name**: description" lists carry the title inline ("TC-001: name" is no field)
+        lead = ""
+        inline = _FIELD_RE.match(heading)
+        if (inline and inline.group(2) and not _REF_RE.fullmatch(inline.group(1).strip())
+                and inline.group(1).strip().lower() not in _NAME_FIELDS + _SUMMARY_FIELDS):
+            heading, lead = inline.group(1), inline.group(2)
+        rest = [_clean(line) for line in block[1:] if line.strip() and not _FENCE_RE.match(line)]
+        text = "\n".join(line for line in [_clean(lead), *rest] if line)
+        yield _clean(heading), fields, text
+
+
+def _sql_items(lines: List[str]) -> Iterable[Tuple[str, str]]:
+    """(label, statement) per statement of every fenced code block in `lines`."""
+    label = ""
+    code: Optional[List[str]] = None
+    for line in lines:
+        if _FENCE_RE.match(line):
+            if code is None:
+                code = []
+                continue
+            statements = [s.strip() for s in _STATEMENT_END_RE.split("\n".join(code)) if s.strip()]
+            for statement in statements:
+                yield (label if len(statements) == 1 else ""), statement + ";"
+            code, label = None, ""
+        elif code is not None:
+            code.append(line)
+        elif line.strip():
+            item = _ITEM_RE.match(line.strip())
+            label = _clean(item.group(1) if item else line.strip()).rstrip(":")
+
+
+def _sheet_names(data_context: Optional[Sequence[Mapping[str, Any]]]) -> List[Tuple[str, str]]:
+    return [
+        (str(ctx.get("file")), str(ctx.get("sheet")))
+        for ctx in data_context or ()
+        if "error" not in ctx and ctx.get("sheet") is not None
+    ]
+
+
+def _mentioned_sheet(text: str, sheets: List[Tuple[str, str]]) -> Tuple[Optional[str], Optional[str]]:
+    """(file, sheet) of the sheet name mentioned first in `text`, if any."""
+    best: Tuple[int, Optional[str], Optional[str]] = (len(text) + 1, None, None)
+    for file_name, sheet_name in sheets:
+        if len(sheet_name) < 3:
+            continue
+        match = re.search(r"(?<!\w)" + re.escape(sheet_name) + r"(?!\w)", text, re.IGNORECASE)
+        if match and match.start() < best[0]:
+            best = (match.start(), file_name, sheet_name)
+    return best[1], best[2]
+
+
+def parse_analysis(markdown: str, data_context: Optional[Sequence[Mapping[str, Any]]] = None) -> List[ArtifactRecord]:
+    """Scenario, test case and SQL records of a generated analysis report, in report order."""
+    sheets = _sheet_names(data_context)
+    records: List[ArtifactRecord] = []
+    counters = {kind: 0 for kind in KINDS}
+    scope: Tuple[Optional[str], Optional[str]] = (None, None)
+    kind: Optional[str] = None
+    level = 2
+    section: List[str] = []
+
+    def flush() -> None:
+        if kind is None or not section:
+            return
+        if kind == "sql":
+            items = [(label, {}, statement) for label, statement in _sql_items(section)]
+        else:
+            items = list(_table_items(section)) or list(_block_items(section, level + 1))
+        for heading, fields, text in items:
+            counters[kind] += 1
+            ref = _field(fields, _ID_FIELDS) or ""
+            ref = _normalise_ref(ref) if ref and not ref.isdigit() else ""
+            if not ref:
+                found = _REF_RE.search(heading)
+                ref = _normalise_ref(found.group(0)) if found else f"{_REF_PREFIX[kind]}-{counters[kind]:03d}"
+            name = heading
+            leading_ref = _REF_RE.match(name)
+            if leading_ref and _normalise_ref(leading_ref.group(0)) == ref:
+                name = name[leading_ref.end():].lstrip(" :.—–-")
+            title = (
+                _field(fields, _NAME_FIELDS) or name or _field(fields, _SUMMARY_FIELDS)
+                or (text.splitlines() or [""])[0][:120]
+            )
+            body = text if kind == "sql" or not heading else f"{heading}\n{text}".strip()
+            priority = _normalise_priority(_field(fields, _PRIORITY_FIELDS))
+            if priority is None and kind != "sql":
+                priority = _normalise_priority(body)
+            file_name, sheet_name = scope
+            if sheet_name is None:
+                file_name, sheet_name = _mentioned_sheet(f"{title}\n{body}", sheets)
+            records.append(ArtifactRecord(kind, ref, _clean(title), body, priority, file_name, sheet_name))
+
+    for line in markdown.splitlines():
+        heading = _HEADING_RE.match(line)
+        if heading and len(heading.group(1)) <= level:
+            flush()
+            section = []
+            hashes, title = len(heading.group(1)), heading.group(2)
+            # "# file — sheet" starts a per-sheet report (incremental analysis output)
+            if hashes == 1:
+                per_sheet = _SHEET_HEADING_RE.match(title)
+                scope = (per_sheet.group(1), per_sheet.group(2)) if per_sheet else (None, None)
+            kind = _section_kind(re.sub(r"^\d+[.)]\s*", "", title)) if hashes > 1 else None
+            level = max(hashes, 2)
+            continue
+        section.append(line)
+    flush()
+    return records
+
+
+def body_fields(body: str) -> Dict[str, str]:
+    """Lower-cased field name -> value of a record body ("name: value; ..." rows or "- Name: value" lines)."""
+    fields: Dict[str, str] = {}
+    for line in body.splitlines():
+        for part in _FIELD_SEPARATOR_RE.split(line):
+            match = _FIELD_RE.match(part.strip())
+            if match and match.group(2):
+                fields.setdefault(match.group(1).strip().lower(), match.group(2).strip())
+    return fields
+
+
+class TestCaseStore:
+    __test__ = False  # not a pytest test class
+
+    def __init__(self, db_path: Optional[Path] = None, dedup_threshold: float = DEDUP_THRESHOLD):
+        self.db_path = Path(db_path or os.environ.get("TESTCASE_DB") or DEFAULT_DB_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.dedup_threshold = dedup_threshold
+        self._local = threading.local()
+        self._lsh: Optional[Tuple[Any, int, int]] = None
+        db = self._connect()
+        columns = {row["name"] for row in db.execute("PRAGMA table_info(testcases)")}
+        if columns and "duplicate_of" not in columns:
+            # stores created before near-duplicate detection
+            db.execute("ALTER TABLE testcases ADD COLUMN duplicate_of INTEGER")
+        db.executescript(_SCHEMA)
+        db.execute("CREATE INDEX IF NOT EXISTS testcases_duplicate_of ON testcases (duplicate_of)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """This thread's connection; a forked child gets fresh ones instead of its parent's."""
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA busy_timeout=30000")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def add_analysis(
+        self,
+        markdown: str,
+        data_context: Optional[Sequence[Mapping[str, Any]]] = None,
+        source_hash: Optional[str] = None,
+        model: Optional[str] = None,
+        origin: Optional[str] = None,
+    ) -> Tuple[int, int, int]:
+        """Parse and store a report; returns (run id, records added, near-duplicates among them).
+
+        `source_hash` identifies what the report was generated from and defaults to the
+        context fingerprint. A report already stored for the same source adds nothing.
+        """
+        if source_hash is None:
+            source_hash = context_fingerprint(list(data_context)) if data_context else ""
+        content_hash = hashlib.sha256(markdown.encode("utf-8")).hexdigest()[:32]
+        records = parse_analysis(markdown, data_context)
+        # Workbook hash per file: fingerprint of that file's sheets
+        workbook_hashes = {
+            file_name: context_fingerprint([ctx for ctx in data_context or () if str(ctx.get("file")) == file_name])
+            for file_name in {record.file for record in records if record.file}
+        }
+        now = time.time()
+        if self.dedup_threshold > 0:
+            self._ensure_lsh()
+
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT id FROM analysis_runs WHERE source_hash = ? AND content_hash = ?", (source_hash, content_hash)
+            ).fetchone()
+            if row is not None:
+                db.execute("COMMIT")
+                return row["id"], 0, 0
+            run_id = db.execute(
+                "INSERT INTO analysis_runs (source_hash, content_hash, model, origin, created_at) VALUES (?, ?, ?, ?, ?)",
+                (source_hash, content_hash, model, origin, now),
+            ).lastrowid
+            inserted = []
+            for record in records:
+                rowid = db.execute(
+                    "INSERT INTO testcases (run_id, kind, ref, title, body, priority, file, sheet, workbook_hash, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, record.kind, record.ref, record.title, record.body, record.priority, record.file,
+                     record.sheet, workbook_hashes.get(record.file, source_hash), now),
+                ).lastrowid
+                db.execute(
+                    "INSERT INTO testcases_fts (rowid, ref, title, body) VALUES (?, ?, ?, ?)",
+                    (rowid, record.ref, record.title, record.body),
+                )
+                inserted.append((rowid, record.kind, record.body))
+            duplicates = self._deduplicate(db, inserted) if self.dedup_threshold > 0 else 0
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return run_id, len(records), duplicates
+
+    # -- near-duplicate detection -----------------------------------------
+
+    def _lsh_params(self) -> Tuple[Any, int, int]:
+        """(hasher, bands, rows) for this store's threshold."""
+        if self._lsh is None:
+            from testcase_dedup import DEFAULT_NUM_PERM, MinHasher, lsh_params
+
+            self._lsh = (MinHasher(DEFAULT_NUM_PERM), *lsh_params(self.dedup_threshold, DEFAULT_NUM_PERM))
+        return self._lsh
+
+    def _ensure_lsh(self) -> None:
+        """Rebuild the index once if it was built with other settings (or never)."""
+        if self._lsh is not None:
+            return
+        hasher, bands, rows = self._lsh_params()
+        config = self._connect().execute("SELECT num_perm, bands, rows, threshold FROM dedup_config WHERE id = 1").fetchone()
+        if config is None or tuple(config) != (hasher.num_perm, bands, rows, self.dedup_threshold):
+            self.rebuild_dedup_index()
+
+    def _deduplicate(self, db: sqlite3.Connection, records: List[Tuple[int, str, str]]) -> int:
+        """Mark each record that is a near-duplicate of an earlier one; index the others. Returns the count marked."""
+        from testcase_dedup import band_keys, shingles, signature_bytes, signature_from_bytes, similarity
+
+        hasher, bands, rows = self._lsh_params()
+        signatures = hasher.signatures([shingles(_LABEL_RE.sub(" ", body), kind) for _, kind, body in records])
+        duplicates = 0
+        # One record at a time, so duplicates within the same report are caught too
+        for (rowid, kind, _), signature in zip(records, signatures):
+            keys = band_keys(signature, bands, rows)
+            candidates = db.execute(
+                "SELECT DISTINCT m.id, m.signature FROM testcase_lsh l "
+                "JOIN testcases t ON t.id = l.id JOIN testcase_minhash m ON m.id = l.id "
+                f"WHERE l.key IN ({', '.join('?' * len(keys))}) AND t.kind = ?",
+                (*keys, kind),
+            ).fetchall()
+            if candidates:
+                scores = similarity(signature, signature_from_bytes([c["signature"] for c in candidates], hasher.num_perm))
+                best = int(scores.argmax())
+                if scores[best] >= self.dedup_threshold:
+                    db.execute("UPDATE testcases SET duplicate_of = ? WHERE id = ?", (candidates[best]["id"], rowid))
+                    duplicates += 1
+                    continue
+            # Only distinct records are indexed: every duplicate points at one of them
+            db.execute("INSERT INTO testcase_minhash (id, signature) VALUES (?, ?)", (rowid, signature_bytes(signature)))
+            db.executemany("INSERT INTO testcase_lsh (key, id) VALUES (?, ?)", [(key, rowid) for key in keys])
+        return duplicates
+
+    def rebuild_dedup_index(self, batch: int = 5000) -> int:
+        """Recompute signatures and duplicate links of every stored record; returns the duplicates found."""
+        hasher, bands, rows = self._lsh_params()
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("DELETE FROM testcase_minhash")
+            db.execute("DELETE FROM testcase_lsh")
+            db.execute("UPDATE testcases SET duplicate_of = NULL WHERE duplicate_of IS NOT NULL")
+            duplicates, last_id = 0, 0
+            while True:
+                chunk = db.execute(
+                    "SELECT id, kind, body FROM testcases WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch)
+                ).fetchall()
+                if not chunk:
+                    break
+                duplicates += self._deduplicate(db, [tuple(row) for row in chunk])
+                last_id = chunk[-1]["id"]
+            db.execute(
+                "INSERT OR REPLACE INTO dedup_config (id, num_perm, bands, rows, threshold) VALUES (1, ?, ?, ?, ?)",
+                (hasher.num_perm, bands, rows, self.dedup_threshold),
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return duplicates
+
+    def search(
+        self,
+        query: str = "",
+        kind: Optional[str] = None,
+        priority: Optional[str] = None,
+        file: Optional[str] = None,
+        sheet: Optional[str] = None,
+        workbook_hash: Optional[str] = None,
+        limit: int = 20,
+        include_duplicates: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Best matches first (BM25; ids and titles weigh more than the text), newest first without a query.
+
+        Near-duplicates are left out unless `include_duplicates`; each result carries the
+        number of records collapsed into it as `duplicates`.
+        """
+        filters, params = [], []
+        if not include_duplicates:
+            filters.append("t.duplicate_of IS NULL")
+        for column, value in (("kind", kind), ("priority", priority), ("file", file), ("sheet", sheet),
+                              ("workbook_hash", workbook_hash)):
+            if value:
+                filters.append(f"t.{column} = ? COLLATE NOCASE")
+                params.append(value)
+        match = _match_expression(query)
+        if match:
+            sql = (
+                f"SELECT t.*, {_DUPLICATE_COUNT}, snippet(testcases_fts, 2, '[', ']', '…', 16) AS snippet, "
+                "bm25(testcases_fts, 10.0, 4.0, 1.0) AS score "
+                "FROM testcases_fts JOIN testcases t ON t.id = testcases_fts.rowid "
+                "WHERE testcases_fts MATCH ?" + "".join(f" AND {f}" for f in filters) + " ORDER BY score LIMIT ?"
+            )
+            params.insert(0, match)
+        else:
+            sql = (
+                f"SELECT t.*, {_DUPLICATE_COUNT}, NULL AS snippet, NULL AS score FROM testcases t"
+                + (" WHERE " + " AND ".join(filters) if filters else "") + " ORDER BY t.id DESC LIMIT ?"
+            )
+        rows = self._connect().execute(sql, (*params, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def iter_records(
+        self,
+        kind: Optional[str] = None,
+        priority: Optional[str] = None,
+        file: Optional[str] = None,
+        sheet: Optional[str] = None,
+        workbook_hash: Optional[str] = None,
+        run_id: Optional[int] = None,
+        include_duplicates: bool = False,
+        batch: int = 1000,
+    ) -> Iterator[Dict[str, Any]]:
+        """Every matching record in storage order, fetched `batch` rows at a time (keyset pagination)."""
+        filters, params = [], []
+        if not include_duplicates:
+            filters.append("duplicate_of IS NULL")
+        for column, value in (("kind", kind), ("priority", priority), ("file", file), ("sheet", sheet),
+                              ("workbook_hash", workbook_hash)):
+            if value:
+                filters.append(f"{column} = ? COLLATE NOCASE")
+                params.append(value)
+        if run_id is not None:
+            filters.append("run_id = ?")
+            params.append(run_id)
+        sql = "SELECT * FROM testcases WHERE id > ?" + "".join(f" AND {f}" for f in filters) + " ORDER BY id LIMIT ?"
+        last_id = 0
+        while True:
+            # Connection looked up per batch: a streaming response may resume the generator on another thread
+            rows = self._connect().execute(sql, (last_id, *params, batch)).fetchall()
+            for row in rows:
+                yield dict(row)
+            if len(rows) < batch:
+                return
+            last_id = rows[-1]["id"]
+
+    def stats(self) -> Dict[str, int]:
+        db = self._connect()
+        counts = dict(db.execute("SELECT kind, COUNT(*) FROM testcases GROUP BY kind").fetchall())
+        return {
+            "runs": db.execute("SELECT COUNT(*) FROM analysis_runs").fetchone()[0],
+            **{kind: counts.get(kind, 0) for kind in KINDS},
+            "duplicates": db.execute("SELECT COUNT(*) FROM testcases WHERE duplicate_of IS NOT NULL").fetchone()[0],
+        }
+
+
+_DUPLICATE_COUNT = "(SELECT COUNT(*) FROM testcases d WHERE d.duplicate_of = t.id) AS duplicates"
+
+
+def _match_expression(query: str) -> str:
+    """FTS5 query for free text: every term must match, the last one as a prefix."""
+    terms = [term.replace('"', "") for term in query.split()]
+    terms = [term for term in terms if re.search(r"\w", term)]
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def index_report(
+    markdown: str,
+    data_context: Optional[Sequence[Mapping[str, Any]]] = None,
+    source_hash: Optional[str] = None,
+    model: Optional[str] = None,
+    origin: Optional[str] = None,
+) -> Tuple[int, int]:
+    """Store a report in the default test-case store; returns (records added, near-duplicates among them)."""
+    return TestCaseStore().add_analysis(markdown, data_context, source_hash, model, origin)[1:]
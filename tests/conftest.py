@@ -0,0 +1,63 @@
+"""
+Shared fixtures: the repo root on sys.path, the local mock LLM and the server app wired to it.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from mock_llm_server import MockLLMConfig, running_mock_llm  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def mock_llm():
+    """The mock LLM for the whole session, with LLM_BASE_URL / LLM_API_KEY / LLM_MODEL pointing at it.
+
+    Session-scoped because server.py resolves its model at import time and keeps its client.
+    """
+    with running_mock_llm(MockLLMConfig(latency="fixed:0", tokens_per_second=0, seed=1)) as mock:
+        yield mock
+
+
+@pytest.fixture(scope="session")
+def server(mock_llm, tmp_path_factory):
+    """The server module, imported once the mock is up, with its SQLite stores in a temp dir."""
+    cache = tmp_path_factory.mktemp("server-cache")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("TESTCASE_DB", str(cache / "testcases.sqlite3"))
+        patch.setenv("ANALYSIS_JOB_DB", str(cache / "jobs.sqlite3"))
+        patch.setenv("ANALYSIS_FRAGMENT_DIR", str(cache / "analysis_fragments"))
+        import server
+
+        assert server.LLM_BASE_URL == mock_llm.base_url, "server was imported before the mock LLM started"
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    """A TestClient on the server app with an empty data context.
+
+    Not entered as a context manager: the shutdown hook stops the job queue for the rest of the session.
+    """
+    from fastapi.testclient import TestClient
+
+    server.DATA_CONTEXT.clear()
+    server._UPLOAD_CACHE.clear()
+    yield TestClient(server.app)
+    server.DATA_CONTEXT.clear()
+
+
+@pytest.fixture
+def uploaded_client(client):
+    """`client` with the sample workbooks in sample-document/ uploaded."""
+    files = [
+        ("files", (name, (ROOT / "sample-document" / name).read_bytes()))
+        for name in ("Database_Specs_Sheet.xlsx", "FRS_Column_Mapping_Sheet.xlsx")
+    ]
+    response = client.post("/api/context/upload", files=files)
+    assert response.status_code == 200, response.text
+    return client
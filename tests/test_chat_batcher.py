@@ -0,0 +1,58 @@
+import asyncio
+
+from chat_batcher import ChatSqlBatcher, build_batch_question, parse_batch_response
+
+
+def test_answers_are_mapped_back_by_index():
+    content = """[
+        {"index": 2, "sqlQuery": "SELECT 2", "description": "two"},
+        {"index": 0, "sqlQuery": "SELECT 0", "description": "zero"},
+        {"index": "1", "sqlQuery": "SELECT 1", "description": "one"}
+    ]"""
+
+    answers = parse_batch_response(content, 3)
+
+    assert [a["sqlQuery"] for a in answers] == ["SELECT 0", "SELECT 1", "SELECT 2"]
+
+
+def test_missing_and_unusable_slots_are_none():
+    content = """```json
+    {"answers": [
+        {"sqlQuery": "SELECT 0"},
+        {"index": 5, "sqlQuery": "out of range"},
+        {"index": "two", "sqlQuery": "not a number"},
+        {"index": 0, "sqlQuery": "duplicate"},
+        "not an object"
+    ]}
+    ```"""
+
+    assert parse_batch_response(content, 3) == [{"sqlQuery": "SELECT 0"}, None, None]
+    assert parse_batch_response("I could not answer these.", 2) == [None, None]
+
+
+def test_batch_question_numbers_the_requests():
+    question = build_batch_question(["count rows", "list tables"])
+
+    assert "0. count rows\n1. list tables" in question
+    assert "exactly 2 objects" in question
+
+
+def test_batcher_groups_questions_by_context():
+    calls = []
+
+    def run_batch(context, questions):
+        calls.append((context, questions))
+        return [{"sqlQuery": f"{context}:{q}"} for q in questions]
+
+    async def ask():
+        batcher = ChatSqlBatcher(run_batch, window_ms=20, max_batch=8)
+        return await asyncio.gather(
+            batcher.submit("a", "ctx-a", "q1"),
+            batcher.submit("b", "ctx-b", "q2"),
+            batcher.submit("a", "ctx-a", "q3"),
+        )
+
+    answers = asyncio.run(ask())
+
+    assert [a["sqlQuery"] for a in answers] == ["ctx-a:q1", "ctx-b:q2", "ctx-a:q3"]
+    assert sorted(calls) == [("ctx-a", ["q1", "q3"]), ("ctx-b", ["q2"])]
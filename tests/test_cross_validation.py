@@ -0,0 +1,103 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from cross_validation import (CONTEXT_SHEET, catalog_sheet, cross_validate, cross_validate_files, normalise_name,
+                              normalise_table, sheet_role, type_family, validation_context)
+
+SAMPLES = Path(__file__).resolve().parent.parent / "sample-document"
+
+SPEC = pd.DataFrame(
+    [
+        ["customers", "Customers", "id", ""],
+        ["orders", "Orders", "id", "customer_id > customers.id"],
+        ["invoices", "Invoices", "id", "order_id > orders.id"],
+    ],
+    columns=["Table Name", "Description", "Primary Key", "Relationships"],
+)
+MAPPING = pd.DataFrame(
+    [
+        ["customers", "id", "int", "", "PK"],
+        ["customers", "email", "varchar(255)", "", ""],
+        ["orders", "id", "int", "", "PK"],
+        ["orders", "customer_id", "int", "Foreign key > customers.id", "FK"],
+        ["invoices", "id", "int", "", "PK"],
+        ["invoices", "order_id", "bigint", "Foreign key > orders.id", "FK"],
+    ],
+    columns=["Table Name", "Column Name", "Data Type", "Mapping/Relationship", "Constraint"],
+)
+
+
+def sheets(mapping):
+    return [catalog_sheet("Database_Specs.xlsx", "Tables", SPEC), catalog_sheet("FRS_Mapping.xlsx", "Columns", mapping)]
+
+
+def findings(mapping):
+    return {(f["check"], f["table"], f["column"]): f for f in cross_validate(sheets(mapping)).to_dict("records")}
+
+
+def test_consistent_workbooks_have_no_findings():
+    assert cross_validate(sheets(MAPPING)).empty
+
+
+def test_missing_mapping():
+    found = findings(MAPPING[MAPPING["Column Name"] != "order_id"])
+
+    assert found[("missing_mapping", "invoices", "order_id")]["detail"] == "spec foreign key column not mapped"
+
+
+def test_orphan_column():
+    orphan = pd.concat([MAPPING, pd.DataFrame([["ghost", "id", "int", "", "PK"]], columns=MAPPING.columns)],
+                       ignore_index=True)
+
+    finding = findings(orphan)[("orphan_column", "ghost", "id")]
+
+    assert (finding["file"], finding["sheet"], finding["row"]) == ("FRS_Mapping.xlsx", "Columns", 8)
+
+
+def test_type_mismatch_of_a_foreign_key():
+    mismatched = MAPPING.copy()
+    mismatched.loc[3, "Data Type"] = "varchar(20)"
+
+    finding = findings(mismatched)[("type_mismatch", "orders", "customer_id")]
+
+    assert finding["detail"] == "varchar(20) foreign key to customers.id (int)"
+    assert finding["row"] == 5
+
+
+def test_validation_context_counts_and_fingerprint():
+    broken = MAPPING.copy()
+    broken.loc[3, "Data Type"] = "varchar(20)"
+
+    item = validation_context(sheets(broken))
+
+    assert item["sheet"] == CONTEXT_SHEET
+    assert item["cross_validation"]["counts"] == {"type_mismatch": 1}
+    assert item["fingerprint"] == validation_context(sheets(broken))["fingerprint"]
+    assert item["fingerprint"] != validation_context(sheets(MAPPING))["fingerprint"]
+    assert validation_context(sheets(MAPPING)[:1]) is None
+
+
+@pytest.mark.parametrize("columns, name, role", [
+    (["Table Name", "Column Name", "Data Type"], "FRS_Column_Mapping.xlsx Sheet1", "mapping"),
+    (["Table Name", "Column Name", "Data Type"], "Database_Specs.xlsx Sheet1", "spec"),
+    (["Table Name", "Primary Key", "Relationships"], "anything.xlsx Sheet1", "spec"),
+    (["id", "amount"], "Database_Specs.xlsx Sheet1", None),
+])
+def test_sheet_role(columns, name, role):
+    assert sheet_role(columns, name) == role
+
+
+def test_name_and_type_normalisation():
+    assert normalise_name("`Order Items`") == "order_items"
+    assert normalise_table('"dbo"."Order Items"') == "order_items"
+    assert type_family("BIGINT") == type_family("int") == "integer"
+    assert type_family("varchar(20)") == "text"
+
+
+def test_sample_workbooks():
+    item = cross_validate_files(sorted(SAMPLES.glob("*.xlsx")))
+
+    assert item is not None
+    assert item["cross_validation"]["rows_checked"] > 0
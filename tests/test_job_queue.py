@@ -0,0 +1,162 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from job_queue import CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, QueueFullError
+
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+def wait_for(queue, job_id, statuses=FINISHED, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} still {queue.get(job_id)['status']} after {timeout}s")
+
+
+@pytest.fixture
+def release():
+    """Event the blocking handlers wait on; set at teardown so no worker thread is left hanging."""
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+@pytest.fixture
+def make_queue(tmp_path, release):
+    queues = []
+
+    def make(max_workers=1, max_queue_depth=20, db_path=tmp_path / "jobs.sqlite3"):
+        queue = JobQueue(db_path, max_workers=max_workers, max_queue_depth=max_queue_depth)
+        queue.register("double", lambda params, job: {"value": params["n"] * 2})
+        queue.register("fail", lambda params, job: 1 / 0)
+        queue.register("block", lambda params, job: release.wait(10))
+
+        def until_cancelled(params, job):
+            while True:
+                job.raise_if_cancelled()
+                job.report_progress(0.5)
+                time.sleep(0.01)
+
+        queue.register("until_cancelled", until_cancelled)
+        queues.append(queue)
+        return queue
+
+    yield make
+    release.set()
+    for queue in queues:
+        queue.shutdown()
+
+
+def test_submit_claim_and_complete(make_queue):
+    queue = make_queue()
+
+    job = wait_for(queue, queue.submit("double", {"n": 21}))
+
+    assert job["status"] == SUCCEEDED
+    assert job["progress"] == 1.0
+    assert job["result"] == {"value": 42}
+
+
+def test_failed_job_records_the_error(make_queue):
+    queue = make_queue()
+
+    job = wait_for(queue, queue.submit("fail", {}))
+
+    assert job["status"] == FAILED
+    assert "division by zero" in job["error"]
+
+
+def test_unknown_kind_and_job(make_queue):
+    queue = make_queue()
+
+    with pytest.raises(ValueError):
+        queue.submit("missing", {})
+    assert queue.get("missing") is None
+    assert queue.cancel("missing") is False
+
+
+def test_queue_full_at_max_depth(make_queue, release):
+    queue = make_queue(max_queue_depth=2)
+    first = queue.submit("block", {})
+    queue.submit("block", {})
+
+    with pytest.raises(QueueFullError):
+        queue.submit("double", {"n": 1})
+
+    release.set()
+    wait_for(queue, first)
+    assert wait_for(queue, queue.submit("double", {"n": 1}))["status"] == SUCCEEDED
+
+
+def test_queue_depth_is_shared_by_workers_on_one_database(make_queue):
+    first, second = make_queue(max_queue_depth=1), make_queue(max_queue_depth=1)
+    first.submit("block", {})
+
+    with pytest.raises(QueueFullError):
+        second.submit("double", {"n": 1})
+
+
+def test_cancel_queued_job(make_queue, release):
+    queue = make_queue(max_workers=1)
+    running = queue.submit("block", {})
+    queued = queue.submit("double", {"n": 1})
+    assert queue.get(queued)["status"] == QUEUED
+
+    assert queue.cancel(queued) is True
+    assert queue.get(queued)["status"] == CANCELLED
+
+    release.set()
+    assert wait_for(queue, running)["status"] == SUCCEEDED
+    assert queue.get(queued)["status"] == CANCELLED
+    assert queue.cancel(running) is False
+
+
+def test_cancel_running_job(make_queue):
+    queue = make_queue()
+    job_id = queue.submit("until_cancelled", {})
+    wait_for(queue, job_id, statuses=(RUNNING,))
+
+    assert queue.cancel(job_id) is True
+    assert wait_for(queue, job_id)["status"] == CANCELLED
+
+
+def test_resume_pending_redispatches_jobs_of_dead_workers(make_queue, tmp_path):
+    queue = make_queue()
+    now = time.time()
+    with sqlite3.connect(tmp_path / "jobs.sqlite3") as db:
+        db.executemany(
+            "INSERT INTO jobs (id, kind, status, params, worker, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                ("orphaned", "double", RUNNING, '{"n": 1}', "gone-host:1", now, now),
+                ("owned", "double", RUNNING, '{"n": 2}', "live-host:2", now, now),
+                ("waiting", "double", QUEUED, '{"n": 3}', None, now, now),
+            ],
+        )
+
+    assert queue.resume_pending(live_workers={"live-host:2", queue.worker_id}) == 2
+
+    assert wait_for(queue, "orphaned")["result"] == {"value": 2}
+    assert wait_for(queue, "waiting")["result"] == {"value": 6}
+    assert queue.get("owned")["status"] == RUNNING
+
+    # A single-process restart re-queues every running job
+    assert queue.resume_pending() == 1
+    assert wait_for(queue, "owned")["result"] == {"value": 4}
+
+
+def test_analysis_job_through_the_mock_llm(server, uploaded_client, make_queue):
+    queue = make_queue()
+    queue.register("analysis", server.run_analysis_job)
+
+    job = wait_for(queue, queue.submit("analysis", {"mode": "per_sheet",
+                                                    "data_context": [dict(ctx) for ctx in server.DATA_CONTEXT]}))
+
+    assert job["status"] == SUCCEEDED, job["error"]
+    assert job["result"]["stats"]["failed"] == 0
+    assert "## 1. " in job["result"]["analysis"]
@@ -0,0 +1,57 @@
+import time
+
+from llm_client import resolve_model
+from mock_llm_server import MOCK_MODEL
+from prompt_builder import ANALYSIS_SECTIONS
+
+
+def wait_for_job(client, job_id, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/analysis/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed", "cancelled"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish in {timeout}s")
+
+
+def test_llm_client_resolves_to_mock(mock_llm):
+    model, provider = resolve_model()
+    assert model == MOCK_MODEL
+    assert mock_llm.base_url in provider
+
+
+def test_chat_sql_round_trip(uploaded_client, mock_llm):
+    before = mock_llm.stats["requests"]
+
+    response = uploaded_client.post("/api/chat-sql?timings=true", json={"message": "how many records are there?"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["sqlQuery"] == "SELECT COUNT(*) AS total_records FROM data;"
+    assert "llm_call" in body["timings"]
+    assert mock_llm.stats["requests"] == before + 1
+
+
+def test_chat_sql_without_context_uses_heuristics(client, mock_llm):
+    before = mock_llm.stats["requests"]
+
+    response = client.post("/api/chat-sql", json={"message": "show duplicate ids"})
+
+    assert response.status_code == 200
+    assert response.json()["sqlQuery"]
+    assert mock_llm.stats["requests"] == before
+
+
+def test_sectioned_analysis_job(uploaded_client):
+    client = uploaded_client
+
+    response = client.post("/api/analysis/jobs", json={"mode": "sections"})
+    assert response.status_code == 202
+    job = wait_for_job(client, response.json()["id"])
+
+    assert job["status"] == "succeeded", job.get("error")
+    analysis = job["result"]["analysis"]
+    for number, title in ANALYSIS_SECTIONS:
+        assert f"## {number}. {title}" in analysis
+    assert "could not be generated" not in analysis
@@ -0,0 +1,90 @@
+import pytest
+
+import model_tiers
+from model_tiers import ModelRouter, resolve_tier_models
+from token_budget import PromptTooLarge
+
+MODELS = {"small": "small-model", "large": "large-model"}
+
+
+def test_accepted_small_answer_is_not_escalated():
+    calls = []
+    router = ModelRouter(MODELS)
+
+    assert router.run("chat_sql", lambda model: calls.append(model) or "SELECT 1") == "SELECT 1"
+    assert calls == ["small-model"]
+
+
+def test_failed_validation_escalates_to_the_large_model():
+    calls = []
+
+    def attempt(model):
+        calls.append(model)
+        return "" if model == "small-model" else "SELECT 1"
+
+    assert ModelRouter(MODELS).run("chat_sql", attempt) == "SELECT 1"
+    assert calls == ["small-model", "large-model"]
+
+
+def test_top_tier_result_is_returned_when_nothing_is_accepted():
+    calls = []
+
+    def attempt(model):
+        calls.append(model)
+        return f"no sql from {model}"
+
+    assert ModelRouter(MODELS).run("followup", attempt, accept=lambda text: "SELECT" in text) == "no sql from large-model"
+    assert calls == ["small-model", "large-model"]
+
+
+def test_errors_escalate_and_the_top_tier_error_is_raised():
+    calls = []
+
+    def attempt(model):
+        calls.append(model)
+        raise RuntimeError(model)
+
+    with pytest.raises(RuntimeError, match="large-model"):
+        ModelRouter(MODELS).run("chat_sql", attempt)
+    assert calls == ["small-model", "large-model"]
+
+
+def test_prompt_too_large_is_not_escalated():
+    calls = []
+
+    def attempt(model):
+        calls.append(model)
+        raise PromptTooLarge("chat_sql", 9000, 8000, 128)
+
+    with pytest.raises(PromptTooLarge):
+        ModelRouter(MODELS).run("chat_sql", attempt)
+    assert calls == ["small-model"]
+
+
+def test_large_tasks_start_on_the_large_tier():
+    calls = []
+
+    ModelRouter(MODELS).run("analysis", lambda model: calls.append(model) or "")
+    assert calls == ["large-model"]
+
+
+def test_untiered_router_calls_once():
+    calls = []
+    router = ModelRouter({"small": "only-model", "large": "only-model"})
+
+    assert not router.tiered
+    assert router.run("chat_sql", lambda model: calls.append(model) or "") == ""
+    assert calls == ["only-model"]
+
+
+def test_resolve_tier_models(monkeypatch):
+    monkeypatch.delenv("LLM_MODEL_SMALL", raising=False)
+    assert resolve_tier_models("big", None) == {"small": "big", "large": "big"}
+    assert resolve_tier_models("big", "Hugging Face Inference API")["small"] == model_tiers.DEFAULT_HF_SMALL_MODEL
+
+    monkeypatch.setenv("LLM_MODEL_SMALL", "tiny")
+    assert resolve_tier_models("big", None) == {"small": "tiny", "large": "big"}
+    assert resolve_tier_models(None, None) == {"small": None, "large": None}
+
+    monkeypatch.setattr(model_tiers, "MODEL_TIERING", False)
+    assert resolve_tier_models("big", None) == {"small": "big", "large": "big"}
@@ -0,0 +1,82 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from context_builder import build_sheet_profile
+from schema_catalog import parse_design
+from schema_diff import diff_profiles, diff_schemas, diff_snapshots, load_snapshot
+
+DESIGN = Path(__file__).resolve().parent.parent / "database" / "database-design-ecommerce.sql"
+
+
+def test_design_against_an_edited_copy(tmp_path):
+    text = DESIGN.read_text(encoding="utf-8")
+    edited = text.replace("\tstripe_id varchar\n", "").replace("\tstock int\n", "\tstock decimal\n\tsku varchar\n")
+    (tmp_path / "v2.sql").write_text(edited, encoding="utf-8")
+
+    diff = diff_snapshots(load_snapshot(DESIGN), load_snapshot(tmp_path / "v2.sql"))
+
+    assert diff["tables_changed"] == {
+        "users": {"columns_removed": ["stripe_id"]},
+        "products": {"columns_added": ["sku"], "columns_changed": {"stock": {"type": ["int", "decimal"]}}},
+    }
+    assert diff["summary"] == {"tables_changed": 2}
+    regenerate = diff["regenerate"]["tables"]
+    # the changed tables plus those with foreign keys into them
+    assert {"users", "products", "user_addresses", "user_carts", "order_items"} <= set(regenerate)
+    assert "categories" not in regenerate
+
+
+def test_unchanged_design_has_an_empty_diff():
+    diff = diff_snapshots(load_snapshot(DESIGN), load_snapshot(DESIGN))
+
+    assert diff["summary"] == {}
+    assert "regenerate" not in diff
+
+
+def test_tables_keys_and_enums():
+    old = parse_design("""
+CREATE TABLE customers (id INT PRIMARY KEY, email VARCHAR(100));
+CREATE TABLE orders (
+    id INT PRIMARY KEY,
+    customer_id INT REFERENCES customers(id),
+    status VARCHAR(20) COMMENT 'pending, paid'
+);
+CREATE TABLE legacy (id INT PRIMARY KEY);
+""")
+    new = parse_design("""
+CREATE TABLE customers (id INT PRIMARY KEY, email VARCHAR(100) UNIQUE);
+CREATE TABLE accounts (id INT PRIMARY KEY);
+CREATE TABLE orders (
+    id INT PRIMARY KEY,
+    customer_id INT REFERENCES accounts(id),
+    status VARCHAR(20) COMMENT 'pending, paid, refunded'
+);
+""")
+
+    diff = diff_schemas(old, new)
+
+    assert diff["tables_added"] == ["accounts"]
+    assert diff["tables_removed"] == ["legacy"]
+    assert diff["tables_changed"]["customers"]["columns_changed"]["email"] == {"unique": [False, True]}
+    orders = diff["tables_changed"]["orders"]["columns_changed"]
+    assert orders["customer_id"] == {"ref": ["customers.id", "accounts.id"]}
+    assert orders["status"]["enum"] == [["pending", "paid"], ["pending", "paid", "refunded"]]
+
+
+def test_sheet_profile_drift():
+    rng = np.random.default_rng(5)
+    old = pd.DataFrame({"id": np.arange(1000), "amount": rng.normal(100, 10, 1000), "code": ["a"] * 1000})
+    new = pd.DataFrame({"id": np.arange(2000), "amount": rng.normal(200, 10, 2000), "code": np.arange(2000)})
+    new.loc[::2, "amount"] = np.nan
+
+    diff = diff_profiles([build_sheet_profile("v1.xlsx", "Orders", old)],
+                         [build_sheet_profile("v2.xlsx", "Orders", new),
+                          build_sheet_profile("v2.xlsx", "Refunds", old)])
+
+    assert diff["sheets_added"] == ["Refunds"]
+    orders = diff["sheets_changed"]["Orders"]
+    assert orders["dtypes"] == {"code": [str(old["code"].dtype), "int64"]}
+    assert orders["drift"]["num_rows"] == [1000, 2000]
+    assert set(orders["drift"]["columns"]["amount"]) >= {"null_rate", "mean"}
@@ -0,0 +1,102 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from context_builder import build_sheet_context, sheet_fingerprint
+from sheet_profile import SheetProfile
+
+
+def make_sheet(rows=50):
+    rng = np.random.default_rng(3)
+    status = rng.choice(["open", "closed", "pending"], rows).astype(object)
+    status[::7] = None
+    amount = rng.normal(100, 20, rows).round(2)
+    amount[::9] = np.nan
+    return pd.DataFrame({
+        "id": np.arange(1, rows + 1),
+        "status": status,
+        "amount": amount,
+        "created": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 90, rows), unit="D"),
+    })
+
+
+def legacy_context(file_name, sheet_name, df):
+    """The context dict the server built before SheetProfile."""
+    context = {
+        "file": file_name,
+        "sheet": sheet_name,
+        "columns": df.columns.tolist(),
+        "num_rows": int(len(df)),
+        "sample_data": df.head(5).to_dict(),
+        "data_types": df.dtypes.astype(str).to_dict(),
+        "null_counts": df.isnull().sum().to_dict(),
+        "unique_counts": {col: int(df[col].nunique()) for col in df.columns},
+        "fingerprint": sheet_fingerprint(df),
+    }
+    numeric_cols = df.select_dtypes(include=["number"]).columns
+    if len(numeric_cols) > 0:
+        context["statistics"] = df[numeric_cols].describe().to_dict()
+    return context
+
+
+def assert_same(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, float) and math.isnan(value):
+            assert math.isnan(actual[key]), key
+        elif isinstance(value, dict):
+            assert_same(actual[key], value)
+        else:
+            assert actual[key] == value, key
+
+
+def test_to_dict_matches_legacy_context():
+    df = make_sheet()
+
+    profile = SheetProfile.from_dataframe("book.xlsx", "Orders", df, sheet_fingerprint(df))
+
+    assert_same(profile.to_dict(), legacy_context("book.xlsx", "Orders", df))
+    assert_same(build_sheet_context("book.xlsx", "Orders", df), legacy_context("book.xlsx", "Orders", df))
+
+
+def test_mapping_view():
+    df = make_sheet()
+    profile = SheetProfile.from_dataframe("book.xlsx", "Orders", df, sheet_fingerprint(df))
+
+    assert profile["columns"] == ["id", "status", "amount", "created"]
+    assert profile.get("error") is None and "error" not in profile
+    assert set(profile["statistics"]) == {"id", "amount"}
+    with pytest.raises(KeyError):
+        profile["sampled_rows"]
+
+
+def test_bytes_round_trip():
+    df = make_sheet()
+    df.attrs["total_rows"] = 10_000
+    profile = SheetProfile.from_dataframe("book.xlsx", "Orders", df, sheet_fingerprint(df))
+
+    restored = SheetProfile.from_bytes(profile.to_bytes())
+
+    assert restored["num_rows"] == 10_000 and restored["sampled_rows"] == len(df)
+    assert_same(restored.to_dict(), {
+        **profile.to_dict(),
+        # the binary header is JSON: sample timestamps come back as strings
+        "sample_data": {col: {i: str(v) if isinstance(v, pd.Timestamp) else v for i, v in values.items()}
+                        for col, values in profile["sample_data"].items()},
+    })
+    np.testing.assert_array_equal(restored.stats, profile.stats)
+
+
+def test_text_only_sheet_has_no_statistics():
+    df = pd.DataFrame({"code": ["a", "b", None]})
+    profile = SheetProfile.from_dataframe("book.csv", "book", df, sheet_fingerprint(df))
+
+    assert "statistics" not in profile
+    assert SheetProfile.from_bytes(profile.to_bytes()).stats.shape == (0, 8)
+
+
+def test_from_bytes_rejects_other_data():
+    with pytest.raises(ValueError):
+        SheetProfile.from_bytes(b"JSON" + bytes(16))
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.bench_startup import ENTRY_POINTS, ROOT, run_importtime
+
+# Slower CI machines can relax the budget the same way as `bench_startup.py --budget-scale`
+BUDGET_SCALE = float(os.environ.get("STARTUP_BUDGET_SCALE", "1"))
+
+# Loaded by upload parsing, token counting and the warm-up hook, never by `import server`
+LAZY_MODULES = ("pandas", "openpyxl", "tiktoken", "numpy")
+
+
+@pytest.fixture
+def provider_free_env(monkeypatch):
+    """Drop provider settings (e.g. the session mock LLM's) so they cannot change what the import pulls in."""
+    for key in list(os.environ):
+        if key.startswith(("LLM_", "AZURE_OPENAI_", "HF_")):
+            monkeypatch.delenv(key)
+    monkeypatch.setenv("PYTHONDONTWRITEBYTECODE", "1")
+
+
+def test_server_import_within_budget(provider_free_env):
+    argv, budget_ms, _ = ENTRY_POINTS["server"]
+    total_ms, breakdown, _, _, returncode = run_importtime(argv)
+
+    assert returncode == 0
+    heaviest = ", ".join(f"{module} {us / 1000:.0f} ms" for module, us in sorted(breakdown, key=lambda item: -item[1])[:5])
+    assert total_ms <= budget_ms * BUDGET_SCALE, f"import server took {total_ms:.0f} ms; heaviest: {heaviest}"
+
+
+def test_server_import_is_lazy(provider_free_env):
+    proc = subprocess.run(
+        [sys.executable, "-c", "import json, sys, server; print(json.dumps(sorted(sys.modules)))"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+
+    assert proc.returncode == 0, proc.stderr
+    loaded = {name.split(".")[0] for name in json.loads(proc.stdout.strip().splitlines()[-1])}
+    assert not loaded & set(LAZY_MODULES), f"import server loaded {sorted(loaded & set(LAZY_MODULES))}"
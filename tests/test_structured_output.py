@@ -0,0 +1,95 @@
+import pytest
+
+import structured_output
+from structured_output import CHAT_SQL_SCHEMA, create_structured_completion, extract_fields, extract_json
+
+
+@pytest.mark.parametrize("text", [
+    '{"sqlQuery": "SELECT 1", "description": "one"}',
+    '```json\n{"sqlQuery": "SELECT 1", "description": "one"}\n```',
+    '```\n{"sqlQuery": "SELECT 1", "description": "one"}\n```',
+    'Here is the query you asked for:\n{"sqlQuery": "SELECT 1", "description": "one"}\nHope that helps.',
+    'Sure!\n```json\n{"sqlQuery": "SELECT 1", "description": "one"}',
+])
+def test_extract_json(text):
+    assert extract_json(text) == {"sqlQuery": "SELECT 1", "description": "one"}
+
+
+def test_extract_json_without_json():
+    assert extract_json("") is None
+    assert extract_json("no json here {not json either") is None
+    assert extract_json('answers: [{"index": 1}]') == [{"index": 1}]
+
+
+def test_extract_fields_from_truncated_output():
+    text = '{"sqlQuery": "SELECT name FROM \\"Orders\\"", "description": "the order na'
+
+    assert extract_fields(text, ["sqlQuery", "description"]) == {
+        "sqlQuery": 'SELECT name FROM "Orders"', "description": "the order na",
+    }
+    assert extract_fields("I cannot answer that.", ["sqlQuery"]) == {}
+
+
+class RejectedFormat(Exception):
+    status_code = 400
+
+
+class FakeCompletions:
+    def __init__(self, accepted):
+        self.accepted = accepted
+        self.formats = []
+
+    def create(self, model, messages, response_format=None, **kwargs):
+        mode = response_format and response_format["type"]
+        self.formats.append(mode)
+        if mode not in self.accepted:
+            raise RejectedFormat(f"response_format {mode} is not supported")
+        return {"model": model, "mode": mode}
+
+
+class FakeClient:
+    def __init__(self, accepted):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = FakeCompletions(accepted)
+
+
+@pytest.fixture(autouse=True)
+def fresh_modes(monkeypatch):
+    monkeypatch.setattr(structured_output, "_MODE_BY_MODEL", {})
+
+
+@pytest.mark.parametrize("accepted, tried", [
+    ({"json_schema", "json_object", None}, ["json_schema"]),
+    ({"json_object", None}, ["json_schema", "json_object"]),
+    ({None}, ["json_schema", "json_object", None]),
+])
+def test_response_format_downgrades(accepted, tried):
+    client = FakeClient(accepted)
+
+    completion = create_structured_completion(client, "m", [], "chat_sql", CHAT_SQL_SCHEMA)
+
+    assert client.chat.completions.formats == tried
+    assert completion["mode"] == tried[-1]
+
+
+def test_accepted_mode_is_remembered_per_model():
+    client = FakeClient({None})
+    create_structured_completion(client, "m", [], "chat_sql", CHAT_SQL_SCHEMA)
+    client.chat.completions.formats.clear()
+
+    create_structured_completion(client, "m", [], "chat_sql", CHAT_SQL_SCHEMA)
+    create_structured_completion(client, "other", [], "chat_sql", CHAT_SQL_SCHEMA)
+
+    assert client.chat.completions.formats == [None, "json_schema", "json_object", None]
+
+
+def test_other_errors_are_not_downgraded():
+    class Failing:
+        def create(self, **kwargs):
+            raise RuntimeError("rate limited")
+
+    client = FakeClient(set())
+    client.chat.completions = Failing()
+
+    with pytest.raises(RuntimeError, match="rate limited"):
+        create_structured_completion(client, "m", [], "chat_sql", CHAT_SQL_SCHEMA)
@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from schema_catalog import load_design
+from synthetic_data import generate_dataset, generation_order
+
+DESIGN = Path(__file__).resolve().parent.parent / "database" / "database-design-ecommerce.sql"
+ROWS = {"*": 120, "categories": 40, "order_items": 300}
+
+
+@pytest.fixture(scope="module")
+def schema():
+    return load_design(DESIGN)
+
+
+@pytest.fixture(scope="module")
+def dataset(schema, tmp_path_factory):
+    """{table: DataFrame read back as strings}, written in chunks smaller than a table."""
+    out = tmp_path_factory.mktemp("synthetic")
+    results = generate_dataset(schema, out, ROWS, seed=3, workers=1, chunk_rows=50)
+    return {name: pd.read_csv(result["path"], dtype=str, keep_default_na=False, na_values=[""])
+            for name, result in results.items()}
+
+
+def test_row_counts(schema, dataset):
+    assert set(dataset) == set(schema)
+    for name, df in dataset.items():
+        assert len(df) == ROWS.get(name, ROWS["*"]), name
+        assert list(df.columns) == list(schema[name].columns)
+
+
+def test_primary_keys_are_unique(schema, dataset):
+    for name, table in schema.items():
+        keys = [column for column, definition in table.columns.items() if definition.pk]
+        assert keys, name
+        assert not dataset[name][keys].duplicated().any(), name
+        assert dataset[name][keys].notna().all().all(), name
+
+
+def test_foreign_keys_resolve_to_parent_rows(schema, dataset):
+    references = 0
+    for name, table in schema.items():
+        for column, definition in table.columns.items():
+            if not definition.ref:
+                continue
+            parent, _, parent_column = definition.ref.partition(".")
+            values = dataset[name][column].dropna()
+            if parent not in schema:
+                # e.g. reviews.customer_id > customers.id, a table the design does not define
+                assert values.empty, f"{name}.{column}"
+                continue
+            assert len(values), f"{name}.{column}"
+            missing = set(values) - set(dataset[parent][parent_column])
+            assert not missing, f"{name}.{column} -> {definition.ref}: {sorted(missing)[:5]}"
+            references += 1
+    assert references >= 10
+
+
+def test_self_reference_points_at_an_earlier_row(schema, dataset):
+    assert schema["categories"].columns["parent_id"].ref == "categories.id"
+    categories = dataset["categories"].dropna(subset=["parent_id"])
+
+    assert len(categories)
+    assert (categories["parent_id"].astype(int) < categories["id"].astype(int)).all()
+
+
+def test_parents_are_generated_first(schema):
+    level_of = {name: i for i, level in enumerate(generation_order(schema)) for name in level}
+    for name, table in schema.items():
+        for definition in table.columns.values():
+            parent = definition.ref.partition(".")[0] if definition.ref else None
+            if parent in level_of and parent != name:
+                assert level_of[parent] < level_of[name], f"{parent} before {name}"
+
+
+def test_generation_is_deterministic(schema, dataset, tmp_path):
+    results = generate_dataset(schema, tmp_path, ROWS, seed=3, workers=1, chunk_rows=50)
+    for name in ("orders", "categories"):
+        again = pd.read_csv(results[name]["path"], dtype=str, keep_default_na=False, na_values=[""])
+        pd.testing.assert_frame_equal(again, dataset[name])
+
+
+def test_unknown_format(schema, tmp_path):
+    with pytest.raises(ValueError):
+        generate_dataset(schema, tmp_path, 10, fmt="xlsx")
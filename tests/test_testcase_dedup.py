@@ -0,0 +1,83 @@
+import numpy as np
+
+from testcase_dedup import (MinHasher, band_keys, lsh_params, normalise, shingles, signature_bytes,
+                            signature_from_bytes, similarity)
+from testcase_store import TestCaseStore
+
+ORIGINAL = "Insert an order whose customer_id does not exist in customers; the insert is rejected"
+REWORDED = "TC-014: Insert an order whose customer_id does not exist in the customers table; the insert is rejected"
+UNRELATED = "Leave the email column of researchers empty; the row is rejected because email is mandatory"
+
+REPORT = """# Test Analysis
+
+## 2. TEST CASES
+| ID | Description | Expected Result |
+|----|-------------|-----------------|
+| TC-001 | Insert an order whose customer_id does not exist in customers | Insert is rejected with a foreign key error |
+| TC-002 | Insert an order whose customer_id does not exist in the customers table | Insert is rejected with a foreign key error |
+| TC-003 | Leave the email column of researchers empty | Row rejected because email is mandatory |
+
+## 3. SQL VALIDATION QUERIES
+```sql
+SELECT id, COUNT(*) FROM orders GROUP BY id HAVING COUNT(*) > 1;
+SELECT status, COUNT(*) FROM orders WHERE status = 'open' GROUP BY status;
+SELECT status, COUNT(*) FROM orders WHERE status = 'closed' GROUP BY status;
+```
+"""
+
+
+def test_normalise_drops_ids_and_generalises_literals():
+    assert normalise("TC-001 amount > 250") == normalise("TC-002 amount > 10")
+    assert normalise("WHERE status = 'open'", "sql") == normalise("WHERE status = 'closed'", "sql")
+    assert normalise("WHERE status = 'open'") != normalise("WHERE status = 'closed'")
+
+
+def test_signatures_estimate_similarity():
+    hasher = MinHasher()
+    signatures = hasher.signatures([shingles(text) for text in (ORIGINAL, REWORDED, UNRELATED)])
+
+    scores = similarity(signatures[0], signatures)
+
+    assert scores[0] == 1.0
+    assert scores[1] >= 0.7
+    assert scores[2] < 0.3
+
+
+def test_signatures_are_stable_and_serialisable():
+    shingle_sets = [shingles(ORIGINAL), shingles(UNRELATED), []]
+    signatures = MinHasher(seed=1).signatures(shingle_sets)
+
+    np.testing.assert_array_equal(signatures, MinHasher(seed=1).signatures(shingle_sets))
+    np.testing.assert_array_equal(signature_from_bytes(signature_bytes(s) for s in signatures), signatures)
+    assert (signatures[2] == np.iinfo(np.uint32).max).all()
+
+
+def test_lsh_buckets_near_duplicates_together():
+    bands, rows = lsh_params(0.7)
+    assert bands * rows <= 128
+    hasher = MinHasher()
+    original, reworded, unrelated = (set(band_keys(hasher.signature(shingles(text)), bands, rows))
+                                     for text in (ORIGINAL, REWORDED, UNRELATED))
+
+    assert original & reworded
+    assert not original & unrelated
+
+
+def test_store_collapses_near_duplicates(tmp_path):
+    store = TestCaseStore(tmp_path / "testcases.sqlite3")
+
+    _, added, duplicates = store.add_analysis(REPORT)
+
+    assert (added, duplicates) == (6, 2)
+    results = {row["ref"]: row for row in store.search()}
+    assert set(results) == {"TC-001", "TC-003", "SQL-001", "SQL-002"}
+    assert results["TC-001"]["duplicates"] == 1 and results["SQL-002"]["duplicates"] == 1
+    assert len(store.search(include_duplicates=True)) == 6
+    assert store.rebuild_dedup_index() == 2
+
+
+def test_store_dedup_disabled(tmp_path):
+    store = TestCaseStore(tmp_path / "testcases.sqlite3", dedup_threshold=0)
+
+    assert store.add_analysis(REPORT)[1:] == (6, 0)
+    assert len(store.search()) == 6
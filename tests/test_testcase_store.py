@@ -0,0 +1,95 @@
+from pathlib import Path
+
+import pytest
+
+from testcase_store import TestCaseStore, body_fields, parse_analysis
+
+REPORT = (Path(__file__).parent / "data" / "per_sheet_report.md").read_text(encoding="utf-8")
+
+
+@pytest.fixture
+def records():
+    return {record.ref: record for record in parse_analysis(REPORT)}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TestCaseStore(tmp_path / "testcases.sqlite3", dedup_threshold=0)
+    store.add_analysis(REPORT, source_hash="orders-v1")
+    return store
+
+
+def test_numbered_list_scenarios(records):
+    first, second = records["SC-001"], records["SC-002"]
+
+    assert (first.kind, first.title, first.priority) == ("scenario", "Mandatory fields", "High")
+    assert "customer and an order date" in first.body
+    assert (second.title, second.priority) == ("Status values", None)
+
+
+def test_subheading_test_cases(records):
+    case = records["TC-001"]
+
+    assert (case.kind, case.title, case.priority) == ("test_case", "Reject orders without a customer", "P1")
+    assert body_fields(case.body)["expected"] == "insert fails with a NOT NULL error"
+    assert records["TC-002"].priority == "Low"
+
+
+def test_table_test_cases(records):
+    case = records["TC-101"]
+
+    assert (case.kind, case.title, case.priority) == ("test_case", "Unique email", "Critical")
+    assert body_fields(case.body)["description"] == "Two customers with the same email are rejected"
+
+
+def test_fenced_sql_with_several_statements(records):
+    sql = [record for record in records.values() if record.kind == "sql"]
+
+    assert [record.ref for record in sql] == ["SQL-001", "SQL-002", "SQL-003"]
+    # a label before a one-statement block becomes its title
+    assert sql[0].title == "Null customers"
+    assert sql[0].body == "SELECT COUNT(*) FROM orders WHERE customer_id IS NULL;"
+    assert sql[2].body.startswith("SELECT status FROM orders WHERE status NOT IN")
+
+
+def test_per_sheet_headings_attribute_records(records):
+    assert (records["TC-001"].file, records["TC-001"].sheet) == ("Orders.xlsx", "Orders")
+    assert (records["TC-101"].file, records["TC-101"].sheet) == ("Customers.xlsx", "Customers")
+
+
+def test_records_attributed_by_mentioned_sheet():
+    report = "## 2. TEST CASES\n### TC-001: Invoices totals\n- Objective: totals on the Invoices sheet add up\n"
+    context = [{"file": "book.xlsx", "sheet": "Invoices"}, {"file": "book.xlsx", "sheet": "Orders"}]
+
+    (record,) = parse_analysis(report, context)
+
+    assert (record.file, record.sheet) == ("book.xlsx", "Invoices")
+
+
+def test_re_adding_a_report_is_a_no_op(store):
+    run_id = store.search(limit=1)[0]["run_id"]
+
+    assert store.add_analysis(REPORT, source_hash="orders-v1") == (run_id, 0, 0)
+    assert store.stats()["runs"] == 1
+    # the same report for another source is a new run
+    assert store.add_analysis(REPORT, source_hash="orders-v2")[1] == 9
+
+
+def test_prefix_search_and_filters(store):
+    assert [row["ref"] for row in store.search("uniq")] == ["TC-101"]
+    assert {row["ref"] for row in store.search("cust", kind="sql")} == {"SQL-001"}
+    assert {row["ref"] for row in store.search(sheet="customers")} == {"TC-101", "TC-102"}
+    assert [row["ref"] for row in store.search(priority="P1")] == ["TC-001"]
+    assert "[" in store.search("email")[0]["snippet"]
+
+
+@pytest.mark.parametrize("query", ['"unbalanced', "NEAR(", "email AND", "OR", '*', "col:umn", "- ( )"])
+def test_hostile_queries_do_not_raise(store, query):
+    results = store.search(query)
+
+    assert isinstance(results, list)
+
+
+def test_hostile_query_terms_still_match(store):
+    assert [row["ref"] for row in store.search('"unique email')] == ["TC-101"]
+    assert store.search("NEAR(") == []
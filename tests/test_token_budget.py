@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+
+import token_budget
+from context_builder import build_sheet_profile
+from prompt_builder import build_messages, prepare_messages
+from token_budget import (OUTPUT_BUDGETS, TOKEN_SAFETY_MARGIN, PromptTooLarge, cached_count, count_tokens,
+                          message_tokens, output_budget, plan_completion)
+
+
+def test_plan_fits_the_window():
+    plan = plan_completion("chat_sql", 1000, window=8000)
+
+    assert plan.max_tokens == OUTPUT_BUDGETS["chat_sql"][1]
+    assert (plan.prompt_tokens, plan.window, plan.trimmed) == (1000, 8000, False)
+
+
+def test_plan_shrinks_the_answer_to_the_space_left():
+    minimum, cap = OUTPUT_BUDGETS["analysis"]
+    prompt = 8000 - TOKEN_SAFETY_MARGIN - minimum - 10
+
+    assert plan_completion("analysis", prompt, window=8000).max_tokens == minimum + 10
+
+
+def test_prompt_too_large():
+    minimum, _ = OUTPUT_BUDGETS["analysis"]
+    prompt = 8000 - TOKEN_SAFETY_MARGIN - minimum + 1
+
+    with pytest.raises(PromptTooLarge) as raised:
+        plan_completion("analysis", prompt, window=8000)
+
+    assert (raised.value.task, raised.value.prompt_tokens, raised.value.window) == ("analysis", prompt, 8000)
+    assert isinstance(raised.value, ValueError)
+    assert "8000-token context window" in str(raised.value)
+
+
+def test_output_budget_scales_with_items():
+    minimum, cap = OUTPUT_BUDGETS["chat_sql_batch"]
+
+    assert output_budget("chat_sql_batch", 3) == (minimum * 3, cap * 3)
+    assert output_budget("chat_sql_batch", 50)[1] == token_budget._MAX_OUTPUT_TOKENS
+    assert output_budget("analysis", 1)[1] < output_budget("analysis", 3)[1] == OUTPUT_BUDGETS["analysis"][1]
+    assert output_budget("unknown") == OUTPUT_BUDGETS["followup"]
+
+
+def test_token_counts():
+    assert count_tokens("") == 0
+    assert 0 < count_tokens("SELECT id FROM orders") < count_tokens("SELECT id FROM orders WHERE status = 'paid'")
+    messages = [{"role": "system", "content": "You are a tester."}, {"role": "user", "content": "Hello"}]
+    assert message_tokens(messages) == message_tokens(messages, counts=[None, count_tokens("Hello")])
+    assert message_tokens(messages, counts=[1000]) > message_tokens(messages)
+
+
+def test_cached_count_is_keyed():
+    assert cached_count("test-key-1", "one two three") == count_tokens("one two three")
+    # a known key is not counted again
+    assert cached_count("test-key-1", "different text entirely, and longer") == count_tokens("one two three")
+
+
+def test_prepare_messages_falls_back_to_the_compact_context(monkeypatch):
+    df = pd.DataFrame({f"column_{i}": [f"a fairly long sample value {i} {j}" for j in range(10)] for i in range(30)})
+    context = [build_sheet_profile("wide.xlsx", "Sheet1", df)]
+    _, full = prepare_messages("chat_sql", context, "count rows")
+    assert not full.trimmed
+    monkeypatch.setattr(token_budget, "MODEL_CONTEXT_WINDOW", full.prompt_tokens + TOKEN_SAFETY_MARGIN + 64)
+
+    messages, plan = prepare_messages("chat_sql", context, "count rows")
+
+    assert plan.trimmed and plan.prompt_tokens < full.prompt_tokens
+    assert messages == build_messages("chat_sql", context, "count rows", compact=True)
+
+    monkeypatch.setattr(token_budget, "MODEL_CONTEXT_WINDOW", 200)
+    with pytest.raises(PromptTooLarge):
+        prepare_messages("chat_sql", context, "count rows")
@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+from upload_handling import _PART_HEADER_SLACK, UploadLimitMiddleware, _PartSizes, open_upload
+
+MAX_FILE_BYTES = 2048
+MAX_REQUEST_BYTES = 256 * 1024
+# Smallest file the middleware rejects: the limit plus its allowance for part headers
+OVERSIZE = MAX_FILE_BYTES + _PART_HEADER_SLACK + 1
+BOUNDARY = b"test-boundary"
+
+
+def csv_bytes(rows):
+    return ("id,name\n" + "".join(f"{i},name {i}\n" for i in range(rows))).encode()
+
+
+def multipart(*files):
+    body = b"".join(
+        b"--" + BOUNDARY + b"\r\nContent-Disposition: form-data; name=\"files\"; filename=\"" + name.encode()
+        + b"\"\r\nContent-Type: text/csv\r\n\r\n" + content + b"\r\n"
+        for name, content in files
+    )
+    return body + b"--" + BOUNDARY + b"--\r\n"
+
+
+@pytest.fixture
+def limited_client(server):
+    """The server app behind a middleware with small limits."""
+    server.DATA_CONTEXT.clear()
+    server._UPLOAD_CACHE.clear()
+    app = UploadLimitMiddleware(server.app, max_bytes=MAX_REQUEST_BYTES, max_file_bytes=MAX_FILE_BYTES)
+    yield TestClient(app)
+    server.DATA_CONTEXT.clear()
+
+
+def test_normal_upload_passes(limited_client, server):
+    files = [("files", ("small.csv", csv_bytes(20), "text/csv")), ("files", ("other.csv", csv_bytes(30), "text/csv"))]
+
+    response = limited_client.post("/api/context/upload", files=files)
+
+    assert response.status_code == 200, response.text
+    assert [ctx["num_rows"] for ctx in server.DATA_CONTEXT] == [20, 30]
+
+
+def test_oversize_file_gets_413(limited_client, server):
+    files = [("files", ("small.csv", csv_bytes(20), "text/csv")), ("files", ("big.csv", csv_bytes(OVERSIZE // 10), "text/csv"))]
+
+    response = limited_client.post("/api/context/upload", files=files)
+
+    assert response.status_code == 413
+    assert "per-file limit" in response.json()["detail"]
+    assert server.DATA_CONTEXT == []
+
+
+def test_oversize_request_gets_413(limited_client):
+    response = limited_client.post("/api/context/upload", headers={"content-type": "application/octet-stream"},
+                                   content=bytes(MAX_REQUEST_BYTES + 1))
+
+    assert response.status_code == 413
+
+
+async def _drive(body_chunks, headers):
+    """Run the middleware over a streamed body; returns (sent messages, body messages read, app reached the end)."""
+    chunks = list(body_chunks)
+    read = 0
+    reached_end = False
+
+    async def receive():
+        nonlocal read
+        read += 1
+        return {"type": "http.request", "body": chunks[read - 1], "more_body": read < len(chunks)}
+
+    async def app(scope, receive, send):
+        nonlocal reached_end
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            if not message.get("more_body"):
+                break
+        reached_end = True
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/", "headers": headers}
+    await UploadLimitMiddleware(app, max_bytes=MAX_REQUEST_BYTES, max_file_bytes=MAX_FILE_BYTES)(scope, receive, send)
+    return sent, read, reached_end
+
+
+def test_chunked_body_is_cut_off_early():
+    chunks = [bytes(8192)] * 64
+
+    sent, read, reached_end = asyncio.run(_drive(chunks, [(b"transfer-encoding", b"chunked")]))
+
+    assert sent[0]["status"] == 413
+    assert read == MAX_REQUEST_BYTES // 8192 + 1
+    assert not reached_end
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, 4096, 1 << 20])
+def test_oversize_part_is_cut_off_at_any_chunk_size(chunk_size):
+    body = multipart(("a.csv", csv_bytes(10)), ("big.csv", bytes(OVERSIZE)), ("c.csv", csv_bytes(10)))
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    headers = [(b"content-type", b"multipart/form-data; boundary=" + BOUNDARY)]
+
+    sent, read, reached_end = asyncio.run(_drive(chunks, headers))
+
+    assert sent[0]["status"] == 413
+    assert not reached_end
+    # cut off no later than the chunk holding the end of the big part
+    big_end = body.index(b"\r\n--" + BOUNDARY, body.index(b"big.csv"))
+    assert read <= big_end // chunk_size + 1
+
+
+def test_part_sizes_under_the_limit():
+    body = multipart(*((f"{i}.csv", csv_bytes(40)) for i in range(3)))
+    for chunk_size in (1, 13, len(body)):
+        parts = _PartSizes(BOUNDARY)
+        largest = max(parts.feed(body[i:i + chunk_size]) for i in range(0, len(body), chunk_size))
+        assert len(csv_bytes(40)) < largest < len(csv_bytes(40)) + 200
+
+
+def test_open_upload_hashes_in_memory_and_on_disk(tmp_path):
+    content = csv_bytes(1000)
+    with open(tmp_path / "upload.csv", "w+b") as on_disk:
+        on_disk.write(content)
+        for source in (io.BytesIO(content), on_disk):
+            with open_upload(source) as (buffer, digest):
+                assert digest == hashlib.sha256(content).hexdigest()
+                assert buffer.read() == content
@@ -0,0 +1,179 @@
+"""
+Pre-flight token budgeting for LLM calls.
+
+Counts prompt tokens locally before a call (tiktoken when installed, a conservative
+pre-tokenizer heuristic otherwise) and turns the count into a `TokenPlan`:
+
+- prompts that cannot fit the model's context window together with the task's minimum
+  answer raise `PromptTooLarge` immediately, instead of failing at the provider after
+  upload and queueing,
+- `max_tokens` is sized per task type (a chat-sql JSON object needs a few hundred tokens,
+  a full analysis a few thousand) and capped by what is left of the window.
+
+The data-context part of a prompt is identical across calls on the same upload, so its
+count is cached by key (the context fingerprint); only the short question is counted
+per call. `prompt_builder.prepare_messages` wires this up for the prompt layout in
+`prompt_builder`.
+"""
+
+import logging
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from importlib.util import find_spec
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+HAVE_TIKTOKEN = find_spec("tiktoken") is not None
+TOKEN_ENCODING = os.environ.get("TOKEN_ENCODING", "o200k_base")
+MODEL_CONTEXT_WINDOW = int(os.environ.get("MODEL_CONTEXT_WINDOW", "128000"))
+# Tokens kept free on top of the answer budget to absorb estimation error
+TOKEN_SAFETY_MARGIN = int(os.environ.get("TOKEN_SAFETY_MARGIN", "256"))
+# The heuristic over-counts by design; this scales it further when tiktoken is missing
+HEURISTIC_MARGIN = 1.1
+
+# Per-message framing tokens (role, separators) and the assistant reply primer
+_MESSAGE_OVERHEAD = 4
+_REPLY_OVERHEAD = 3
+
+# task -> (minimum useful answer, answer cap) in tokens; per item for batched/per-sheet tasks
+OUTPUT_BUDGETS: Dict[str, Tuple[int, int]] = {
+    "analysis": (1024, 3000),
+    "analysis_section": (256, 1200),
+    "followup": (256, 1000),
+    "chat_sql": (128, 400),
+    "chat_sql_batch": (128, 400),
+}
+# Upper bound for tasks whose cap scales with the number of items
+_MAX_OUTPUT_TOKENS = 4000
+
+_PIECE_RE = re.compile(r" ?[A-Za-z]+| ?\d{1,3}| ?[^\sA-Za-z\d]+|\s+")
+
+_encoding: Any = None
+_encoding_lock = threading.Lock()
+
+_CACHED_COUNTS: "OrderedDict[str, int]" = OrderedDict()
+_CACHED_COUNTS_MAX = 64
+_cached_counts_lock = threading.Lock()
+
+
+class PromptTooLarge(ValueError):
+    """Raised when a prompt plus the task's minimum answer exceeds the context window."""
+
+    def __init__(self, task: str, prompt_tokens: int, window: int, min_output: int):
+        self.task = task
+        self.prompt_tokens = prompt_tokens
+        self.window = window
+        super().__init__(
+            f"{task} prompt is ~{prompt_tokens} tokens; with {min_output} tokens reserved for the answer "
+            f"it exceeds the {window}-token context window"
+        )
+
+
+@dataclass(frozen=True)
+class TokenPlan:
+    __slots__ = ("task", "prompt_tokens", "max_tokens", "window", "exact", "trimmed")
+
+    task: str
+    prompt_tokens: int
+    max_tokens: int
+    window: int
+    # True when counted with tiktoken, False for the heuristic estimate
+    exact: bool
+    # True when the prompt only fits after dropping optional context
+    trimmed: bool
+
+
+def _get_encoding() -> Any:
+    """The tiktoken encoding, or None when tiktoken or its encoding files are unavailable."""
+    global _encoding, HAVE_TIKTOKEN
+    if not HAVE_TIKTOKEN:
+        return None
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+
+                _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+            except Exception:
+                logger.warning("tiktoken encoding %s unavailable; using the heuristic estimate", TOKEN_ENCODING)
+                HAVE_TIKTOKEN = False
+                return None
+        return _encoding
+
+
+def _heuristic_tokens(text: str) -> int:
+    tokens = 0
+    for piece in _PIECE_RE.findall(text):
+        stripped = piece.strip()
+        if not stripped:
+            tokens += 1
+        elif stripped[0].isalpha():
+            tokens += math.ceil(len(stripped) / 6)
+        elif stripped[0].isdigit():
+            tokens += 1
+        else:
+            tokens += math.ceil(len(stripped) / 2)
+    return math.ceil(tokens * HEURISTIC_MARGIN)
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return _heuristic_tokens(text)
+
+
+def cached_count(key: str, text: str) -> int:
+    """count_tokens(text), remembered under `key` (e.g. a context fingerprint)."""
+    with _cached_counts_lock:
+        if key in _CACHED_COUNTS:
+            _CACHED_COUNTS.move_to_end(key)
+            return _CACHED_COUNTS[key]
+    tokens = count_tokens(text)
+    with _cached_counts_lock:
+        _CACHED_COUNTS[key] = tokens
+        if len(_CACHED_COUNTS) > _CACHED_COUNTS_MAX:
+            _CACHED_COUNTS.popitem(last=False)
+    return tokens
+
+
+def message_tokens(messages: List[Dict[str, str]], counts: Optional[Sequence[Optional[int]]] = None) -> int:
+    """Prompt tokens of a chat request; `counts` supplies already known per-message counts."""
+    total = _REPLY_OVERHEAD
+    for index, message in enumerate(messages):
+        known = counts[index] if counts is not None and index < len(counts) else None
+        total += _MESSAGE_OVERHEAD + (known if known is not None else count_tokens(message.get("content") or ""))
+    return total
+
+
+def output_budget(task: str, items: int = 1) -> Tuple[int, int]:
+    """(minimum, cap) answer tokens for `task` covering `items` answers or sheets."""
+    minimum, cap = OUTPUT_BUDGETS.get(task, OUTPUT_BUDGETS["followup"])
+    items = max(1, items)
+    if task == "analysis":
+        # One sheet needs a shorter report than many; the cap is reached from three sheets up
+        return minimum, min(cap, minimum + (cap - minimum) * items // 3)
+    return minimum * min(items, 4), min(cap * items, _MAX_OUTPUT_TOKENS)
+
+
+def plan_completion(task: str, prompt_tokens: int, items: int = 1, window: Optional[int] = None,
+                    trimmed: bool = False) -> TokenPlan:
+    """Size max_tokens from the window left after the prompt; PromptTooLarge if the minimum does not fit."""
+    window = window or MODEL_CONTEXT_WINDOW
+    minimum, cap = output_budget(task, items)
+    available = window - prompt_tokens - TOKEN_SAFETY_MARGIN
+    if available < minimum:
+        raise PromptTooLarge(task, prompt_tokens, window, minimum)
+    return TokenPlan(
+        task=task,
+        prompt_tokens=prompt_tokens,
+        max_tokens=min(cap, available),
+        window=window,
+        exact=HAVE_TIKTOKEN,
+        trimmed=trimmed,
+    )
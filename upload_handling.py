@@ -0,0 +1,256 @@
+"""
+Upload handling without extra copies.
+
+FastAPI/Starlette spool each uploaded file to a SpooledTemporaryFile (in memory while
+small, on disk once it grows). Instead of `io.BytesIO(uf.file.read())`, which duplicates
+the whole upload in memory, `open_upload` hands the parser a read-only memory map of the
+spooled file when it is on disk, or the in-memory buffer itself when it is not, and
+computes the SHA-256 over that same view for cache lookups. Hashing is a second pass over
+the spooled file rather than part of the streaming receive: the middleware below only sees
+raw multipart bytes, and the pass reads the mapped pages without copying them.
+
+Size limits are enforced while the body streams in, before anything is spooled past them:
+`UploadLimitMiddleware` answers 413 as soon as the request body (by Content-Length, or by
+counting the bytes of a chunked body) passes the per-request limit, or one part of a
+multipart body passes the per-file limit. `check_file_size` repeats the per-file check with
+the file's name for uploads that did not come through the middleware.
+"""
+
+import hashlib
+import io
+import json
+import mmap
+import os
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Iterator, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MAX_UPLOAD_FILE_BYTES = int(os.environ.get("MAX_UPLOAD_FILE_BYTES", str(100 * 1024 * 1024)))
+MAX_UPLOAD_REQUEST_BYTES = int(os.environ.get("MAX_UPLOAD_REQUEST_BYTES", str(250 * 1024 * 1024)))
+
+_HASH_CHUNK = 1024 * 1024
+# Allowance for the headers of a multipart part on top of the per-file limit
+_PART_HEADER_SLACK = 16 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an uploaded file exceeds MAX_UPLOAD_FILE_BYTES."""
+
+
+def upload_size(fileobj: BinaryIO) -> int:
+    position = fileobj.tell()
+    fileobj.seek(0, io.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(position)
+    return size
+
+
+def check_file_size(fileobj: BinaryIO, name: str, limit: int = MAX_UPLOAD_FILE_BYTES) -> int:
+    size = upload_size(fileobj)
+    if size > limit:
+        raise UploadTooLarge(f"{name}: {size} bytes exceeds the per-file limit of {limit} bytes")
+    return size
+
+
+def _on_disk(fileobj: Any) -> bool:
+    # SpooledTemporaryFile sets _rolled once it has moved to a real temp file
+    if hasattr(fileobj, "_rolled"):
+        return bool(fileobj._rolled)
+    try:
+        fileobj.fileno()
+        return True
+    except (AttributeError, OSError):
+        return False
+
+
+class _MappedReader(io.RawIOBase):
+    """Seekable read-only file object over an mmap (mmap itself lacks seekable() before 3.13)."""
+
+    def __init__(self, mapped: mmap.mmap):
+        self._mapped = mapped
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._mapped)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def readinto(self, buffer: Any) -> int:
+        chunk = self._mapped[self._pos:self._pos + len(buffer)]
+        buffer[:len(chunk)] = chunk
+        self._pos += len(chunk)
+        return len(chunk)
+
+
+@contextmanager
+def open_upload(fileobj: BinaryIO) -> Iterator[Tuple[BinaryIO, str]]:
+    """Yield (seekable read-only buffer, sha256 hex) for a spooled upload without copying it.
+
+    The hash is computed here, in one pass over the already spooled file, not while it streams in.
+    """
+    fileobj.seek(0)
+    mapped: Optional[mmap.mmap] = None
+    try:
+        if _on_disk(fileobj) and upload_size(fileobj) > 0:
+            mapped = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mapped)
+            digest = hashlib.sha256()
+            for start in range(0, len(view), _HASH_CHUNK):
+                digest.update(view[start:start + _HASH_CHUNK])
+            view.release()
+            yield _MappedReader(mapped), digest.hexdigest()
+        else:
+            buffer = getattr(fileobj, "_file", fileobj)
+            digest = hashlib.sha256()
+            if isinstance(buffer, io.BytesIO):
+                digest.update(buffer.getbuffer())
+            else:
+                for chunk in iter(lambda: buffer.read(_HASH_CHUNK), b""):
+                    digest.update(chunk)
+            buffer.seek(0)
+            yield buffer, digest.hexdigest()
+    finally:
+        if mapped is not None:
+            mapped.close()
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process over its lifetime in MB (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024), 1)
+
+
+def current_rss_mb() -> Optional[float]:
+    """Current resident set size of this process in MB (None where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+class _PartSizes:
+    """Part sizes of a streamed multipart body, found by scanning for the boundary delimiter."""
+
+    def __init__(self, boundary: bytes):
+        self.delimiter = b"\r\n--" + boundary
+        # The first delimiter is not preceded by CRLF; pretend it is
+        self.tail = b"\r\n"
+        # Bytes of the part still open at the end of the last chunk
+        self.part = 0
+
+    def feed(self, chunk: bytes) -> int:
+        """Count a chunk; returns the largest part size seen in it (parts it closes included)."""
+        data = self.tail + chunk
+        largest, start = 0, 0
+        position = data.find(self.delimiter)
+        while position >= 0:
+            # The part open before this delimiter; the tail was counted with the previous chunk
+            size = self.part + max(position - len(self.tail), 0) if start == 0 else position - start
+            largest = max(largest, size)
+            start = position + len(self.delimiter)
+            self.part = 0
+            position = data.find(self.delimiter, start)
+        self.part = self.part + len(chunk) if start == 0 else len(data) - start
+        # Keep enough to find a delimiter split across two chunks
+        self.tail = data[-(len(self.delimiter) - 1):]
+        return max(largest, self.part)
+
+
+def _multipart_boundary(headers: list) -> Optional[bytes]:
+    for name, value in headers:
+        if name == b"content-type" and value.lower().startswith(b"multipart/"):
+            for param in value.split(b";")[1:]:
+                key, _, boundary = param.strip().partition(b"=")
+                if key.lower() == b"boundary" and boundary:
+                    return boundary.strip(b'"')
+    return None
+
+
+class UploadLimitMiddleware:
+    """ASGI middleware: 413 once the request body, or one file in it, passes its limit.
+
+    Content-Length is checked before the body is read; the bytes of every body message are
+    counted as well, so chunked requests (no Content-Length) are cut off at the same limit.
+    Once a limit is passed the 413 is sent, the app sees a client disconnect on its next
+    read, and whatever it tries to send afterwards is dropped.
+    """
+
+    def __init__(self, app: Any, max_bytes: int = MAX_UPLOAD_REQUEST_BYTES,
+                 max_file_bytes: int = MAX_UPLOAD_FILE_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = scope.get("headers", [])
+        for name, value in headers:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                await self._reject(send, f"Request body exceeds {self.max_bytes} bytes")
+                return
+
+        boundary = _multipart_boundary(headers)
+        parts = _PartSizes(boundary) if boundary else None
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def limited_receive() -> dict:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+            body = message.get("body", b"")
+            received += len(body)
+            detail = None
+            if received > self.max_bytes:
+                detail = f"Request body exceeds {self.max_bytes} bytes"
+            elif parts is not None and parts.feed(body) > self.max_file_bytes + _PART_HEADER_SLACK:
+                detail = f"A file in the request exceeds the per-file limit of {self.max_file_bytes} bytes"
+            if detail is None:
+                return message
+            rejected = True
+            if not response_started:
+                await self._reject(send, detail)
+            return {"type": "http.disconnect"}
+
+        async def guarded_send(message: dict) -> None:
+            nonlocal response_started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+    async def _reject(self, send: Any, detail: str) -> None:
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})